@@ -0,0 +1,162 @@
+"""
+單張圖片濾鏡的多核心分帶(band)處理。
+
+把圖片依列切成幾條水平帶狀區域，在共用的執行緒池中同時處理(NumPy與OpenCV在運算時會釋放GIL)，
+結果直接寫入同一個輸出陣列的對應列。需要鄰域的濾鏡(拉普拉斯、高斯、平均)每條多讀取halo列，
+位於圖片邊緣的帶狀區域則與整張圖片處理相同由OpenCV補邊，因此結果與單執行緒相同。
+
+執行緒數可由set_workers或環境變數IMAGE_EDITOR_THREADS設定，預設為CPU數量；
+設為1時所有函式直接在呼叫端執行。在帶狀區域內再次呼叫(例如分塊處理的每塊)時也直接執行，
+避免工作互相等待執行緒池；已經在外層平行處理的工作(例如影片的每個畫格)可以用serial()停用分帶。
+"""
+import contextlib  # 導入contextlib，用於暫時停用分帶
+import os  # 導入os，用於取得CPU數量
+import threading  # 導入執行緒模組
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+import lazy_imports  # 導入延遲載入工具
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+MIN_BAND_ROWS = 128  # 每條帶狀區域至少的列數，太小時執行緒切換的成本超過收益
+
+_workers = int(os.environ.get("IMAGE_EDITOR_THREADS", 0)) or os.cpu_count() or 1  # 執行緒數
+_executor = None  # 共用的執行緒池，第一次使用時建立
+_lock = threading.Lock()  # 保護執行緒池的建立與更換
+_local = threading.local()  # 標記目前執行緒是否正在處理帶狀區域
+
+
+def workers():
+    """
+    回傳目前設定的執行緒數。
+    """
+    return _workers
+
+
+def set_workers(count):
+    """
+    設定分帶處理的執行緒數，下一次處理時生效。
+
+    參數:
+    count (int): 執行緒數，1表示不分帶，None或0表示使用CPU數量。
+    """
+    global _workers, _executor
+    count = max(1, int(count or os.cpu_count() or 1))
+    with _lock:
+        if count == _workers:
+            return
+        _workers = count
+        old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=False)  # 進行中的工作仍會完成
+
+
+def _pool():
+    """
+    回傳共用的執行緒池。
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="band")
+        return _executor
+
+
+@contextlib.contextmanager
+def serial():
+    """
+    在此區塊內的處理不分帶，用於已經在多個執行緒中同時處理不同圖片的情況，避免執行緒過多。
+    """
+    previous = getattr(_local, "active", False)
+    _local.active = True
+    try:
+        yield
+    finally:
+        _local.active = previous
+
+
+def band_ranges(height, count=None, alignment=1):
+    """
+    將列切成大致等高的帶狀區域。
+
+    參數:
+    height (int): 圖片高度。
+    count (int): 帶狀區域數量，為None時依執行緒數與MIN_BAND_ROWS決定。
+    alignment (int): 每條的起始列必須是此數的倍數(例如模糊先縮小時的倍數)。
+
+    回傳:
+    list: (起始列, 結束列)的串列，不需要分帶時只有一條。
+    """
+    if count is None:
+        count = min(_workers, height // MIN_BAND_ROWS)  # 太矮的圖片不分帶
+    if count <= 1 or getattr(_local, "active", False):  # 已在帶狀區域內時不再分帶
+        return [(0, height)]
+    rows = -(-height // count)  # 每條的列數
+    rows = -(-rows // alignment) * alignment  # 對齊
+    return [(top, min(top + rows, height)) for top in range(0, height, rows)]
+
+
+def _call(task, top, bottom):
+    """
+    在執行緒池中執行一條帶狀區域，期間標記為帶狀區域內。
+    """
+    with serial():
+        return task(top, bottom)
+
+
+def run(task, height, alignment=1):
+    """
+    對每條帶狀區域呼叫task(起始列, 結束列)並等待全部完成，回傳依序排列的結果。
+    只有一條時直接在呼叫端執行。
+
+    參數:
+    task (callable): 處理一條帶狀區域的函式，通常直接寫入共用的輸出陣列。
+    height (int): 圖片高度。
+    alignment (int): 每條的起始列對齊的倍數。
+    """
+    ranges = band_ranges(height, alignment=alignment)
+    if len(ranges) == 1:
+        return [task(0, height)]
+    futures = [_pool().submit(_call, task, top, bottom) for top, bottom in ranges]
+    return [future.result() for future in futures]  # 依序取回結果，任一條失敗時引發其錯誤
+
+
+def map_bands(func, arr):
+    """
+    對每條帶狀區域(檢視，不複製)呼叫func並回傳結果串列，用於可以逐條累加的統計(例如直方圖)。
+
+    參數:
+    func (callable): 接收一條帶狀區域的函式。
+    arr (numpy.ndarray): 圖片陣列。
+    """
+    return run(lambda top, bottom: func(arr[top:bottom]), arr.shape[0])
+
+
+def apply(func, arr, halo=0, alignment=1, out=None):
+    """
+    分帶套用回傳新陣列的濾鏡。每條多讀取上下halo列(檢視，不複製)，去除鄰域後寫入out的對應列。
+
+    參數:
+    func (callable): 接收含鄰域的帶狀區域，回傳相同形狀的結果。
+    arr (numpy.ndarray): 輸入圖片陣列。
+    halo (int): 鄰域列數，需不小於濾鏡的半徑。
+    alignment (int): 每條(含鄰域)的起始列對齊的倍數，halo會一併向上對齊。
+    out (numpy.ndarray): 輸出陣列，不可與arr相同，為None時配置新陣列。
+
+    回傳:
+    numpy.ndarray: 結果陣列，不需要分帶時為func(arr)本身。
+    """
+    height = arr.shape[0]
+    ranges = band_ranges(height, alignment=alignment)
+    if len(ranges) == 1:  # 直接處理整張圖片
+        return func(arr)
+    halo = -(-halo // alignment) * alignment  # 含鄰域的起始列仍然對齊
+    if out is None:
+        out = np.empty_like(arr)  # 共用的輸出陣列
+
+    def task(top, bottom):
+        halo_top, halo_bottom = max(0, top - halo), min(height, bottom + halo)  # 含鄰域的範圍
+        result = func(arr[halo_top:halo_bottom])
+        out[top:bottom] = result[top - halo_top:bottom - halo_top]  # 去除鄰域後寫入
+
+    run(task, height, alignment)
+    return out
@@ -0,0 +1,206 @@
+"""
+不需要視窗的批次處理命令：將同一份編輯設定套用到整個資料夾的圖片。
+
+使用方式:
+python batch.py 輸入資料夾 輸出資料夾 --recipe recipe.json --workers 8 --resume
+"""
+import argparse  # 導入命令列參數解析
+import multiprocessing  # 導入多行程模組
+import os  # 導入os，用於處理路徑
+import sys  # 導入sys，用於設定結束代碼
+import time  # 導入時間模組
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import pipeline  # 導入處理鏈模組
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")  # 支援的圖片副檔名
+
+
+def find_images(input_dir, recursive=False):
+    """
+    列出資料夾中的圖片檔案。
+
+    參數:
+    input_dir (str): 輸入資料夾。
+    recursive (bool): 是否包含子資料夾。
+
+    回傳:
+    list: 相對於input_dir的路徑，依名稱排序。
+    """
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):  # 只處理圖片
+                paths.append(os.path.relpath(os.path.join(root, name), input_dir))
+        if not recursive:  # 不包含子資料夾
+            break
+        dirs.sort()
+    return sorted(paths)
+
+
+def output_path_for(relative_path, output_dir, output_format=None):
+    """
+    計算輸出檔案路徑。
+
+    參數:
+    relative_path (str): 相對於輸入資料夾的路徑。
+    output_dir (str): 輸出資料夾。
+    output_format (str): 輸出副檔名(例如 "png")，為None時沿用原副檔名。
+    """
+    if output_format:  # 變更副檔名
+        relative_path = os.path.splitext(relative_path)[0] + "." + output_format.lstrip(".")
+    return os.path.join(output_dir, relative_path)
+
+
+def partial_path_for(output_path):
+    """
+    回傳寫入中的暫存檔路徑。暫存檔保留副檔名，讓PIL判斷格式。
+
+    參數:
+    output_path (str): 輸出檔案。
+    """
+    root, extension = os.path.splitext(output_path)
+    return f"{root}.partial{extension}"
+
+
+def remove_partial(output_path):
+    """
+    刪除上一次中斷時留下的暫存檔。
+
+    參數:
+    output_path (str): 輸出檔案。
+    """
+    try:
+        os.remove(partial_path_for(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def is_up_to_date(input_path, output_path, recipe_path):
+    """
+    判斷輸出檔案是否比輸入檔案與設定檔都新，用於續跑模式。
+
+    參數:
+    input_path (str): 輸入檔案。
+    output_path (str): 輸出檔案。
+    recipe_path (str): 設定檔，為None時只比較輸入檔案。
+    """
+    if not os.path.exists(output_path):  # 尚未輸出
+        return False
+    newest_source = os.path.getmtime(input_path)  # 輸入檔案的修改時間
+    if recipe_path:
+        newest_source = max(newest_source, os.path.getmtime(recipe_path))  # 設定檔的修改時間
+    return os.path.getmtime(output_path) >= newest_source
+
+
+def init_worker():
+    """
+    工作行程初始化：每個行程只使用一個OpenCV執行緒，避免多行程時執行緒過多互相搶用CPU。
+    """
+    import cv2  # 導入OpenCV
+    cv2.setNumThreads(1)  # 限制OpenCV執行緒數
+    import bands  # 導入多核心分帶處理
+    bands.set_workers(1)  # 已經以多行程平行處理，每個行程不再分帶
+
+
+def process_file(task):
+    """
+    在工作行程中處理單一檔案。先寫入暫存檔再改名，中斷時不會留下不完整的輸出。
+
+    參數:
+    task (tuple): (輸入路徑, 輸出路徑, 濾鏡參數)。
+
+    回傳:
+    tuple: (輸入路徑, 輸入位元組數, 處理秒數, 錯誤訊息或None)。
+    """
+    input_path, output_path, params = task
+    temp_path = partial_path_for(output_path)  # 先寫入暫存檔
+    start = time.perf_counter()
+    size = 0  # 無法讀取的檔案記為0位元組
+    try:
+        size = os.path.getsize(input_path)  # 輸入大小(吞吐量統計用)
+        with Image.open(input_path) as img:
+            source = pipeline.to_array(img)  # 讀取並轉換為RGB陣列
+        result = pipeline.render(source, input_path, params)  # 執行處理鏈(批次處理不需要快取)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)  # 建立輸出資料夾
+        pipeline.to_image(result).save(temp_path)  # 存檔
+        os.replace(temp_path, output_path)  # 完成後改名
+        error = None
+    except Exception as exc:  # 單一檔案失敗不影響其他檔案
+        error = f"{type(exc).__name__}: {exc}"
+        try:
+            remove_partial(output_path)  # 不留下不完整的暫存檔
+        except OSError:
+            pass
+    return input_path, size, time.perf_counter() - start, error
+
+
+def run(input_dir, output_dir, params, workers=None, resume=False, recipe_path=None, output_format=None, recursive=False):
+    """
+    以多個工作行程處理整個資料夾，並回報每個檔案的進度與整體吞吐量。
+
+    參數:
+    input_dir (str): 輸入資料夾。
+    output_dir (str): 輸出資料夾。
+    params (dict): 濾鏡參數。
+    workers (int): 工作行程數，為None時使用CPU核心數。
+    resume (bool): 是否略過已經是最新的輸出。
+    recipe_path (str): 設定檔路徑，續跑模式用來判斷設定是否變更。
+    output_format (str): 輸出副檔名，為None時沿用原副檔名。
+    recursive (bool): 是否包含子資料夾。
+
+    回傳:
+    int: 失敗的檔案數。
+    """
+    tasks = []
+    skipped = 0
+    for relative_path in find_images(input_dir, recursive):
+        input_path = os.path.join(input_dir, relative_path)
+        output_path = output_path_for(relative_path, output_dir, output_format)
+        remove_partial(output_path)  # 清除上一次被中斷時留下的暫存檔
+        if resume and is_up_to_date(input_path, output_path, recipe_path):  # 續跑模式略過最新的輸出
+            skipped += 1
+            continue
+        tasks.append((input_path, output_path, params))
+    print(f"{len(tasks)} images to process, {skipped} up to date")
+
+    failed = 0
+    total_bytes = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes=workers, initializer=init_worker) as pool:
+        for done, (input_path, nbytes, elapsed, error) in enumerate(pool.imap_unordered(process_file, tasks), 1):
+            if error:
+                failed += 1
+                print(f"[{done}/{len(tasks)}] FAILED {input_path}: {error}")
+            else:
+                total_bytes += nbytes
+                print(f"[{done}/{len(tasks)}] {input_path} ({elapsed:.2f}s)")
+    wall = time.perf_counter() - start  # 總耗時
+    processed = len(tasks) - failed
+    if wall > 0:
+        print(f"{processed} images in {wall:.2f}s: {processed / wall:.2f} images/s, {total_bytes / wall / 1e6:.2f} MB/s")
+    if failed:
+        print(f"{failed} images failed")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="將編輯設定套用到整個資料夾的圖片")
+    parser.add_argument("input_dir", help="輸入資料夾")
+    parser.add_argument("output_dir", help="輸出資料夾")
+    parser.add_argument("--recipe", help="JSON格式的編輯設定檔(參數名稱同ImageProcessor)")
+    parser.add_argument("--workers", type=int, default=None, help="工作行程數，預設為CPU核心數")
+    parser.add_argument("--resume", action="store_true", help="略過已經比輸入與設定檔新的輸出")
+    parser.add_argument("--format", dest="output_format", help="輸出副檔名，例如 png 或 jpg")
+    parser.add_argument("--recursive", action="store_true", help="包含子資料夾")
+    args = parser.parse_args(argv)
+
+    params = pipeline.load_recipe(args.recipe) if args.recipe else pipeline.default_params()  # 讀取編輯設定
+    failed = run(args.input_dir, args.output_dir, params, args.workers, args.resume, args.recipe,
+                 args.output_format, args.recursive)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+量測色彩、銳化與模糊分帶處理從1到N個執行緒的擴展性，並確認結果與單執行緒相同。
+
+OpenCV的部分函式本身也會使用多執行緒，可用--opencv-threads 1只量測分帶處理的效果。
+
+使用方式:
+python benchmarks/bench_bands.py --size 6000x4000 --threads 1,2,4,8,16 --repeat 3
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+import numpy as np  # 導入NumPy
+
+import bands  # 導入多核心分帶處理
+import pipeline  # 導入處理鏈模組
+from bench_color import best_time, synthetic_image  # 共用的量測工具
+
+OPERATIONS = [  # (名稱, 函式)
+    ("color", lambda arr: pipeline.adjust_color(arr, 1.2, 1.3, 0.8)),
+    ("sharpen", lambda arr: pipeline.sharpen(arr, 2.0)),
+    ("blur gaussian 10", lambda arr: pipeline.blur(arr, 10, "gaussian")),
+    ("blur average 15", lambda arr: pipeline.blur(arr, 15, "average")),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分帶處理擴展性")
+    parser.add_argument("--size", default="6000x4000", help="圖片尺寸，例如 6000x4000")
+    parser.add_argument("--threads", default=None, help="以逗號分隔的執行緒數，預設為1、2、4...直到CPU數量")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數(取最短時間)")
+    parser.add_argument("--opencv-threads", type=int, default=None, help="OpenCV內部的執行緒數")
+    args = parser.parse_args()
+
+    if args.opencv_threads is not None:
+        cv2.setNumThreads(args.opencv_threads)
+    cpus = os.cpu_count() or 1
+    counts = [int(value) for value in args.threads.split(",")] if args.threads else \
+        sorted({2 ** power for power in range(cpus.bit_length()) if 2 ** power <= cpus} | {cpus})
+    width, height = (int(value) for value in args.size.split("x"))
+    arr = synthetic_image(width, height)  # 合成測試圖片
+    arr.flags.writeable = False  # 與處理鏈相同，輸入是唯讀陣列
+    print(f"{os.cpu_count()} CPUs, OpenCV threads {cv2.getNumThreads()}")
+    print(f"{'operation':18s} " + " ".join(f"{f'{count} thr':>16s}" for count in counts))
+    for name, operation in OPERATIONS:
+        cells = []
+        reference = base = None
+        for count in counts:
+            bands.set_workers(count)
+            seconds, result = best_time(lambda: operation(arr), args.repeat)
+            if reference is None:  # 第一個執行緒數作為比較基準
+                reference, base = result, seconds
+            elif not np.array_equal(result, reference):  # 分帶處理不應改變結果
+                raise AssertionError(f"{name}: result differs with {count} threads")
+            cells.append(f"{seconds * 1000:8.1f} ms {base / seconds:4.1f}x")
+        print(f"{name:18s} " + " ".join(f"{cell:>16s}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
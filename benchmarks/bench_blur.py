@@ -0,0 +1,40 @@
+"""
+比較blur_engine與直接呼叫cv2.GaussianBlur在不同sigma下的速度與誤差。
+cv2.GaussianBlur的成本隨sigma線性增加，blur_engine應該大致維持不變。
+
+使用方式:
+python benchmarks/bench_blur.py --size 4000x3000 --sigmas 2,8,16,32,64 --repeat 3
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+import numpy as np  # 導入NumPy
+
+import blur_engine  # 導入與半徑無關的模糊引擎
+from bench_color import best_time, synthetic_image  # 共用的量測工具
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模糊引擎效能比較")
+    parser.add_argument("--size", default="4000x3000", help="圖片尺寸，例如 6000x4000")
+    parser.add_argument("--sigmas", default="2,8,16,32,64", help="以逗號分隔的sigma")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數(取最短時間)")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    arr = synthetic_image(width, height)  # 合成測試圖片
+    print(f"{'sigma':>6s} {'cv2 (ms)':>10s} {'engine (ms)':>12s} {'speedup':>8s} {'max diff':>9s} {'mean diff':>10s}")
+    for sigma in (float(value) for value in args.sigmas.split(",")):
+        reference_time, reference = best_time(lambda: cv2.GaussianBlur(arr, (0, 0), sigma), args.repeat)
+        engine_time, result = best_time(lambda: blur_engine.gaussian(arr, sigma), args.repeat)
+        diff = np.abs(result.astype(np.int16) - reference)  # 與直接計算的差異
+        print(f"{sigma:6.1f} {reference_time * 1000:10.1f} {engine_time * 1000:12.1f} "
+              f"{reference_time / engine_time:7.1f}x {int(diff.max()):9d} {diff.mean():10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+比較ImageEnhance依序調整與color_engine融合調整的速度與誤差。
+
+使用方式:
+python benchmarks/bench_color.py --size 6000x4000 --repeat 5
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import time  # 導入時間模組
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+import numpy as np  # 導入NumPy
+from PIL import Image, ImageEnhance  # 導入PIL庫中的Image, ImageEnhance
+
+import color_engine  # 導入融合色彩調整引擎
+
+
+def synthetic_image(width, height, seed=0):
+    """
+    產生平滑的合成測試圖片。
+
+    參數:
+    width (int): 寬度。
+    height (int): 高度。
+    seed (int): 亂數種子。
+    """
+    rng = np.random.default_rng(seed)  # 建立亂數產生器
+    small = rng.integers(0, 256, (max(2, height // 64), max(2, width // 64), 3), dtype=np.uint8)  # 低解析度雜訊
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)  # 放大成平滑圖片
+
+
+def pil_chain(arr, brightness, contrast, saturation):
+    """
+    以原本apply_all_filters的方式依序調整。
+    """
+    img = Image.fromarray(arr)
+    img = ImageEnhance.Brightness(img).enhance(brightness)  # 調整亮度
+    img = ImageEnhance.Contrast(img).enhance(contrast)  # 調整對比度
+    img = ImageEnhance.Color(img).enhance(saturation)  # 調整飽和度
+    return np.asarray(img)
+
+
+def best_time(func, repeat):
+    """
+    執行多次並回傳最短時間(秒)與最後一次的結果。
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="色彩調整效能比較")
+    parser.add_argument("--size", default="4000x3000", help="圖片尺寸，格式為 寬x高")
+    parser.add_argument("--repeat", type=int, default=5, help="重複次數")
+    parser.add_argument("--factors", default="1.3,1.5,1.4", help="亮度,對比度,飽和度")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))  # 解析尺寸
+    brightness, contrast, saturation = (float(v) for v in args.factors.split(","))  # 解析因子
+    arr = synthetic_image(width, height)  # 產生測試圖片
+    out = np.empty_like(arr)  # 融合引擎重複使用的輸出緩衝區
+
+    pil_time, expected = best_time(lambda: pil_chain(arr, brightness, contrast, saturation), args.repeat)
+    fused_time, result = best_time(lambda: color_engine.adjust_color(arr, brightness, contrast, saturation, out=out), args.repeat)
+    max_error = int(np.abs(expected.astype(np.int16) - result.astype(np.int16)).max())  # 最大絕對誤差
+
+    megapixels = width * height / 1e6
+    print(f"image: {width}x{height} ({megapixels:.1f} MP), factors: {brightness}, {contrast}, {saturation}")
+    print(f"ImageEnhance chain: {pil_time * 1000:8.1f} ms")
+    print(f"fused engine:       {fused_time * 1000:8.1f} ms")
+    print(f"speedup:            {pil_time / fused_time:8.2f}x")
+    print(f"max abs error:      {max_error} (tolerance {color_engine.COLOR_TOLERANCE})")
+
+
+if __name__ == "__main__":
+    main()
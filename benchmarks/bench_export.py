@@ -0,0 +1,59 @@
+"""
+比較各編碼設定的匯出時間與檔案大小，以及一組輸出(完整PNG、網頁JPEG、縮圖)依序與平行寫出的時間。
+
+使用方式:
+python benchmarks/bench_export.py --size 6000x4000 --formats png,jpg,webp
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import tempfile  # 導入tempfile，用於暫存輸出
+import time  # 導入時間模組
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import exporter  # 導入匯出模組
+from bench_color import synthetic_image  # 共用的量測工具
+
+
+class _Widget:
+    """
+    不需要Tk的替代元件，after直接忽略(以Exporter.wait取回結果)。
+    """
+    def after(self, ms, func):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匯出效能比較")
+    parser.add_argument("--size", default="6000x4000", help="圖片尺寸，例如 6000x4000")
+    parser.add_argument("--formats", default="png,jpg,webp", help="以逗號分隔的副檔名")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    arr = synthetic_image(width, height)  # 合成測試圖片
+    arr.flags.writeable = False  # 與處理鏈相同，輸入是唯讀陣列
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'format':>7s} {'preset':>9s} {'time (ms)':>10s} {'size (MB)':>10s}")
+        for extension in args.formats.split(","):
+            for preset in exporter.ENCODER_PRESETS:
+                target = exporter.ExportTarget(os.path.join(directory, f"{preset}.{extension}"), preset=preset)
+                result = exporter.export(arr, target)
+                print(f"{extension:>7s} {preset:>9s} {result['seconds'] * 1000:10.1f} {result['bytes'] / 1e6:10.2f}")
+
+        targets = exporter.export_set(directory, "set")
+        start = time.perf_counter()
+        for target in targets:  # 依序寫出
+            exporter.export(arr, target)
+        sequential = time.perf_counter() - start
+        pool = exporter.Exporter(_Widget())
+        start = time.perf_counter()
+        pool.submit(arr, targets)  # 平行寫出
+        pool.wait()
+        parallel = time.perf_counter() - start
+        print(f"\nexport set: sequential {sequential * 1000:.1f} ms, parallel {parallel * 1000:.1f} ms "
+              f"({sequential / parallel:.2f}x, {os.cpu_count()} CPUs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+量測資料夾瀏覽列產生縮圖的時間：第一次開啟(磁碟快取為空)與重新開啟(縮圖與內容鍵都在快取中)。
+
+使用方式:
+python benchmarks/bench_folder.py 資料夾 --workers 4
+python benchmarks/bench_folder.py --count 20 --size 4000x3000    # 不指定資料夾時產生合成JPEG與PNG
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import tempfile  # 導入暫存檔模組
+import time  # 導入時間模組
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import disk_cache  # 導入磁碟快取
+import filmstrip  # 導入資料夾瀏覽列
+from bench_color import synthetic_image  # 共用的量測工具
+
+
+class _Canvas:
+    """
+    不需要Tk的替代畫布，所有繪圖呼叫都忽略。
+    """
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _Filmstrip(filmstrip.Filmstrip):
+    """
+    不建立PhotoImage的瀏覽列，只量測縮圖的產生與讀取。
+    """
+    def _show(self, index, thumbnail):
+        pass
+
+
+def browse(directory, cache_dir, workers):
+    """
+    開啟資料夾並等待所有縮圖完成，回傳(秒數, 來自快取的數量)。每次建立新的DiskCache，與重新啟動程式相同。
+    """
+    cache = disk_cache.DiskCache(cache_dir)
+    strip = _Filmstrip(_Canvas(), cache, lambda path: None, max_workers=workers)
+    start = time.perf_counter()
+    strip.open_folder(directory)
+    hits = sum(future.result()[1] for _, future in strip._pending)  # 等待所有縮圖
+    seconds = time.perf_counter() - start
+    strip.close()
+    return seconds, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="資料夾瀏覽效能比較")
+    parser.add_argument("folder", nargs="?", help="圖片資料夾，省略時產生合成圖片")
+    parser.add_argument("--count", type=int, default=20, help="合成圖片數量")
+    parser.add_argument("--size", default="4000x3000", help="合成圖片尺寸，例如 6000x4000")
+    parser.add_argument("--workers", type=int, default=None, help="產生縮圖的執行緒數")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = args.folder
+        if folder is None:  # 產生合成圖片，一半JPEG(可縮小解碼)一半PNG(需要完整解碼)
+            folder = os.path.join(temporary, "images")
+            os.makedirs(folder)
+            width, height = (int(value) for value in args.size.split("x"))
+            for index in range(args.count):
+                extension = "jpg" if index % 2 == 0 else "png"
+                Image.fromarray(synthetic_image(width, height, seed=index)).save(os.path.join(folder, f"{index:03d}.{extension}"))
+        cache_dir = os.path.join(temporary, "cache")
+        cold, _ = browse(folder, cache_dir, args.workers)
+        warm, hits = browse(folder, cache_dir, args.workers)
+        print(f"first open: {cold * 1000:9.1f} ms")
+        print(f"reopen:     {warm * 1000:9.1f} ms ({hits} from disk cache, {cold / warm:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
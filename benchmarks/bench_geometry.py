@@ -0,0 +1,94 @@
+"""
+比較依序旋轉、翻轉、調整大小(每一步都重新取樣並配置整張圖片)與單次幾何轉換的速度與記憶體峰值，
+並檢查分塊處理(tiled.render_tiled)與記憶體內的結果一致：兩者共用預濾波與邊界規則，
+只剩warpAffine定點座標在塊邊界的捨入差異(最大誤差1)。誤差超過時結束代碼為1。
+
+使用方式:
+python benchmarks/bench_geometry.py --size 6000x4000 --repeat 3
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import tracemalloc  # 導入tracemalloc，用於量測記憶體峰值
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import numpy as np  # 導入NumPy
+
+import geometry  # 導入幾何轉換矩陣
+import legacy_geometry  # 導入逐步幾何轉換(比較基準)
+import pipeline  # 導入處理鏈模組
+import tiled  # 導入分塊處理模組
+from bench_color import best_time, synthetic_image  # 共用的量測工具
+
+CASES = [  # (名稱, 角度, 水平翻轉, 垂直翻轉, 調整大小的比例)
+    ("rotate 30 + flip", 30, True, False, None),
+    ("rotate 30 + flip + resize 0.5x", 30, True, False, 0.5),
+    ("rotate 30 + resize 1.5x", 30, False, False, 1.5),
+    ("rotate 90 + flip", 90, True, False, None),
+    ("rotate 90 + flip + resize 0.5x", 90, True, False, 0.5),
+    ("rotate 180 + flip both", 180, True, True, None),
+    ("resize 0.3x", 0, False, False, 0.3),
+    ("resize 0.02x", 0, False, False, 0.02),
+]
+TILED_TOLERANCE = 1  # 分塊與記憶體內結果的最大允許誤差
+
+
+def sequential(arr, params):
+    """
+    原本的做法：旋轉、翻轉、調整大小依序執行。
+    """
+    img = arr
+    if params["current_angle"] % 360:
+        img = legacy_geometry.rotate(img, params["current_angle"])
+    if params["is_flipped_horizontally"] or params["is_flipped_vertically"]:
+        img = legacy_geometry.flip(img, params["is_flipped_horizontally"], params["is_flipped_vertically"])
+    if params["resized_width"] and params["resized_height"]:
+        img = legacy_geometry.resize(img, params["resized_width"], params["resized_height"])
+    return img
+
+
+def peak_memory(func):
+    """
+    執行一次並回傳tracemalloc量測到的記憶體峰值(位元組)。
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="幾何轉換效能比較")
+    parser.add_argument("--size", default="6000x4000", help="圖片尺寸，例如 6000x4000")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數(取最短時間)")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    arr = synthetic_image(width, height)  # 合成測試圖片
+    arr.flags.writeable = False  # 與處理鏈相同，輸入是唯讀陣列
+    print(f"{'case':32s} {'sequential':>12s} {'fused':>10s} {'speedup':>8s} {'peak seq':>10s} {'peak fused':>11s} "
+          f"{'tiled max':>10s}")
+    failed = False
+    for name, angle, horizontal, vertical, ratio in CASES:
+        params = pipeline.default_params()
+        params.update(current_angle=angle, is_flipped_horizontally=horizontal, is_flipped_vertically=vertical)
+        if ratio is not None:  # 調整大小的目標為旋轉後尺寸乘以比例
+            _, (rotated_width, rotated_height) = geometry.rotation_matrix(*pipeline.array_size(arr), angle)  # 旋轉後尺寸
+            params.update(resized_width=int(rotated_width * ratio), resized_height=int(rotated_height * ratio))
+        sequential_time, _ = best_time(lambda: sequential(arr, params), args.repeat)
+        fused_time, _ = best_time(lambda: pipeline.transform(arr, params), args.repeat)
+        sequential_peak = peak_memory(lambda: sequential(arr, params))
+        fused_peak = peak_memory(lambda: pipeline.transform(arr, params))
+        tiled_result = tiled.render_tiled(arr, params, tile_size=512)  # 分塊處理的結果
+        tiled_error = int(np.abs(pipeline.transform(arr, params).astype(np.int16) - tiled_result.astype(np.int16)).max())
+        failed = failed or tiled_error > TILED_TOLERANCE
+        print(f"{name:32s} {sequential_time * 1000:9.1f} ms {fused_time * 1000:7.1f} ms {sequential_time / fused_time:7.2f}x "
+              f"{sequential_peak / 1e6:7.1f} MB {fused_peak / 1e6:8.1f} MB {tiled_error:10d}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+量測開啟圖片到第一次顯示預覽的時間：原本的完整解碼加縮圖，與image_loader的快速開啟。
+
+使用方式:
+python benchmarks/bench_open.py photo.jpg --box 800x600 --repeat 5
+python benchmarks/bench_open.py --size 6000x4000    # 不指定檔案時產生合成JPEG
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import tempfile  # 導入暫存檔模組
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import image_loader  # 導入快速開啟圖片模組
+import pipeline  # 導入處理鏈模組
+from bench_color import best_time, synthetic_image  # 共用的量測工具
+
+
+def full_decode_preview(path, box_size):
+    """
+    原本的方式：完整解碼後再縮小到顯示尺寸。
+    """
+    with Image.open(path) as img:
+        arr = pipeline.to_array(img)  # 完整解碼
+    width, height = pipeline.array_size(arr)
+    fit = min(box_size[0] / width, box_size[1] / height, 1.0)  # 縮小到符合顯示區域
+    return pipeline.resize_to(arr, (max(1, int(width * fit)), max(1, int(height * fit))))
+
+
+def fast_preview(path, box_size):
+    """
+    快速開啟：JPEG縮小解碼或EXIF縮圖，沒有快速路徑時退回完整解碼。
+    """
+    preview = image_loader.open_preview(path, box_size)
+    if preview is None:
+        return full_decode_preview(path, box_size)
+    arr = preview[0]
+    width, height = pipeline.array_size(arr)
+    fit = min(box_size[0] / width, box_size[1] / height, 1.0)  # 縮小到符合顯示區域
+    return pipeline.resize_to(arr, (max(1, int(width * fit)), max(1, int(height * fit))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="開啟圖片到第一次預覽的時間")
+    parser.add_argument("path", nargs="?", help="要開啟的圖片，省略時產生合成JPEG")
+    parser.add_argument("--size", default="6000x4000", help="合成圖片的寬x高")
+    parser.add_argument("--box", default="800x600", help="預覽區域的寬x高")
+    parser.add_argument("--repeat", type=int, default=5, help="重複次數(取最短時間)")
+    args = parser.parse_args()
+
+    box_size = tuple(int(value) for value in args.box.split("x"))
+    path = args.path
+    if path is None:  # 產生合成JPEG
+        width, height = (int(value) for value in args.size.split("x"))
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.jpg")
+        Image.fromarray(synthetic_image(width, height)).save(path, quality=90)
+
+    with Image.open(path) as img:
+        print(f"{path}: {img.format} {img.size[0]}x{img.size[1]}, preview box {box_size[0]}x{box_size[1]}")
+    full_time, _ = best_time(lambda: full_decode_preview(path, box_size), args.repeat)
+    fast_time, result = best_time(lambda: fast_preview(path, box_size), args.repeat)
+    print(f"full decode + resize: {full_time * 1000:8.1f} ms")
+    print(f"fast open:            {fast_time * 1000:8.1f} ms  ({full_time / fast_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
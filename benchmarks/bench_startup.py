@@ -0,0 +1,93 @@
+"""
+量測程式啟動時間：各模組的匯入時間，以及從啟動行程到第一次畫出視窗的時間。
+可以量測原始碼(python main.py)或PyInstaller打包後的執行檔，方便在版本之間比較。
+
+使用方式:
+python benchmarks/bench_startup.py --repeat 5
+python benchmarks/bench_startup.py --exe dist/main.exe --repeat 5
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定路徑與環境變數
+import subprocess  # 導入子行程模組
+import sys  # 導入sys，用於取得Python執行檔
+import time  # 導入時間模組
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 專案資料夾
+HEAVY_MODULES = ("cv2", "numpy", "PIL.Image", "PIL.ImageTk", "tkinter")  # 一定要列出的大型模組
+
+
+def import_times(module="image_processor"):
+    """
+    以 python -X importtime 匯入模組，回傳每個模組的累計匯入時間。
+
+    參數:
+    module (str): 要匯入的模組。
+
+    回傳:
+    dict: 模組名稱對應累計匯入時間(毫秒)。
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:  # 略過標題列
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative) / 1000.0  # 微秒轉毫秒
+    return times
+
+
+def time_to_window(command):
+    """
+    啟動程式並量測到第一次畫出視窗的時間(包含直譯器啟動或解壓縮打包檔)。
+
+    參數:
+    command (list): 啟動程式的命令。
+
+    回傳:
+    float: 秒數；無法顯示視窗(例如沒有顯示器)時回傳None。
+    """
+    env = dict(os.environ, IMAGE_EDITOR_STARTUP_BENCHMARK="1")  # 讓main.py畫出視窗後立即結束
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("first window shown"):
+            elapsed = time.perf_counter() - start
+            process.wait()
+            return elapsed
+    process.wait()
+    print(f"window not shown: {process.stderr.read().strip().splitlines()[-1:]}")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="啟動時間量測")
+    parser.add_argument("--exe", help="打包後的執行檔，省略時以目前的Python執行main.py")
+    parser.add_argument("--repeat", type=int, default=5, help="重複次數(取最短時間)")
+    parser.add_argument("--top", type=int, default=15, help="列出匯入時間最長的模組數")
+    args = parser.parse_args()
+
+    times = import_times()
+    print("import time (cumulative, ms):")
+    own_modules = [name for name in times if os.path.exists(os.path.join(PROJECT_DIR, name + ".py"))]  # 專案模組
+    listed = sorted(set(own_modules) | {name for name in HEAVY_MODULES if name in times}, key=lambda name: -times[name])
+    for name in listed:
+        print(f"  {name:24s} {times[name]:8.1f}")
+    for name in HEAVY_MODULES:
+        if name not in times:
+            print(f"  {name:24s}      not imported at startup")
+    print(f"slowest {args.top} modules:")
+    for name in sorted(times, key=lambda name: -times[name])[:args.top]:
+        print(f"  {name:24s} {times[name]:8.1f}")
+
+    command = [args.exe] if args.exe else [sys.executable, "main.py"]
+    results = [time_to_window(command) for _ in range(args.repeat)]
+    results = [result for result in results if result is not None]
+    if results:
+        print(f"time to first window: {min(results) * 1000:.1f} ms (best of {len(results)}), "
+              f"cold {results[0] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
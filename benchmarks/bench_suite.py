@@ -0,0 +1,223 @@
+"""
+不需要顯示器的效能測試組：以合成圖片量測每個ImageProcessor操作與完整處理鏈在不同
+圖片大小下的時間、吞吐量與記憶體峰值，結果寫成JSON，並可與儲存的基準比較以找出效能退化。
+
+使用方式:
+python benchmarks/bench_suite.py --sizes 1,4,12 --output results.json
+python benchmarks/bench_suite.py --sizes 1,4,12 --output benchmarks/baseline.json    # 建立基準
+python benchmarks/bench_suite.py --sizes 1,4,12 --baseline benchmarks/baseline.json  # 與基準比較，退化時結束代碼為1
+
+記憶體峰值以tracemalloc量測，包含NumPy陣列與OpenCV輸出陣列(兩者都經由NumPy配置)，
+不包含OpenCV內部的暫存緩衝區。
+"""
+import argparse  # 導入命令列參數解析
+import datetime  # 導入日期時間模組，用於記錄量測時間
+import itertools  # 導入itertools，用於產生不同的參數值
+import json  # 導入JSON模組，用於輸出結果
+import math  # 導入數學模組
+import os  # 導入os，用於設定模組路徑
+import platform  # 導入platform，用於記錄執行環境
+import sys  # 導入sys，用於設定模組路徑與結束代碼
+import tracemalloc  # 導入tracemalloc，用於量測記憶體峰值
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+import numpy as np  # 導入NumPy
+import PIL  # 導入PIL，用於記錄版本
+
+import pipeline  # 導入處理鏈模組
+from pyramid import Pyramid  # 導入顯示用的影像金字塔
+from stage_cache import StageCache  # 導入階段結果快取
+from bench_color import best_time, synthetic_image  # 共用的量測工具
+
+DISPLAY_SIZE = (1280, 720)  # 模擬畫布的大小
+ASPECT = 4 / 3  # 合成圖片的長寬比
+
+
+def chain_params():
+    """
+    完整處理鏈使用的參數：每個階段都啟用。
+    """
+    params = pipeline.default_params()
+    params.update(current_angle=30, is_flipped_horizontally=True, brightness_factor=1.2, contrast_factor=1.3,
+                  saturation_factor=1.4, sharpen_factor=2.0, blur_factor=3.0, blur_type="gaussian")
+    return params
+
+
+def display(arr):
+    """
+    update_image的計算部分：建立金字塔、裁切可見區域並轉換為PIL(不建立Tk的PhotoImage)。
+    """
+    width, height = pipeline.array_size(arr)
+    zoom = min(DISPLAY_SIZE[0] / width, DISPLAY_SIZE[1] / height, 1.0)  # 符合畫布的倍率
+    view, _ = Pyramid(arr).view(zoom, (width / 2.0, height / 2.0), DISPLAY_SIZE)
+    return pipeline.to_image(view)
+
+
+def cached_chain(arr, params):
+    """
+    快取已經有前面階段時只變更模糊，對應拖動模糊滑桿的情況。
+    """
+    cache = StageCache()
+    pipeline.render(arr, "bench", params, cache)  # 預熱快取
+    steps = itertools.count(1)  # 每次使用不同的模糊值，讓最後一個階段一定重新計算
+    return lambda: pipeline.render(arr, "bench", dict(params, blur_factor=params["blur_factor"] + next(steps) * 1e-3), cache)
+
+
+def operations(arr):
+    """
+    回傳(操作名稱, 可呼叫物件)的清單，名稱對應ImageProcessor的方法。
+    """
+    width, height = pipeline.array_size(arr)
+    params = chain_params()
+    identity = pipeline.default_params()  # 單一幾何操作以geometry.compose + warp的處理鏈量測
+    return [
+        ("adjust_color", lambda: pipeline.adjust_color(arr, 1.2, 1.3, 1.4)),
+        ("apply_opencv_sharpen", lambda: pipeline.sharpen(arr, 2.0)),
+        ("apply_opencv_blur_average", lambda: pipeline.blur(arr, 5.0, "average")),
+        ("apply_opencv_blur_gaussian", lambda: pipeline.blur(arr, 5.0, "gaussian")),
+        ("rotate_expand_30", lambda: pipeline.transform(arr, dict(identity, current_angle=30))),
+        ("rotate_90", lambda: pipeline.transform(arr, dict(identity, current_angle=90))),
+        ("flip", lambda: pipeline.transform(arr, dict(identity, is_flipped_horizontally=True))),
+        ("resize_down_half", lambda: pipeline.transform(arr, dict(identity, resized_width=width // 2, resized_height=height // 2))),
+        ("resize_up_1.5x", lambda: pipeline.transform(arr, dict(identity, resized_width=width * 3 // 2, resized_height=height * 3 // 2))),
+        ("geometry_rotate30_flip_resize", lambda: pipeline.transform(arr, dict(params, resized_width=width // 2, resized_height=height // 2))),
+        ("update_image", lambda: display(arr)),
+        ("apply_all_filters", lambda: pipeline.render(arr, "bench", params)),
+        ("apply_all_filters_cached", cached_chain(arr, params)),
+    ]
+
+
+def peak_memory(func):
+    """
+    執行一次並回傳tracemalloc量測到的記憶體峰值(位元組，不含執行前已配置的記憶體)。
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(sizes, repeat, only=None):
+    """
+    執行所有量測。
+
+    參數:
+    sizes (list): 圖片大小(百萬像素)。
+    repeat (int): 每個操作的重複次數(取最短時間)。
+    only (list): 只執行名稱包含這些字串的操作，為None時全部執行。
+
+    回傳:
+    list: 每個(操作, 大小)的結果字典。
+    """
+    results = []
+    for megapixels in sizes:
+        width = int(round(math.sqrt(megapixels * 1e6 * ASPECT)))  # 依長寬比計算尺寸
+        height = int(round(megapixels * 1e6 / width))
+        arr = synthetic_image(width, height)  # 合成RGB陣列
+        arr.flags.writeable = False  # 與ImageProcessor相同，處理鏈的輸入是唯讀陣列
+        for name, func in operations(arr):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            seconds, _ = best_time(func, repeat)
+            peak = peak_memory(func)
+            result = {
+                "operation": name,
+                "megapixels": round(width * height / 1e6, 2),
+                "width": width,
+                "height": height,
+                "seconds": seconds,
+                "megapixels_per_second": width * height / 1e6 / seconds,
+                "peak_bytes": peak,
+            }
+            results.append(result)
+            print(f"{name:28s} {result['megapixels']:7.2f} MP {seconds * 1000:10.1f} ms "
+                  f"{result['megapixels_per_second']:9.1f} MP/s {peak / 1e6:9.1f} MB", flush=True)
+        del arr
+    return results
+
+
+def environment():
+    """
+    記錄執行環境，比較結果時用於確認兩次量測在同一環境下進行。
+    """
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pillow": PIL.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    與基準比較時間與記憶體，回傳退化的項目。
+
+    參數:
+    results (list): 本次結果。
+    baseline (dict): 基準JSON的內容。
+    tolerance (float): 可接受的變慢或記憶體增加比例，例如0.15表示15%。
+
+    回傳:
+    list: 退化項目的說明文字。
+    """
+    reference = {(item["operation"], item["megapixels"]): item for item in baseline["results"]}
+    regressions = []
+    print(f"compared with baseline from {baseline['environment']['date']} ({baseline['environment']['platform']}):")
+    for item in results:
+        base = reference.get((item["operation"], item["megapixels"]))
+        if base is None:  # 基準中沒有這一項
+            continue
+        time_ratio = item["seconds"] / base["seconds"]
+        memory_ratio = item["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0
+        status = "ok"
+        if time_ratio > 1.0 + tolerance:
+            status = "SLOWER"
+            regressions.append(f"{item['operation']} @ {item['megapixels']} MP: {time_ratio:.2f}x time")
+        if memory_ratio > 1.0 + tolerance:
+            status = "MORE MEMORY" if status == "ok" else status + ", MORE MEMORY"
+            regressions.append(f"{item['operation']} @ {item['megapixels']} MP: {memory_ratio:.2f}x peak memory")
+        print(f"  {item['operation']:28s} {item['megapixels']:7.2f} MP  time {time_ratio:5.2f}x  memory {memory_ratio:5.2f}x  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ImageProcessor操作的效能測試組")
+    parser.add_argument("--sizes", default="1,4,12", help="圖片大小(百萬像素)，以逗號分隔，例如 1,4,12,25,50,100")
+    parser.add_argument("--repeat", type=int, default=3, help="重複次數(取最短時間)")
+    parser.add_argument("--only", help="只執行名稱包含這些字串的操作，以逗號分隔")
+    parser.add_argument("--output", help="將結果寫入JSON檔")
+    parser.add_argument("--baseline", help="與基準JSON比較，有退化時結束代碼為1")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="可接受的退化比例")
+    args = parser.parse_args(argv)
+
+    sizes = [float(value) for value in args.sizes.split(",")]
+    only = args.only.split(",") if args.only else None
+    report = {"environment": environment(), "repeat": args.repeat, "results": run(sizes, args.repeat, only)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(report["results"], json.load(file), args.tolerance)
+        if regressions:
+            print("regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+量測影片串流處理在不同同時處理畫格數下的fps，以及記憶體用量是否與影片長度無關。
+
+不指定輸入時產生合成影片(每格平移的合成圖片)。記憶體以tracemalloc量測NumPy配置的峰值，
+畫格數加倍時峰值應大致相同。
+
+使用方式:
+python benchmarks/bench_video.py 影片.mp4 --workers 1,2,4,8
+python benchmarks/bench_video.py --frames 120 --size 1920x1080
+"""
+import argparse  # 導入命令列參數解析
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+import tempfile  # 導入暫存檔模組
+import tracemalloc  # 導入記憶體追蹤
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+
+import pipeline  # 導入處理鏈模組
+import video  # 導入影片處理模組
+from bench_color import synthetic_image  # 共用的量測工具
+
+
+def synthetic_video(path, width, height, frames, fps=30.0):
+    """
+    寫出每格向右平移的合成影片。
+    """
+    base = cv2.cvtColor(synthetic_image(width + frames, height), cv2.COLOR_RGB2BGR)  # 比畫格寬，用於平移
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for index in range(frames):
+        writer.write(base[:, index:index + width].copy())
+    writer.release()
+
+
+def measure(source, destination, params, workers):
+    """
+    處理一次，回傳(結果字典, 記憶體峰值MB)。
+    """
+    tracemalloc.start()
+    stats = video.process(source, destination, params, workers)
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return stats, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="影片串流處理效能")
+    parser.add_argument("source", nargs="?", help="輸入影片，省略時產生合成影片")
+    parser.add_argument("--frames", type=int, default=120, help="合成影片的畫格數")
+    parser.add_argument("--size", default="1920x1080", help="合成影片的尺寸，例如 1920x1080")
+    parser.add_argument("--workers", default=None, help="以逗號分隔的同時處理畫格數，預設為1與CPU數量")
+    parser.add_argument("--recipe", help="JSON格式的編輯設定檔，預設為調整色彩、銳化與模糊")
+    args = parser.parse_args()
+
+    params = pipeline.load_recipe(args.recipe) if args.recipe else dict(
+        pipeline.default_params(), brightness_factor=1.2, saturation_factor=1.3, sharpen_factor=2.0, blur_factor=2.0)
+    cpus = os.cpu_count() or 1
+    counts = [int(value) for value in args.workers.split(",")] if args.workers else sorted({1, cpus})
+    with tempfile.TemporaryDirectory() as temporary:
+        sources = [args.source]
+        if args.source is None:  # 同一尺寸產生兩種長度，比較記憶體峰值
+            width, height = (int(value) for value in args.size.split("x"))
+            sources = []
+            for frames in (args.frames, 2 * args.frames):
+                path = os.path.join(temporary, f"synthetic_{frames}.avi")
+                synthetic_video(path, width, height, frames)
+                sources.append(path)
+        destination = os.path.join(temporary, "out.avi")
+        print(f"{cpus} CPUs")
+        for source in sources:
+            for count in counts:
+                stats, peak = measure(source, destination, params, count)
+                print(f"{os.path.basename(source):20s} {count:2d} workers: {stats['frames']:5d} frames "
+                      f"{stats['fps']:7.1f} fps, peak {peak:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+處理鏈改為單次幾何轉換(pipeline.transform)之前的做法：旋轉、翻轉、調整大小各自重新取樣並配置整張圖片。
+只保留給bench_geometry作為比較基準，應用程式不使用。
+"""
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓腳本可以匯入專案模組
+
+import cv2  # 導入OpenCV
+
+import geometry  # 導入幾何轉換矩陣
+import pipeline  # 導入處理鏈模組
+
+
+def rotate(arr, angle):
+    """
+    旋轉圖片並擴展畫布以容納整張圖片，行為與PIL的rotate(-angle, expand=True)相同(最近鄰取樣、黑色填充)。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    angle (int): 順時針旋轉角度。
+    """
+    angle = angle % 360  # 正規化角度
+    if angle == 90:  # 90度倍數使用無損轉置
+        return cv2.rotate(arr, cv2.ROTATE_90_CLOCKWISE)
+    if angle == 180:
+        return cv2.rotate(arr, cv2.ROTATE_180)
+    if angle == 270:
+        return cv2.rotate(arr, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    height, width = arr.shape[:2]  # 原始尺寸
+    matrix, size = geometry.rotation_matrix(width, height, angle)  # 與PIL相同的矩陣與擴展尺寸
+    return cv2.warpAffine(arr, geometry.to_opencv(matrix), size, flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=0)  # 單次取樣完成旋轉
+
+
+def flip(arr, horizontal, vertical):
+    """
+    翻轉圖片，兩個方向同時翻轉時只複製一次。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    horizontal (bool): 是否水平翻轉。
+    vertical (bool): 是否垂直翻轉。
+    """
+    if horizontal and vertical:  # 同時翻轉
+        return cv2.flip(arr, -1)
+    if horizontal:  # 水平翻轉
+        return cv2.flip(arr, 1)
+    return cv2.flip(arr, 0)  # 垂直翻轉
+
+
+def resize(arr, width, height, scale=1.0):
+    """
+    調整圖片大小。縮小使用INTER_AREA(具抗鋸齒)，放大使用INTER_LANCZOS4。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    width (int): 新的寬度(原始解析度下)。
+    height (int): 新的高度(原始解析度下)。
+    scale (float): 圖片相對於原始解析度的比例。
+    """
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))  # 換算到目前解析度
+    return pipeline.resize_to(arr, size)
@@ -0,0 +1,201 @@
+"""
+與半徑無關的模糊引擎。
+
+原本的模糊以int()截斷blur_factor，再呼叫cv2.blur或核大小為2k+1的cv2.GaussianBlur：
+小數的滑桿值會被忽略，而高斯模糊的成本隨半徑線性增加。這裡依sigma大小選擇三種做法：
+
+- 小sigma：直接使用cv2.GaussianBlur(核很小，整數blur_factor時與原本逐位元相同)。
+- 中sigma：三次盒狀濾波的串接近似高斯(cv2.blur以累加和計算，成本與核大小無關)，
+  以uint16保留8位元小數避免每次取整的誤差，與目標sigma的差距再以很小的高斯補足，
+  因此sigma可以連續變化。
+- 大sigma：先以INTER_AREA縮小2的冪次倍，在小圖上模糊後再放大，成本主要是兩次縮放。
+
+平均模糊的核寬度也可以是小數：以相鄰兩個整數寬度的結果線性內插。
+"""
+import math  # 導入數學模組
+
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+DIRECT_MAX_SIGMA = 8.0  # 不超過此sigma時直接使用cv2.GaussianBlur(核小時比盒狀濾波串接快)
+DIRECT_MAX_RADIUS = int((DIRECT_MAX_SIGMA - 0.8) / 0.3) + 1  # sigma不超過DIRECT_MAX_SIGMA的最大整數blur_factor
+DOWNSAMPLE_MIN_SIGMA = 24.0  # 超過此sigma時先縮小再模糊
+DOWNSAMPLE_TARGET_SIGMA = 8.0  # 縮小後的圖片上至少保留的sigma
+BOX_PASSES = 3  # 近似高斯的盒狀濾波次數
+FRACTION_BITS = 8  # 盒狀濾波串接時以uint16保留的小數位元數
+
+
+def gaussian_sigma(factor, scale=1.0):
+    """
+    將blur_factor換算為高斯模糊的sigma。
+    整數blur_factor對應原本核大小為2k+1時OpenCV自動選擇的sigma。
+
+    參數:
+    factor (float): 模糊比例因子(原始解析度下的核半徑)。
+    scale (float): 圖片相對於原始解析度的比例。
+    """
+    return (0.3 * (factor - 1) + 0.8) * scale  # OpenCV的公式 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+def box_sizes(sigma, passes=BOX_PASSES):
+    """
+    選擇串接後標準差最接近但不超過sigma的奇數盒狀濾波寬度(Kovesi的方法)。
+
+    參數:
+    sigma (float): 目標標準差。
+    passes (int): 盒狀濾波次數。
+
+    回傳:
+    tuple: (各次的寬度串列, 串接後的實際標準差)。
+    """
+    ideal = math.sqrt(12.0 * sigma * sigma / passes + 1.0)  # 所有寬度相同時的理想寬度
+    lower = int(math.floor(ideal))
+    if lower % 2 == 0:  # 寬度必須是奇數，才不會使圖片偏移
+        lower -= 1
+    upper = lower + 2
+    count = (12.0 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes) / (-4 * lower - 4)  # 使用較小寬度的次數
+    count = min(passes, max(0, int(math.ceil(count))))  # 向上取整，使實際標準差不超過sigma
+    sizes = [lower] * count + [upper] * (passes - count)
+    variance = sum((size * size - 1) / 12.0 for size in sizes)  # 寬度為w的盒狀濾波變異數為(w^2 - 1) / 12
+    return sizes, math.sqrt(variance)
+
+
+def downsample_factor(sigma):
+    """
+    大sigma時縮小的倍數(2的冪次)，不需要縮小時回傳1。
+
+    參數:
+    sigma (float): 目標標準差。
+    """
+    if sigma <= DOWNSAMPLE_MIN_SIGMA:
+        return 1
+    return 2 ** int(math.floor(math.log2(sigma / DOWNSAMPLE_TARGET_SIGMA)))  # 縮小後sigma仍在DOWNSAMPLE_TARGET_SIGMA以上
+
+
+def average(arr, width):
+    """
+    平均模糊，核寬度可以是小數。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    width (float): 核寬度(像素)，不超過1時不模糊。
+    """
+    if width <= 1.0:
+        return arr
+    lower = int(math.floor(width))  # 較小的整數寬度
+    fraction = width - lower  # 小數部分
+    result = cv2.blur(arr, (lower, lower))  # 整數寬度與原本的cv2.blur相同
+    if fraction < 1e-6:
+        return result
+    wider = cv2.blur(arr, (lower + 1, lower + 1))  # 較大的整數寬度
+    return cv2.addWeighted(result, 1.0 - fraction, wider, fraction, 0.0)  # 線性內插
+
+
+def gaussian(arr, sigma, radius=None):
+    """
+    高斯模糊，成本與sigma無關。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列(uint8)。
+    sigma (float): 標準差(像素)。
+    radius (int): 直接使用cv2.GaussianBlur時的核半徑，為None時由OpenCV依sigma決定。
+    """
+    if sigma <= 0.0:
+        return arr
+    if sigma <= DIRECT_MAX_SIGMA:  # 核很小，直接計算
+        ksize = 2 * radius + 1 if radius else 0  # 0表示由sigma決定
+        return cv2.GaussianBlur(arr, (ksize, ksize), sigma)
+    factor = downsample_factor(sigma)
+    if factor > 1:
+        return _downsampled(arr, sigma, factor)
+    return _box_cascade(arr, sigma)
+
+
+def _box_cascade(arr, sigma):
+    """
+    以三次盒狀濾波近似高斯模糊，剩餘的差距以小sigma的高斯補足。
+    """
+    sizes, achieved = box_sizes(sigma)
+    residual = math.sqrt(max(0.0, sigma * sigma - achieved * achieved))  # 盒狀濾波不足的標準差
+    if residual > 0.1:  # 摺積可以交換順序，先在uint8上補足(OpenCV的uint16高斯模糊慢很多)
+        arr = cv2.GaussianBlur(arr, (0, 0), residual)  # residual很小，核也很小
+    work = np.left_shift(arr, FRACTION_BITS, dtype=np.uint16)  # 保留小數位元，避免每次濾波取整累積誤差
+    for size in sizes:
+        work = cv2.blur(work, (size, size))  # 累加和計算，成本與寬度無關
+    return cv2.convertScaleAbs(work, alpha=1.0 / (1 << FRACTION_BITS))  # 四捨五入回uint8
+
+
+def _downsampled(arr, sigma, factor):
+    """
+    縮小factor倍後模糊再放大。縮小與放大本身也會模糊，因此在小圖上扣除它們的變異數。
+    """
+    height, width = arr.shape[:2]
+    pad_bottom, pad_right = -height % factor, -width % factor  # 補到factor的倍數，讓縮小後的格點與分塊處理一致
+    if pad_bottom or pad_right:
+        arr = cv2.copyMakeBorder(arr, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT_101)
+    small = cv2.resize(arr, (arr.shape[1] // factor, arr.shape[0] // factor), interpolation=cv2.INTER_AREA)
+    extra = factor * factor / 4.0  # 區域平均(約factor^2/12)與線性放大(約factor^2/6)增加的變異數
+    small = gaussian(small, math.sqrt(max(sigma * sigma - extra, 0.0)) / factor)
+    result = cv2.resize(small, (arr.shape[1], arr.shape[0]), interpolation=cv2.INTER_LINEAR)
+    return result[:height, :width] if pad_bottom or pad_right else result
+
+
+def blur(arr, factor, blur_type, scale=1.0):
+    """
+    依blur_type套用平均或高斯模糊。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    factor (float): 模糊比例因子，可以是小數。
+    blur_type (str): "average" 或 "gaussian"。
+    scale (float): 圖片相對於原始解析度的比例，代理圖會依此縮小模糊核，使預覽與最終輸出一致。
+    """
+    if blur_type == "average":
+        return average(arr, factor * scale)
+    if blur_type == "gaussian":
+        radius = factor * scale  # 核半徑
+        if radius <= 0.0:
+            return arr
+        if scale == 1.0 and float(factor).is_integer() and factor <= DIRECT_MAX_RADIUS:  # 與原本的呼叫相同(ksize不超過7時OpenCV使用固定的核)
+            return cv2.GaussianBlur(arr, (2 * int(factor) + 1, 2 * int(factor) + 1), 0)
+        return gaussian(arr, gaussian_sigma(factor, scale), int(math.ceil(radius)))
+    return arr
+
+
+def blur_radius(factor, blur_type, scale=1.0):
+    """
+    回傳blur使用的鄰域半徑(像素)，分塊處理時用來決定每塊需要額外讀取的邊界。
+
+    參數:
+    factor (float): 模糊比例因子。
+    blur_type (str): "average" 或 "gaussian"。
+    scale (float): 圖片相對於原始解析度的比例。
+    """
+    if blur_type == "average":
+        width = factor * scale
+        return int(math.ceil(width)) // 2 + 1 if width > 1.0 else 0  # 核寬度的一半(偶數核的錨點偏一格)
+    if blur_type == "gaussian":
+        if factor * scale <= 0.0:
+            return 0
+        sigma = gaussian_sigma(factor, scale)
+        if sigma <= DIRECT_MAX_SIGMA:
+            return int(math.ceil(factor * scale))  # 核大小為 2 * radius + 1
+        alignment = downsample_factor(sigma)
+        radius = int(math.ceil(4 * sigma)) + 2 * alignment  # 盒狀濾波串接與縮放的範圍都在4倍sigma內
+        return -(-radius // alignment) * alignment  # 對齊縮小的格點
+    return 0
+
+
+def blur_alignment(factor, blur_type, scale=1.0):
+    """
+    分塊處理時每塊(含鄰域)的起點必須對齊的像素數，使縮小後的格點與整張圖片處理一致。
+
+    參數:
+    factor (float): 模糊比例因子。
+    blur_type (str): "average" 或 "gaussian"。
+    scale (float): 圖片相對於原始解析度的比例。
+    """
+    if blur_type == "gaussian" and factor * scale > 0.0:
+        return downsample_factor(gaussian_sigma(factor, scale))
+    return 1
@@ -0,0 +1,131 @@
+"""
+亮度、對比度與飽和度的融合調整引擎。
+
+亮度與對比度合併成一張256項的查找表(LUT)，飽和度寫成一個3x4的色彩矩陣，
+兩者直接寫入同一個輸出緩衝區，取代ImageEnhance的三次完整混合。
+查找表重現了PIL逐步截斷與裁切的行為；飽和度以矩陣取代逐像素取整的灰階，
+因此與PIL結果每個通道的最大絕對誤差不超過 COLOR_TOLERANCE。
+
+輸入一律是(高, 寬, 3)的RGB陣列：讀取檔案時pipeline.to_array已將其他模式轉換為RGB，
+這裡沒有其他模式的退回路徑(包括ImageEnhance)。
+"""
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+COLOR_TOLERANCE = 2  # 與PIL ImageEnhance結果的最大絕對誤差(每通道)
+LUMA_WEIGHTS = (19595 / 65536.0, 38470 / 65536.0, 7471 / 65536.0)  # PIL轉灰階(L)使用的權重
+TRUNCATE_OFFSET = -0.4999  # 讓OpenCV的四捨五入等同PIL混合時的截斷
+
+
+def _blend_lut(degenerate, values, factor):
+    """
+    以PIL Image.blend的方式(單精度計算、裁切後截斷)混合查找表。
+
+    參數:
+    degenerate (float): 退化圖片的值(亮度為0，對比度為灰階平均值)。
+    values (numpy.ndarray): 目前查找表的值。
+    factor (float): 混合因子。
+    """
+    temp = np.float32(degenerate) + np.float32(factor) * (values.astype(np.float32) - np.float32(degenerate))  # 與PIL相同的單精度計算
+    return np.clip(temp, 0, 255).astype(np.uint8)  # 裁切後截斷
+
+
+def channel_histograms(arr):
+    """
+    計算每個通道的直方圖。分塊處理時可以把各塊的結果相加。
+
+    參數:
+    arr (numpy.ndarray): RGB圖片陣列(高, 寬, 3)。
+
+    回傳:
+    numpy.ndarray: (3, 256)的float64陣列。
+    """
+    return np.stack([cv2.calcHist([arr], [channel], None, [256], [0, 256]).ravel() for channel in range(3)]).astype(np.float64)
+
+
+def luma_mean(histograms, lut=None):
+    """
+    由各通道直方圖計算套用查找表後的灰階平均值，不需要產生灰階圖片。
+
+    參數:
+    histograms (numpy.ndarray): channel_histograms的結果。
+    lut (numpy.ndarray): 先套用在每個通道上的查找表，為None時不套用。
+
+    回傳:
+    float: 灰階平均值。
+    """
+    values = np.arange(256, dtype=np.float64) if lut is None else lut.astype(np.float64)  # 每個亮度值對應的輸出
+    pixels = histograms[0].sum()  # 像素總數
+    return float(np.asarray(LUMA_WEIGHTS) @ (histograms @ values)) / pixels  # 加權平均
+
+
+def build_tone_lut(arr, brightness, contrast, histograms=None):
+    """
+    建立合併亮度與對比度的查找表。
+
+    參數:
+    arr (numpy.ndarray): RGB圖片陣列，用於計算對比度的灰階平均值。
+    brightness (float): 亮度比例因子。
+    contrast (float): 對比度比例因子。
+    histograms (numpy.ndarray): 預先計算的通道直方圖(例如分塊累加的結果)，為None時由arr計算。
+
+    回傳:
+    numpy.ndarray: 256項的uint8查找表。
+    """
+    lut = np.arange(256, dtype=np.uint8)  # 恆等查找表
+    if brightness != 1.0:  # 亮度：與黑色混合
+        lut = _blend_lut(0.0, lut, brightness)
+    if contrast != 1.0:  # 對比度：與灰階平均值混合
+        if histograms is None:
+            histograms = channel_histograms(arr)  # 計算通道直方圖
+        mean = int(luma_mean(histograms, lut) + 0.5)  # 與PIL相同的四捨五入
+        lut = _blend_lut(float(mean), lut, contrast)
+    return lut
+
+
+def saturation_matrix(saturation):
+    """
+    建立飽和度的3x4色彩矩陣：out = s * x + (1 - s) * L(x)。
+
+    參數:
+    saturation (float): 飽和度比例因子。
+
+    回傳:
+    numpy.ndarray: 3x4的float32矩陣，最後一行為偏移量。
+    """
+    matrix = np.zeros((3, 4), dtype=np.float32)
+    matrix[:, :3] = (1.0 - saturation) * np.asarray(LUMA_WEIGHTS)[np.newaxis, :]  # 灰階成分
+    matrix[:, :3] += saturation * np.eye(3, dtype=np.float32)  # 原色成分
+    matrix[:, 3] = TRUNCATE_OFFSET  # 模擬PIL的截斷
+    return matrix
+
+
+def adjust_color(arr, brightness=1.0, contrast=1.0, saturation=1.0, out=None, tone_lut=None):
+    """
+    一次套用亮度、對比度與飽和度，結果與依序使用ImageEnhance相同(誤差見COLOR_TOLERANCE)。
+
+    參數:
+    arr (numpy.ndarray): RGB圖片陣列(高, 寬, 3)，uint8。
+    brightness (float): 亮度比例因子。
+    contrast (float): 對比度比例因子。
+    saturation (float): 飽和度比例因子。
+    out (numpy.ndarray): 輸出緩衝區，可與arr相同以原地處理，為None時配置新陣列。
+    tone_lut (numpy.ndarray): 預先建立的亮度/對比度查找表(分塊處理時使用整張圖片的結果)，為None時由arr建立。
+
+    回傳:
+    numpy.ndarray: 調整後的圖片陣列。
+    """
+    if out is None:
+        out = np.empty_like(arr)  # 配置輸出緩衝區
+    source = arr  # 下一個運算的輸入
+    if brightness != 1.0 or contrast != 1.0:  # 亮度與對比度：查找表
+        if tone_lut is None:
+            tone_lut = build_tone_lut(arr, brightness, contrast)  # 建立查找表
+        cv2.LUT(arr, tone_lut, dst=out)
+        source = out  # 飽和度接著在輸出上原地處理
+    if saturation != 1.0:  # 飽和度：色彩矩陣
+        cv2.transform(source, saturation_matrix(saturation), dst=out)
+    elif source is arr and out is not arr:  # 沒有任何調整
+        np.copyto(out, arr)
+    return out
@@ -0,0 +1,328 @@
+"""
+以檔案內容雜湊為鍵的磁碟快取，讓重新開啟資料夾或圖片時不必重新解碼。
+
+每個圖片檔以內容與修改時間的雜湊(content_key)識別，因此改名或複製的檔案也會命中，
+檔案被修改後則自動失效。快取的項目種類:
+
+- thumb：資料夾瀏覽列的縮圖(JPEG)。
+- preview：開啟圖片時先顯示的預覽(JPEG)，沒有快速解碼路徑的格式(PNG、TIFF)也能立即顯示。
+- render：某份編輯設定的完整解析度結果(.npy，以唯讀記憶體映射載入，不需要解碼)。
+
+總大小超過上限時依最近使用的順序淘汰(使用時更新檔案的修改時間，重新啟動後仍保留順序)。
+計算內容雜湊需要讀取整個檔案，因此以(路徑, 大小, 修改時間)記住算過的鍵，存在快取資料夾的index.json；
+索引中沒有的檔案可以用content_key_later在背景計算。
+"""
+import hashlib  # 導入hashlib，用於計算內容雜湊
+import json  # 導入JSON模組，用於保存鍵的索引
+import logging  # 導入日誌模組
+import os  # 導入os，用於處理路徑
+import threading  # 導入執行緒模組
+from collections import OrderedDict  # 導入有序字典，用於實作LRU
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import lazy_imports  # 導入延遲載入工具
+import pipeline  # 導入處理鏈模組
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+KIND_EXTENSIONS = {"thumb": ".jpg", "preview": ".jpg", "render": ".npy"}  # 各種項目的檔案格式
+JPEG_QUALITY = 90  # 縮圖與預覽的JPEG品質
+HASH_CHUNK = 1 << 20  # 計算雜湊時每次讀取的位元組數
+MAX_INDEX_ENTRIES = 20000  # index.json最多記住的檔案數
+
+
+def default_directory():
+    """
+    回傳預設的快取資料夾：可由環境變數IMAGE_EDITOR_CACHE_DIR指定，
+    否則Windows使用LOCALAPPDATA，其他系統使用XDG_CACHE_HOME或~/.cache。
+    """
+    directory = os.environ.get("IMAGE_EDITOR_CACHE_DIR")
+    if directory:
+        return directory
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "image_editor")
+
+
+def recipe_key(content_key, params):
+    """
+    回傳某張圖片套用某份編輯設定的結果的鍵。
+
+    參數:
+    content_key (str): 圖片的內容鍵。
+    params (dict): 濾鏡參數。
+    """
+    recipe = json.dumps(params, sort_keys=True)  # 參數順序不影響鍵
+    return hashlib.blake2b((content_key + recipe).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory=None, budget_bytes=1024 * 1024 * 1024):
+        """
+        初始化DiskCache類別，一個有大小上限的LRU磁碟快取。
+
+        參數:
+        directory (str): 快取資料夾，為None時使用default_directory()。
+        budget_bytes (int): 快取可使用的最大位元組數。
+        """
+        self.directory = directory or default_directory()  # 設置快取資料夾
+        self.budget_bytes = budget_bytes  # 設置大小上限
+        self.used_bytes = 0  # 目前已使用的位元組數
+        self._entries = OrderedDict()  # 檔名對應大小，依使用順序排列
+        self._keys = {}  # 絕對路徑對應(大小, 修改時間, 內容鍵)
+        self._keys_dirty = False  # 鍵的索引是否需要寫回
+        self._lock = threading.Lock()  # 保護項目與索引
+        self._writer = None  # 背景寫入用的執行緒，第一次使用時建立
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+        self._load_index()
+
+    def _scan(self):
+        """
+        讀取資料夾中現有的項目，依修改時間(上次使用時間)排列。
+        """
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                for item in os.scandir(entry.path):
+                    if item.is_file() and not item.name.endswith(".tmp"):
+                        stat = item.stat()
+                        found.append((stat.st_mtime, os.path.join(entry.name, item.name), stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.used_bytes += size
+        self._evict()  # 上限可能比上次執行時小
+
+    def _load_index(self):
+        """
+        讀取上次保存的鍵索引，檔案損毀時重新建立。
+        """
+        try:
+            with open(os.path.join(self.directory, "index.json"), encoding="utf-8") as file:
+                self._keys = {path: tuple(value) for path, value in json.load(file).items()}
+        except (OSError, ValueError):  # 第一次使用或檔案損毀
+            self._keys = {}
+
+    def flush(self):
+        """
+        將鍵索引寫回磁碟(先寫入暫存檔再取代，避免中斷時留下不完整的檔案)。
+        """
+        with self._lock:
+            if not self._keys_dirty:
+                return
+            keys = dict(self._keys)
+            self._keys_dirty = False
+        path = os.path.join(self.directory, "index.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(keys, file)
+        os.replace(path + ".tmp", path)
+
+    def known_key(self, path):
+        """
+        回傳索引中記住的內容鍵。只讀取檔案狀態，不讀取內容，可以在主執行緒呼叫。
+
+        參數:
+        path (str): 圖片路徑。
+
+        回傳:
+        str: 內容鍵，檔案沒有記錄或已變動時回傳None。
+        """
+        stat = os.stat(path)
+        with self._lock:
+            known = self._keys.get(os.path.abspath(path))
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:  # 檔案未變動
+            return known[2]
+        return None
+
+    def content_key(self, path):
+        """
+        回傳圖片檔的內容鍵(內容、大小與修改時間的雜湊)。
+        檔案未變動時直接使用索引中的鍵，不需要讀取檔案。
+
+        參數:
+        path (str): 圖片路徑。
+        """
+        key = self.known_key(path)
+        if key is not None:
+            return key
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}:".encode("ascii"), digest_size=16)
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK), b""):  # hashlib處理大區塊時會釋放GIL
+                digest.update(chunk)
+        key = digest.hexdigest()
+        with self._lock:
+            self._keys.pop(path, None)
+            self._keys[path] = (stat.st_size, stat.st_mtime_ns, key)  # 最近計算的放在最後
+            while len(self._keys) > MAX_INDEX_ENTRIES:  # 捨棄最早記住的檔案
+                del self._keys[next(iter(self._keys))]
+            self._keys_dirty = True
+        return key
+
+    def content_key_later(self, path):
+        """
+        在背景執行緒計算內容鍵(可能需要讀取整個檔案)，不阻塞呼叫端。
+
+        參數:
+        path (str): 圖片路徑。
+
+        回傳:
+        concurrent.futures.Future: 結果為內容鍵。
+        """
+        return self._background().submit(self.content_key, path)
+
+    @staticmethod
+    def _name(key, kind):
+        """
+        回傳項目的相對路徑，以鍵的前兩個字元分成子資料夾，避免單一資料夾的檔案過多。
+        """
+        return os.path.join(key[:2], key + "." + kind + KIND_EXTENSIONS[kind])
+
+    def get(self, key, kind):
+        """
+        取出快取的圖片，並將其標記為最近使用。
+
+        參數:
+        key (str): 內容鍵或recipe_key的結果。
+        kind (str): "thumb"、"preview"或"render"。
+
+        回傳:
+        numpy.ndarray: 唯讀的RGB陣列(render為記憶體映射)，不存在時回傳None。
+        """
+        name = self._name(key, kind)
+        with self._lock:
+            if name not in self._entries:  # 沒有命中
+                return None
+            self._entries.move_to_end(name)  # 標記為最近使用
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)  # 保存使用順序
+            if kind == "render":
+                return np.load(path, mmap_mode="r")  # 唯讀記憶體映射，不需要讀入整個檔案
+            with Image.open(path) as img:
+                return pipeline.to_array(img)
+        except (OSError, ValueError) as exc:  # 檔案被刪除或損毀
+            logger.warning("Disk cache entry unreadable: %s: %s", name, exc)  # 記錄警告訊息
+            self._discard(name)
+            return None
+
+    def contains(self, key, kind):
+        """
+        是否有此項目。
+        """
+        with self._lock:
+            return self._name(key, kind) in self._entries
+
+    def put(self, key, kind, arr):
+        """
+        存入圖片，超出上限時淘汰最久未使用的項目。
+
+        參數:
+        key (str): 內容鍵或recipe_key的結果。
+        kind (str): "thumb"、"preview"或"render"。
+        arr (numpy.ndarray): RGB陣列(可為記憶體映射)。
+        """
+        if arr.nbytes > self.budget_bytes:  # 單一項目超過上限則不快取
+            return
+        name = self._name(key, kind)
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as file:  # 先寫入暫存檔，完成後才出現在快取中
+            if kind == "render":
+                np.save(file, arr)
+            else:
+                pipeline.to_image(arr).save(file, "JPEG", quality=JPEG_QUALITY)
+        try:
+            os.replace(temporary, path)
+        except OSError as exc:  # 舊的檔案仍被映射(Windows)
+            logger.debug("Disk cache entry in use: %s: %s", name, exc)  # 記錄除錯訊息
+            os.remove(temporary)
+            return
+        size = os.path.getsize(path)
+        with self._lock:
+            self.used_bytes -= self._entries.pop(name, 0)  # 取代舊的項目
+            self._entries[name] = size
+            self.used_bytes += size
+        self._evict()
+
+    def put_later(self, key, kind, arr):
+        """
+        在背景執行緒存入圖片，不阻塞呼叫端。arr必須是唯讀陣列。
+
+        參數:
+        key (str): 內容鍵或recipe_key的結果。
+        kind (str): "thumb"、"preview"或"render"。
+        arr (numpy.ndarray): RGB陣列。
+        """
+        future = self._background().submit(self.put, key, kind, arr)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _background(self):
+        """
+        回傳背景寫入與計算雜湊共用的執行緒，第一次使用時建立。
+        """
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")  # 依序執行
+            return self._writer
+
+    @staticmethod
+    def _log_failure(future):
+        """
+        記錄背景寫入的錯誤(快取寫入失敗不影響編輯)。
+        """
+        if future.exception() is not None:
+            logger.warning("Disk cache write failed: %s", future.exception())  # 記錄警告訊息
+
+    def _evict(self):
+        """
+        淘汰最久未使用的項目直到不超過上限。
+        """
+        while True:
+            with self._lock:
+                if self.used_bytes <= self.budget_bytes or not self._entries:
+                    return
+                name, size = self._entries.popitem(last=False)  # 最久未使用的項目
+                self.used_bytes -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as exc:  # 仍被映射(Windows)，下次啟動時再淘汰
+                logger.debug("Disk cache eviction deferred: %s: %s", name, exc)  # 記錄除錯訊息
+
+    def _discard(self, name):
+        """
+        移除無法讀取的項目。
+        """
+        with self._lock:
+            self.used_bytes -= self._entries.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def set_budget(self, budget_bytes):
+        """
+        調整大小上限，必要時立即淘汰項目。
+
+        參數:
+        budget_bytes (int): 新的最大位元組數。
+        """
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def wait(self):
+        """
+        等待背景寫入完成並保存鍵索引，用於關閉程式前。
+        """
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        self.flush()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,366 @@
+"""
+在背景執行緒匯出圖片。
+
+同一次渲染結果可以同時寫成多個格式與尺寸(例如完整解析度PNG、網頁用JPEG與縮圖)，
+每個輸出在執行緒池中平行編碼(zlib、libjpeg與OpenCV縮放都會釋放GIL)，不需要重新執行處理鏈。
+完整解析度的渲染也可以作為同一次匯出的第一個步驟在執行緒池中執行，渲染完成後才送出編碼。
+編碼設定以預設組合(fast、balanced、small)在速度與檔案大小之間取捨，也可以逐項覆寫。
+進度透過widget.after輪詢交回主執行緒。
+"""
+import logging  # 導入日誌模組
+import os  # 導入os，用於處理路徑
+import threading  # 導入執行緒模組
+import time  # 導入時間模組
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+import instrumentation  # 導入效能量測層
+import pipeline  # 導入處理鏈模組
+import tiled  # 導入分塊處理模組(串流寫入PNG與TIFF)
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP", ".tif": "TIFF", ".tiff": "TIFF", ".bmp": "BMP"}  # 副檔名對應的格式
+ENCODER_PRESETS = {  # 各格式的編碼設定，依速度與檔案大小取捨
+    "fast": {
+        "PNG": {"compress_level": 1},  # 壓縮最快，檔案較大
+        "JPEG": {"quality": 90},
+        "WEBP": {"quality": 85, "method": 0},
+        "TIFF": {},  # 不壓縮
+    },
+    "balanced": {
+        "PNG": {"compress_level": 6},
+        "JPEG": {"quality": 90, "optimize": True},  # 最佳化霍夫曼表，檔案小約5%，幾乎不增加時間
+        "WEBP": {"quality": 85, "method": 4},
+        "TIFF": {},
+    },
+    "small": {
+        "PNG": {"compress_level": 9},
+        "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+        "WEBP": {"quality": 80, "method": 6},
+        "TIFF": {"compression": "tiff_adobe_deflate"},
+    },
+}
+DEFAULT_PRESET = "balanced"  # 預設的編碼設定
+WEB_SIZE = 2048  # 網頁用圖片的最長邊
+THUMBNAIL_SIZE = 256  # 縮圖的最長邊
+RENDER_SHARE = 0.5  # 含渲染步驟的匯出中，渲染佔整體進度的比例
+
+_compression_pool = None  # PNG平行壓縮的執行緒池(與匯出的執行緒池分開，避免互相等待)
+_compression_lock = threading.Lock()  # 保護執行緒池的建立
+
+
+def compression_pool():
+    """
+    回傳PNG平行壓縮使用的執行緒池，只有一個CPU時回傳None(改用單一串流壓縮)。
+    """
+    global _compression_pool
+    workers = os.cpu_count() or 1
+    if workers < 2:
+        return None
+    with _compression_lock:
+        if _compression_pool is None:
+            _compression_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="png-deflate")
+    return _compression_pool
+
+
+class ExportTarget:
+    def __init__(self, path, max_size=None, preset=DEFAULT_PRESET, options=None):
+        """
+        初始化ExportTarget類別，描述一個輸出檔案。
+
+        參數:
+        path (str): 輸出路徑，格式由副檔名決定。
+        max_size (int): 輸出的最長邊，圖片較大時縮小，為None時保持原尺寸。
+        preset (str): 編碼設定，"fast"、"balanced"或"small"。
+        options (dict): 覆寫預設的編碼參數(PIL的save參數，PNG另外支援compress_level)。
+        """
+        self.path = path  # 輸出路徑
+        self.format = FORMATS.get(os.path.splitext(path)[1].lower(), "PNG")  # 輸出格式
+        self.max_size = max_size  # 最長邊
+        self.options = dict(ENCODER_PRESETS[preset].get(self.format, {}))  # 預設的編碼參數
+        self.options.update(options or {})
+
+    def output_size(self, size):
+        """
+        回傳輸出的(寬, 高)。
+
+        參數:
+        size (tuple): 輸入的(寬, 高)。
+        """
+        width, height = size
+        if not self.max_size or max(width, height) <= self.max_size:  # 不需要縮小
+            return size
+        ratio = self.max_size / max(width, height)  # 縮小比例
+        return max(1, int(round(width * ratio))), max(1, int(round(height * ratio)))
+
+
+def export_set(directory, stem, preset=DEFAULT_PRESET):
+    """
+    常用的一組輸出：完整解析度PNG、網頁用JPEG與縮圖JPEG。
+
+    參數:
+    directory (str): 輸出資料夾。
+    stem (str): 檔名(不含副檔名)。
+    preset (str): 編碼設定。
+
+    回傳:
+    list: ExportTarget串列。
+    """
+    return [
+        ExportTarget(os.path.join(directory, stem + ".png"), preset=preset),
+        ExportTarget(os.path.join(directory, stem + "_web.jpg"), WEB_SIZE, preset),
+        ExportTarget(os.path.join(directory, stem + "_thumb.jpg"), THUMBNAIL_SIZE, preset),
+    ]
+
+
+def export(arr, target, progress=None):
+    """
+    將陣列寫成一個輸出檔案。PNG(未要求optimize時)與未壓縮的TIFF逐條串流寫入並回報進度，
+    PNG的各條在多個CPU上平行壓縮；其他格式交由PIL編碼。先寫入暫存檔(路徑加上.partial)，
+    完成後才改名，失敗或中斷時不會留下不完整的輸出或覆蓋原本的檔案。
+
+    參數:
+    arr (numpy.ndarray): RGB陣列(可為memmap)。
+    target (ExportTarget): 輸出設定。
+    progress (callable): 以完成比例(0到1)呼叫。
+
+    回傳:
+    dict: 輸出路徑、尺寸、秒數與檔案大小。
+    """
+    start = time.perf_counter()
+    temp_path = target.path + ".partial"  # 寫入中的暫存檔
+    try:
+        with instrumentation.measure("export", arr) as span:
+            size = target.output_size(pipeline.array_size(arr))  # 輸出尺寸
+            arr = span.result(pipeline.resize_to(arr, size))  # 縮小(INTER_AREA)，尺寸相同時不複製
+            options = dict(target.options)
+            if target.format == "PNG" and not options.get("optimize"):
+                tiled.write_png(arr, temp_path, compress_level=options.get("compress_level", 6), progress=progress,
+                                executor=compression_pool())  # 串流寫入，平行壓縮
+            elif target.format == "TIFF" and not options.get("compression"):
+                tiled.write_tiff(arr, temp_path, progress=progress)  # 串流寫入
+            else:
+                pipeline.to_image(arr).save(temp_path, target.format, **options)  # 在檔案邊界才轉換為PIL(格式不能由暫存檔的副檔名判斷)
+        os.replace(temp_path, target.path)  # 完成後改名
+    except BaseException:  # 包含中斷，不留下不完整的暫存檔
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if progress is not None:
+        progress(1.0)
+    return {"path": target.path, "size": size, "seconds": time.perf_counter() - start,
+            "bytes": os.path.getsize(target.path)}
+
+
+class ExportJob:
+    def __init__(self, targets, futures, weights, fractions, render_future=None):
+        """
+        初始化ExportJob類別，代表一次送出的一組輸出。
+
+        參數:
+        targets (list): ExportTarget串列。
+        futures (list): 每個輸出的Future，有渲染步驟時由渲染完成前的背景執行緒填入。
+        weights (list): 每個輸出的像素數，用於計算整體進度。
+        fractions (list): 每個輸出的完成比例，由背景執行緒更新。
+        render_future (concurrent.futures.Future): 渲染步驟，直接以陣列送出時為None。
+        """
+        self.targets = targets  # 輸出設定
+        self.futures = futures  # 背景工作
+        self.weights = weights  # 進度權重
+        self.fractions = fractions  # 完成比例
+        self.render_future = render_future  # 渲染步驟
+
+    def progress(self):
+        """
+        回傳整體完成比例(0到1)。有渲染步驟時渲染佔RENDER_SHARE，編碼佔其餘部分。
+        """
+        total = sum(self.weights)
+        encoded = sum(weight * fraction for weight, fraction in zip(self.weights, self.fractions)) / total if total else 0.0
+        if self.render_future is None:
+            return encoded if total else 1.0
+        return RENDER_SHARE * self.render_future.done() + (1.0 - RENDER_SHARE) * encoded
+
+    def steps(self):
+        """
+        回傳(已完成的步驟數, 總步驟數)，渲染與每個輸出各算一個步驟。
+        """
+        completed = sum(future.done() for future in self.futures)
+        if self.render_future is None:
+            return completed, len(self.targets)
+        return completed + self.render_future.done(), len(self.targets) + 1
+
+    def done(self):
+        """
+        是否所有步驟都已完成。渲染步驟在完成前就已送出編碼，因此渲染完成時futures已經填入。
+        """
+        if self.render_future is not None and not self.render_future.done():
+            return False
+        return all(future.done() for future in self.futures)
+
+    def wait(self):
+        """
+        等待所有步驟完成(錯誤在results中回報)。
+        """
+        if self.render_future is not None:
+            self.render_future.exception()
+        for future in self.futures:
+            future.exception()
+
+    def results(self):
+        """
+        回傳每個輸出的結果字典，失敗的輸出包含error欄位。渲染失敗時每個輸出都回報渲染的錯誤。
+        """
+        if self.render_future is not None and self.render_future.exception() is not None:
+            return [{"path": target.path, "error": str(self.render_future.exception())} for target in self.targets]
+        results = []
+        for target, future in zip(self.targets, self.futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:  # 回報編碼錯誤
+                results.append({"path": target.path, "error": str(exc)})
+        return results
+
+
+class Exporter:
+    def __init__(self, widget, on_progress=None, on_done=None, max_workers=None, poll_ms=50):
+        """
+        初始化Exporter類別，在背景執行緒池中編碼輸出檔案。
+
+        參數:
+        widget (tk.Widget): 用於呼叫after的Tk元件。
+        on_progress (callable): 在主執行緒呼叫，參數為(整體完成比例, 已完成數量, 總數量)。
+        on_done (callable): 在主執行緒呼叫，參數為結果字典的串列。
+        max_workers (int): 同時編碼的輸出數量，為None時依CPU數量決定。
+        poll_ms (int): 主執行緒檢查進度的間隔(毫秒)。
+        """
+        self.widget = widget  # 設置Tk元件
+        self.on_progress = on_progress  # 設置進度回呼
+        self.on_done = on_done  # 設置完成回呼
+        self.poll_ms = poll_ms  # 設置輪詢間隔
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                            thread_name_prefix="exporter")  # 編碼用的執行緒池
+        self._jobs = []  # 進行中的匯出
+        self._lock = threading.Lock()  # 保護進行中的匯出串列
+
+    def submit(self, arr, targets):
+        """
+        開始在背景寫出一組輸出。arr必須是唯讀陣列(處理鏈的結果)，之後的編輯不會影響匯出內容。
+        必須在主執行緒呼叫。
+
+        參數:
+        arr (numpy.ndarray): 完整解析度的渲染結果。
+        targets (list): ExportTarget串列。
+
+        回傳:
+        ExportJob: 此次匯出。
+        """
+        job = ExportJob(targets, [], [], [])
+        self._encode(job, arr)
+        self._track(job)
+        return job
+
+    def submit_render(self, render, targets):
+        """
+        在執行緒池中先渲染再寫出一組輸出，主執行緒不需要等待完整解析度的處理鏈。
+        必須在主執行緒呼叫。
+
+        參數:
+        render (callable): 在背景執行緒呼叫，回傳完整解析度的唯讀陣列；需要的狀態必須在送出前擷取。
+        targets (list): ExportTarget串列。
+
+        回傳:
+        ExportJob: 此次匯出，render_future的結果為渲染的陣列。
+        """
+        job = ExportJob(targets, [], [], [])
+
+        def render_and_encode():
+            arr = render()
+            self._encode(job, arr)  # 只送出編碼不等待，單一執行緒的執行緒池也不會互相等待
+            return arr
+        job.render_future = self._executor.submit(render_and_encode)
+        self._track(job)
+        return job
+
+    def _encode(self, job, arr):
+        """
+        為每個輸出送出編碼工作，可在背景執行緒呼叫。先設定進度再填入futures，輪詢不會看到不一致的狀態。
+        """
+        size = pipeline.array_size(arr)
+        fractions = [0.0] * len(job.targets)  # 各輸出的完成比例
+        job.fractions = fractions
+        job.weights = [width * height for width, height in (target.output_size(size) for target in job.targets)]  # 依輸出像素數計算進度
+        job.futures = [self._executor.submit(export, arr, target, self._progress_setter(fractions, index))
+                       for index, target in enumerate(job.targets)]
+
+    def _track(self, job):
+        """
+        加入進行中的匯出，必要時開始輪詢。
+        """
+        with self._lock:
+            first = not self._jobs
+            self._jobs.append(job)
+        if first:  # 開始輪詢
+            self.widget.after(self.poll_ms, self._poll)
+
+    def is_busy(self):
+        """
+        是否有尚未完成的匯出。
+        """
+        with self._lock:
+            return bool(self._jobs)
+
+    def wait(self):
+        """
+        等待所有匯出完成並在呼叫端交回結果，用於關閉程式前。
+        """
+        with self._lock:
+            jobs, self._jobs = self._jobs, []
+        for job in jobs:
+            job.wait()  # 等待完成(錯誤在results中回報)
+            self._finish(job)
+
+    @staticmethod
+    def _progress_setter(fractions, index):
+        """
+        回傳背景執行緒用來更新某個輸出進度的函式(串列元素的指定是原子操作)。
+        """
+        def set_progress(fraction):
+            fractions[index] = fraction
+        return set_progress
+
+    def _finish(self, job):
+        """
+        記錄結果並呼叫完成回呼。
+        """
+        results = job.results()
+        for result in results:
+            if "error" in result:
+                logger.error("Export failed: %s: %s", result["path"], result["error"])  # 記錄錯誤
+            else:
+                logger.info("Exported %s (%dx%d, %.1f ms, %d bytes)", result["path"], result["size"][0], result["size"][1],
+                            result["seconds"] * 1000, result["bytes"])  # 記錄輸出
+        if self.on_done is not None:
+            self.on_done(results)
+
+    def _poll(self):
+        """
+        在主執行緒回報進度並交回完成的匯出。
+        """
+        with self._lock:
+            jobs = list(self._jobs)
+        finished = [job for job in jobs if job.done()]
+        with self._lock:
+            self._jobs = [job for job in self._jobs if job not in finished]
+            remaining = list(self._jobs)
+        for job in finished:
+            self._finish(job)
+        active = remaining or finished  # 全部完成時回報剛完成的匯出
+        if self.on_progress is not None and active:
+            steps = [job.steps() for job in active]
+            completed, total = sum(done for done, _ in steps), sum(count for _, count in steps)
+            fraction = sum(job.progress() for job in active) / len(active)
+            self.on_progress(1.0 if not remaining else fraction, completed, total)
+        if remaining:
+            self.widget.after(self.poll_ms, self._poll)
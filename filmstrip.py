@@ -0,0 +1,191 @@
+"""
+資料夾瀏覽列：以一排縮圖顯示資料夾中的圖片，點選即可開啟。
+
+縮圖在背景執行緒池中產生(EXIF縮圖或JPEG縮小解碼)，並存入磁碟快取；
+重新開啟同一個資料夾時只需要讀取快取中的小JPEG，幾乎立即顯示。
+結果透過widget.after輪詢交回主執行緒，切換資料夾時尚未開始的工作會被取消。
+"""
+import logging  # 導入日誌模組
+import os  # 導入os，用於處理路徑
+import time  # 導入時間模組
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+from PIL import ImageTk  # 導入PIL庫中的ImageTk
+
+import batch  # 導入批次處理模組(列出資料夾中的圖片)
+import image_loader  # 導入快速開啟圖片模組
+import pipeline  # 導入處理鏈模組
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+THUMBNAIL_SIZE = 128  # 縮圖的最長邊
+PADDING = 6  # 縮圖之間的間距
+LABEL_HEIGHT = 16  # 檔名文字的高度
+
+
+class Filmstrip:
+    def __init__(self, canvas, cache, on_select, thumb_size=THUMBNAIL_SIZE, max_workers=None, poll_ms=30):
+        """
+        初始化Filmstrip類別。
+
+        參數:
+        canvas (tk.Canvas): 繪製縮圖的畫布(水平捲動)。
+        cache (disk_cache.DiskCache): 磁碟快取，為None時每次都重新產生縮圖。
+        on_select (callable): 點選縮圖時在主執行緒呼叫，參數為圖片路徑。
+        thumb_size (int): 縮圖的最長邊。
+        max_workers (int): 同時產生縮圖的執行緒數，為None時依CPU數量決定。
+        poll_ms (int): 主執行緒檢查結果的間隔(毫秒)。
+        """
+        self.canvas = canvas  # 設置畫布
+        self.cache = cache  # 設置磁碟快取
+        self.on_select = on_select  # 設置點選回呼
+        self.thumb_size = thumb_size  # 設置縮圖大小
+        self.poll_ms = poll_ms  # 設置輪詢間隔
+        self.paths = []  # 目前資料夾的圖片路徑
+        self.selected = None  # 目前選擇的索引
+        self._photos = {}  # 索引對應PhotoImage(保持引用，避免被垃圾回收)
+        self._pending = []  # 尚未顯示的(索引, Future)
+        self._generation = 0  # 每次開啟資料夾遞增，丟棄舊資料夾的結果
+        self._opened = None  # 開始開啟資料夾的時間
+        self._hits = 0  # 來自磁碟快取的縮圖數量
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                            thread_name_prefix="thumbnail")  # 產生縮圖用的執行緒池
+        canvas.configure(height=thumb_size + 2 * PADDING + LABEL_HEIGHT)
+        canvas.bind("<Button-1>", self._on_click)
+        canvas.bind("<MouseWheel>", lambda event: canvas.xview_scroll(-1 if event.delta > 0 else 1, "units"))  # 滾輪水平捲動
+
+    def open_folder(self, directory):
+        """
+        顯示資料夾中的圖片，縮圖在背景產生。必須在主執行緒呼叫。
+
+        參數:
+        directory (str): 資料夾路徑。
+        """
+        for _, future in self._pending:
+            future.cancel()  # 取消上一個資料夾尚未開始的工作
+        self._generation += 1
+        self._opened = time.perf_counter()
+        self._hits = 0
+        self.paths = [os.path.join(directory, name) for name in batch.find_images(directory)]  # 依名稱排序
+        self.selected = None
+        self._photos = {}
+        self.canvas.delete("all")
+        slot = self.thumb_size + PADDING  # 每格的寬度
+        for index, path in enumerate(self.paths):  # 先畫出佔位框與檔名
+            left = PADDING + index * slot
+            self.canvas.create_rectangle(left, PADDING, left + self.thumb_size, PADDING + self.thumb_size,
+                                         outline="#555", tags=("slot", f"slot{index}"))
+            self.canvas.create_text(left + self.thumb_size / 2, PADDING + self.thumb_size + LABEL_HEIGHT / 2,
+                                    text=os.path.basename(path)[:18], fill="#ddd", font=("Consolas", 8))
+        self.canvas.configure(scrollregion=(0, 0, PADDING + len(self.paths) * slot, 0))
+        self.canvas.xview_moveto(0)
+        self._pending = [(index, self._executor.submit(self._load_thumbnail, path)) for index, path in enumerate(self.paths)]
+        if self._pending:
+            self.canvas.after(self.poll_ms, self._poll, self._generation)
+        logger.debug("Folder opened: %s (%d images)", directory, len(self.paths))  # 記錄除錯訊息
+
+    def _load_thumbnail(self, path):
+        """
+        背景執行緒中取得一張縮圖：先查磁碟快取，沒有時產生並存入快取。
+
+        回傳:
+        tuple: (縮圖陣列, 是否來自快取)。
+        """
+        if self.cache is None:
+            return image_loader.open_thumbnail(path, self.thumb_size), False
+        key = self.cache.content_key(path)  # 檔案未變動時不需要讀取內容
+        thumbnail = self.cache.get(key, "thumb")
+        if thumbnail is not None:
+            return thumbnail, True
+        thumbnail = image_loader.open_thumbnail(path, self.thumb_size)
+        self.cache.put(key, "thumb", thumbnail)  # 已在背景執行緒，直接寫入
+        return thumbnail, False
+
+    def _poll(self, generation):
+        """
+        在主執行緒顯示已完成的縮圖。
+
+        參數:
+        generation (int): 送出工作時的資料夾編號。
+        """
+        if generation != self._generation:  # 已開啟其他資料夾
+            return
+        remaining = []
+        for index, future in self._pending:
+            if not future.done():
+                remaining.append((index, future))
+                continue
+            try:
+                thumbnail, cached = future.result()
+            except Exception as exc:  # 無法讀取的圖片
+                logger.warning("Thumbnail failed: %s: %s", self.paths[index], exc)  # 記錄警告訊息
+                continue
+            self._hits += cached
+            self._show(index, thumbnail)
+        self._pending = remaining
+        if remaining:
+            self.canvas.after(self.poll_ms, self._poll, generation)
+            return
+        logger.info("Folder thumbnails ready in %.1f ms (%d images, %d from disk cache)",
+                    (time.perf_counter() - self._opened) * 1000, len(self.paths), self._hits)  # 記錄開啟時間
+        if self.cache is not None:
+            self.cache.flush()  # 保存內容鍵，下次開啟不需要重新計算雜湊
+
+    def _show(self, index, thumbnail):
+        """
+        在對應的格子中央顯示縮圖。
+        """
+        photo = ImageTk.PhotoImage(pipeline.to_image(thumbnail))  # 轉換為Tkinter格式
+        self._photos[index] = photo
+        left = PADDING + index * (self.thumb_size + PADDING)
+        self.canvas.create_image(left + self.thumb_size / 2, PADDING + self.thumb_size / 2, image=photo, tags=(f"thumb{index}",))
+        self.canvas.tag_raise("selected")  # 選擇框保持在最上層
+
+    def _on_click(self, event):
+        """
+        點選縮圖時開啟對應的圖片。
+        """
+        index = int(self.canvas.canvasx(event.x) - PADDING) // (self.thumb_size + PADDING)  # 點選的格子
+        if 0 <= index < len(self.paths):
+            self.select(index)
+
+    def select(self, index):
+        """
+        選擇並開啟第index張圖片。
+
+        參數:
+        index (int): 圖片索引，超出範圍時不處理。
+        """
+        if not 0 <= index < len(self.paths):
+            return
+        self.selected = index
+        self.canvas.delete("selected")
+        left = PADDING + index * (self.thumb_size + PADDING)
+        self.canvas.create_rectangle(left - 2, PADDING - 2, left + self.thumb_size + 2, PADDING + self.thumb_size + 2,
+                                     outline="#4a90e2", width=3, tags=("selected",))  # 選擇框
+        total = PADDING + len(self.paths) * (self.thumb_size + PADDING)
+        first, last = self.canvas.xview()
+        if left / total < first or (left + self.thumb_size) / total > last:  # 捲動到可見範圍
+            self.canvas.xview_moveto(max(0.0, (left - PADDING) / total))
+        self.on_select(self.paths[index])
+
+    def next(self):
+        """
+        開啟下一張圖片。
+        """
+        self.select(0 if self.selected is None else self.selected + 1)
+
+    def previous(self):
+        """
+        開啟上一張圖片。
+        """
+        self.select(0 if self.selected is None else self.selected - 1)
+
+    def close(self):
+        """
+        取消尚未開始的工作並保存內容鍵，用於關閉程式前。
+        """
+        self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.cache is not None:
+            self.cache.flush()
@@ -0,0 +1,142 @@
+import math  # 導入數學模組
+
+import lazy_imports  # 導入延遲載入工具
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+
+def rotation_matrix(width, height, angle):
+    """
+    計算與PIL的rotate(-angle, expand=True)相同的旋轉矩陣與擴展後尺寸。
+
+    參數:
+    width (int): 輸入寬度。
+    height (int): 輸入高度。
+    angle (float): 順時針旋轉角度。
+
+    回傳:
+    tuple: (3x3矩陣, (輸出寬, 輸出高))。矩陣將輸出的連續座標(像素邊緣為整數)對應回輸入座標。
+    """
+    radians = math.radians(angle % 360)  # 轉換為弧度
+    cos, sin = round(math.cos(radians), 15), round(math.sin(radians), 15)  # 與PIL相同的捨入
+    center_x, center_y = width / 2.0, height / 2.0  # 旋轉中心
+    offset_x = cos * -center_x + sin * -center_y + center_x  # 平移量x
+    offset_y = -sin * -center_x + cos * -center_y + center_y  # 平移量y
+    corners = ((0, 0), (width, 0), (width, height), (0, height))  # 四個角點
+    xs = [cos * x + sin * y + offset_x for x, y in corners]  # 轉換後的角點x
+    ys = [-sin * x + cos * y + offset_y for x, y in corners]  # 轉換後的角點y
+    new_width = math.ceil(max(xs)) - math.floor(min(xs))  # 擴展後的寬度
+    new_height = math.ceil(max(ys)) - math.floor(min(ys))  # 擴展後的高度
+    shift_x, shift_y = -(new_width - width) / 2.0, -(new_height - height) / 2.0  # 擴展後的輸出原點
+    offset_x, offset_y = cos * shift_x + sin * shift_y + offset_x, -sin * shift_x + cos * shift_y + offset_y  # 擴展後的平移量
+    matrix = np.array([[cos, sin, offset_x], [-sin, cos, offset_y], [0.0, 0.0, 1.0]])
+    return matrix, (new_width, new_height)
+
+
+def flip_matrix(width, height, horizontal, vertical):
+    """
+    計算翻轉的矩陣(輸出座標對應回輸入座標)。
+
+    參數:
+    width (int): 圖片寬度。
+    height (int): 圖片高度。
+    horizontal (bool): 是否水平翻轉。
+    vertical (bool): 是否垂直翻轉。
+    """
+    matrix = np.eye(3)
+    if horizontal:
+        matrix[0, 0], matrix[0, 2] = -1.0, width  # x -> width - x
+    if vertical:
+        matrix[1, 1], matrix[1, 2] = -1.0, height  # y -> height - y
+    return matrix
+
+
+def scale_matrix(width, height, new_width, new_height):
+    """
+    計算縮放的矩陣(輸出座標對應回輸入座標)。
+
+    參數:
+    width (int): 輸入寬度。
+    height (int): 輸入高度。
+    new_width (int): 輸出寬度。
+    new_height (int): 輸出高度。
+    """
+    return np.diag([width / new_width, height / new_height, 1.0])
+
+
+def compose(width, height, params, scale=1.0):
+    """
+    將旋轉、翻轉與調整大小組合成一個仿射矩陣，順序與處理鏈相同。
+
+    參數:
+    width (int): 輸入寬度。
+    height (int): 輸入高度。
+    params (dict): 濾鏡參數，使用current_angle、翻轉狀態與resized_width/resized_height。
+    scale (float): 輸入相對於原始解析度的比例，用於換算調整大小的目標尺寸。
+
+    回傳:
+    tuple: (3x3矩陣, (輸出寬, 輸出高))，矩陣將輸出連續座標對應回輸入連續座標。
+    """
+    matrix = np.eye(3)  # 輸出到輸入的累積矩陣
+    size = (width, height)  # 目前尺寸
+    if params["current_angle"] % 360 != 0:  # 旋轉
+        rotation, size = rotation_matrix(width, height, params["current_angle"])
+        matrix = matrix @ rotation
+    if params["is_flipped_horizontally"] or params["is_flipped_vertically"]:  # 翻轉
+        matrix = matrix @ flip_matrix(size[0], size[1], params["is_flipped_horizontally"], params["is_flipped_vertically"])
+    if params["resized_width"] and params["resized_height"]:  # 調整大小
+        new_size = (max(1, int(round(params["resized_width"] * scale))), max(1, int(round(params["resized_height"] * scale))))
+        matrix = matrix @ scale_matrix(size[0], size[1], new_size[0], new_size[1])
+        size = new_size
+    return matrix, size
+
+
+def to_opencv(matrix):
+    """
+    將連續座標(像素邊緣為整數)的矩陣轉換為OpenCV使用的像素中心座標，回傳2x3矩陣。
+    in_cv = M * (out_cv + 0.5) - 0.5
+
+    參數:
+    matrix (numpy.ndarray): 3x3矩陣。
+    """
+    linear = matrix[:2, :2]  # 線性部分
+    offset = matrix[:2, 2] + linear @ np.array([0.5, 0.5]) - 0.5  # 半像素平移
+    return np.hstack([linear, offset[:, np.newaxis]])
+
+
+def output_scale(matrix):
+    """
+    回傳輸出相對於輸入的縮放倍率(每個方向)，小於1表示縮小。
+
+    參數:
+    matrix (numpy.ndarray): 輸出到輸入的矩陣。
+    """
+    step_x = math.hypot(matrix[0, 0], matrix[1, 0])  # 輸出x方向移動一個像素時輸入移動的距離
+    step_y = math.hypot(matrix[0, 1], matrix[1, 1])  # 輸出y方向移動一個像素時輸入移動的距離
+    return 1.0 / step_x, 1.0 / step_y
+
+
+def quarter_turns(angle):
+    """
+    角度為90度的倍數時回傳順時針轉動的次數(0到3)，否則回傳None。
+
+    參數:
+    angle (float): 順時針旋轉角度。
+    """
+    angle = angle % 360  # 正規化角度
+    return int(angle // 90) if angle % 90 == 0 else None
+
+
+def prefilter_sigmas(matrix):
+    """
+    縮小時避免鋸齒的高斯預濾波強度(輸入座標的sigma)，不縮小的方向為0。
+
+    參數:
+    matrix (numpy.ndarray): 輸出到輸入的矩陣。
+
+    回傳:
+    tuple: (sigma_x, sigma_y)。
+    """
+    scale_x, scale_y = output_scale(matrix)  # 輸出相對於輸入的倍率
+    sigma_x = 0.5 * math.sqrt(1.0 / scale_x ** 2 - 1.0) if scale_x < 1.0 else 0.0
+    sigma_y = 0.5 * math.sqrt(1.0 / scale_y ** 2 - 1.0) if scale_y < 1.0 else 0.0
+    return sigma_x, sigma_y
@@ -0,0 +1,210 @@
+"""
+復原/重做歷史紀錄。
+
+每一步只記錄有變動的參數(變動前與變動後的值)，因此步驟本身幾乎不佔記憶體。
+渲染較慢的狀態另外保存一張縮小並以zlib壓縮的快照，復原時可以立即顯示，
+不必等處理鏈重新計算；快照的總大小受記憶體上限限制，超過時先捨棄離目前
+位置最遠的快照(步驟本身保留，只是復原時需要重新計算)。
+"""
+import time  # 導入時間模組，用於合併連續的滑桿事件
+import zlib  # 導入zlib，用於壓縮快照
+
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+MAX_STEPS = 200  # 最多保留的步驟數
+MERGE_SECONDS = 1.0  # 同一組參數在此時間內連續變動時合併為一步(拖動滑桿)
+SNAPSHOT_SIZE = 1024  # 快照的最長邊
+COMPRESSION_LEVEL = 1  # zlib壓縮等級，快照需要快速建立與還原
+
+
+class Snapshot:
+    def __init__(self, arr, scale, max_size=SNAPSHOT_SIZE):
+        """
+        初始化Snapshot類別，縮小並壓縮渲染結果。
+
+        參數:
+        arr (numpy.ndarray): 渲染結果(RGB陣列)。
+        scale (float): arr相對於完整解析度的比例。
+        max_size (int): 快照的最長邊，較大的圖片會先縮小。
+        """
+        height, width = arr.shape[:2]
+        ratio = min(1.0, max_size / max(width, height))  # 縮小比例
+        if ratio < 1.0:
+            arr = cv2.resize(arr, (max(1, round(width * ratio)), max(1, round(height * ratio))), interpolation=cv2.INTER_AREA)
+        self.shape = arr.shape  # 快照陣列的形狀
+        self.scale = scale * arr.shape[1] / width  # 快照相對於完整解析度的比例
+        self.data = zlib.compress(np.ascontiguousarray(arr).data, COMPRESSION_LEVEL)  # 壓縮後的像素
+
+    @property
+    def nbytes(self):
+        """
+        快照佔用的位元組數。
+        """
+        return len(self.data)
+
+    def to_array(self):
+        """
+        解壓縮快照，回傳唯讀的RGB陣列。
+        """
+        return np.frombuffer(zlib.decompress(self.data), dtype=np.uint8).reshape(self.shape)  # frombuffer的結果本身唯讀
+
+
+class HistoryEntry:
+    def __init__(self, changes):
+        """
+        初始化HistoryEntry類別。
+
+        參數:
+        changes (dict): 參數名稱對應(變動前, 變動後)的值。
+        """
+        self.changes = changes  # 參數變動
+        self.snapshot = None  # 此步驟之後狀態的快照
+        self.time = time.monotonic()  # 最後一次變動的時間
+
+
+class History:
+    def __init__(self, budget_bytes=64 * 1024 * 1024, max_steps=MAX_STEPS, merge_seconds=MERGE_SECONDS):
+        """
+        初始化History類別。
+
+        參數:
+        budget_bytes (int): 所有快照可使用的記憶體上限(位元組)。
+        max_steps (int): 最多保留的步驟數，超過時捨棄最舊的步驟。
+        merge_seconds (float): 同一組參數連續變動時合併為一步的時間。
+        """
+        self.budget_bytes = budget_bytes  # 記憶體上限
+        self.max_steps = max_steps  # 步驟上限
+        self.merge_seconds = merge_seconds  # 合併時間
+        self.nbytes = 0  # 目前所有快照的大小
+        self.reset()
+
+    def reset(self):
+        """
+        清除所有步驟，只保留代表初始狀態的第一筆。
+        """
+        self.entries = [HistoryEntry({})]  # 第0筆為初始狀態
+        self.index = 0  # 目前狀態的位置
+        self.nbytes = 0
+
+    def current(self):
+        """
+        回傳目前狀態的步驟。
+        """
+        return self.entries[self.index]
+
+    def can_undo(self):
+        """
+        是否有可以復原的步驟。
+        """
+        return self.index > 0
+
+    def can_redo(self):
+        """
+        是否有可以重做的步驟。
+        """
+        return self.index < len(self.entries) - 1
+
+    def record(self, changes):
+        """
+        記錄一步參數變動，並捨棄可以重做的步驟。
+        與上一步變動相同的參數且間隔很短時(拖動滑桿)合併成同一步。
+
+        參數:
+        changes (dict): 參數名稱對應(變動前, 變動後)的值。
+
+        回傳:
+        HistoryEntry: 目前狀態的步驟。
+        """
+        for entry in self.entries[self.index + 1:]:  # 捨棄可以重做的步驟
+            self._drop_snapshot(entry)
+        del self.entries[self.index + 1:]
+        top = self.entries[-1]
+        now = time.monotonic()
+        if self.index > 0 and top.changes.keys() == changes.keys() and now - top.time < self.merge_seconds:  # 合併
+            top.changes = {name: (top.changes[name][0], after) for name, (_, after) in changes.items()}  # 保留最初的變動前值
+            top.time = now
+            self._drop_snapshot(top)  # 快照已經不是這一步的結果
+            if all(before == after for before, after in top.changes.values()):  # 變回原值，這一步不再需要
+                self.entries.pop()
+                self.index -= 1
+            return self.current()
+        self.entries.append(HistoryEntry(changes))
+        self.index += 1
+        if len(self.entries) > self.max_steps:  # 捨棄最舊的步驟，最舊的狀態變成新的初始狀態
+            self._drop_snapshot(self.entries[0])
+            del self.entries[0]
+            self.entries[0].changes = {}
+            self.index -= 1
+        return self.current()
+
+    def undo(self):
+        """
+        回到上一個狀態。
+
+        回傳:
+        tuple: (要還原的參數值, 上一個狀態的快照或None)；沒有可以復原的步驟時回傳None。
+        """
+        if not self.can_undo():
+            return None
+        entry = self.entries[self.index]
+        self.index -= 1
+        return {name: before for name, (before, _) in entry.changes.items()}, self.current().snapshot
+
+    def redo(self):
+        """
+        前進到下一個狀態。
+
+        回傳:
+        tuple: (要套用的參數值, 下一個狀態的快照或None)；沒有可以重做的步驟時回傳None。
+        """
+        if not self.can_redo():
+            return None
+        self.index += 1
+        entry = self.current()
+        return {name: after for name, (_, after) in entry.changes.items()}, entry.snapshot
+
+    def attach_snapshot(self, entry, arr, scale):
+        """
+        為某一步保存快照，超過記憶體上限時捨棄離目前位置最遠的快照。
+
+        參數:
+        entry (HistoryEntry): 要保存快照的步驟。
+        arr (numpy.ndarray): 渲染結果。
+        scale (float): arr相對於完整解析度的比例。
+        """
+        self._drop_snapshot(entry)
+        snapshot = Snapshot(arr, scale)
+        if snapshot.nbytes > self.budget_bytes:  # 單張就超過上限
+            return
+        entry.snapshot = snapshot
+        self.nbytes += snapshot.nbytes
+        self._evict()
+
+    def set_budget(self, budget_bytes):
+        """
+        設定快照的記憶體上限。
+
+        參數:
+        budget_bytes (int): 記憶體上限(位元組)。
+        """
+        self.budget_bytes = budget_bytes
+        self._evict()
+
+    def _evict(self):
+        """
+        超過記憶體上限時，依序捨棄離目前位置最遠的快照。
+        """
+        while self.nbytes > self.budget_bytes:
+            farthest = max((position for position, item in enumerate(self.entries) if item.snapshot is not None),
+                           key=lambda position: abs(position - self.index))  # 離目前位置最遠的快照
+            self._drop_snapshot(self.entries[farthest])
+
+    def _drop_snapshot(self, entry):
+        """
+        捨棄某一步的快照。
+        """
+        if entry.snapshot is not None:
+            self.nbytes -= entry.snapshot.nbytes
+            entry.snapshot = None
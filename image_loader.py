@@ -0,0 +1,205 @@
+"""
+快速開啟圖片：先以低解析度解碼顯示預覽，完整解析度在背景執行緒解碼。
+
+JPEG可以在解碼時直接以1/2、1/4、1/8縮小(DCT縮放，PIL的draft)，只需要完整解碼的
+一小部分時間；若EXIF內嵌的縮圖已經夠大則直接使用，幾乎不需要解碼。
+其他格式沒有快速路徑，仍以原本的方式同步解碼。
+"""
+import io  # 導入io，用於讀取內嵌縮圖
+import logging  # 導入日誌模組
+import time  # 導入時間模組
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import instrumentation  # 導入效能量測層
+import pipeline  # 導入處理鏈模組
+import tiled  # 導入分塊處理模組
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+ASPECT_TOLERANCE = 0.02  # 內嵌縮圖與原圖長寬比可接受的差異(部分相機的縮圖有黑邊)
+
+
+def exif_thumbnail(img, min_size):
+    """
+    取得EXIF內嵌的JPEG縮圖。
+
+    參數:
+    img (PIL.Image.Image): 已開啟(尚未解碼)的圖片。
+    min_size (tuple): 縮圖至少需要的(寬, 高)，較小時不使用。
+
+    回傳:
+    numpy.ndarray: 縮圖的RGB陣列，沒有可用的縮圖時回傳None。
+    """
+    raw = img.info.get("exif")  # 原始EXIF資料
+    if not raw:
+        return None
+    from PIL import ExifTags  # 只在有EXIF時才匯入，縮短啟動時間
+    ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)  # 縮圖的IFD
+    offset, length = ifd1.get(0x0201), ifd1.get(0x0202)  # JPEGInterchangeFormat與長度
+    if not offset or not length:
+        return None
+    start = 6 + offset if raw.startswith(b"Exif\x00\x00") else offset  # 位移量相對於TIFF標頭
+    try:
+        with Image.open(io.BytesIO(raw[start:start + length])) as thumbnail:
+            width, height = thumbnail.size  # 縮圖尺寸
+            if width < min_size[0] or height < min_size[1]:  # 任一邊不足以填滿時不使用
+                return None
+            if abs(width / height - img.size[0] / img.size[1]) > ASPECT_TOLERANCE * img.size[0] / img.size[1]:  # 長寬比不同
+                return None
+            return pipeline.to_array(thumbnail)
+    except OSError:  # 縮圖資料損毀
+        return None
+
+
+def open_preview(path, box_size):
+    """
+    以最快的方式取得足以填滿box_size的預覽圖。
+
+    參數:
+    path (str): 圖片路徑。
+    box_size (tuple): 預覽需要的(寬, 高)。
+
+    回傳:
+    tuple: (預覽RGB陣列, 相對於完整解析度的比例)；沒有快速路徑時回傳None。
+    """
+    with Image.open(path) as img, instrumentation.measure("preview") as span:
+        full_width = img.size[0]  # 完整解析度寬度
+        thumbnail = exif_thumbnail(img, box_size)  # 先嘗試內嵌縮圖
+        if thumbnail is not None:
+            return span.result(thumbnail), pipeline.array_size(thumbnail)[0] / full_width
+        if img.format != "JPEG":  # 只有JPEG支援縮小解碼
+            return None
+        img.draft("RGB", box_size)  # 選擇不小於box_size的最小DCT縮放比例
+        if img.size[0] == full_width:  # 圖片本身已經夠小，縮小解碼沒有幫助
+            return None
+        preview = span.result(pipeline.to_array(img))  # 以縮小的解析度解碼
+        return preview, pipeline.array_size(preview)[0] / full_width
+
+
+def open_thumbnail(path, max_size):
+    """
+    以最快的方式產生縮圖：先嘗試EXIF內嵌縮圖，JPEG以縮小解碼，其他格式完整解碼後縮小。
+
+    參數:
+    path (str): 圖片路徑。
+    max_size (int): 縮圖的最長邊。
+
+    回傳:
+    numpy.ndarray: 唯讀的RGB陣列。
+    """
+    with Image.open(path) as img, instrumentation.measure("thumbnail") as span:
+        thumbnail = exif_thumbnail(img, (max_size, max_size))  # 先嘗試內嵌縮圖
+        if thumbnail is None:
+            img.draft("RGB", (max_size, max_size))  # JPEG縮小解碼，其他格式沒有作用
+            thumbnail = pipeline.to_array(img)
+        width, height = pipeline.array_size(thumbnail)
+        ratio = min(1.0, max_size / max(width, height))  # 縮小比例
+        thumbnail = pipeline.make_proxy(thumbnail, ratio)  # 以INTER_AREA縮小
+        return span.result(thumbnail)
+
+
+def decode_full(path, out_of_core=False):
+    """
+    以完整解析度解碼圖片。
+
+    參數:
+    path (str): 圖片路徑。
+    out_of_core (bool): 是否解碼到磁碟映射陣列。
+
+    回傳:
+    numpy.ndarray: 唯讀的RGB陣列。
+    """
+    with instrumentation.measure("decode") as span:
+        if out_of_core:
+            return span.result(tiled.decode_to_memmap(path))  # 分塊處理
+        with Image.open(path) as img:
+            return span.result(pipeline.to_array(img))  # 轉換為RGB陣列
+
+
+class ImageLoader:
+    def __init__(self, widget, on_loaded, poll_ms=15):
+        """
+        初始化ImageLoader類別，在背景執行緒進行完整解析度解碼。
+        結果透過widget.after輪詢交回主執行緒；開啟另一張圖片時，前一張的結果會被丟棄。
+
+        參數:
+        widget (tk.Widget): 用於呼叫after的Tk元件。
+        on_loaded (callable): 在主執行緒呼叫，參數為(解碼結果陣列, 解碼秒數)。
+        poll_ms (int): 主執行緒檢查結果的間隔(毫秒)。
+        """
+        self.widget = widget  # 設置Tk元件
+        self.on_loaded = on_loaded  # 設置結果回呼
+        self.poll_ms = poll_ms  # 設置輪詢間隔
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-loader")  # 解碼用的執行緒
+        self._future = None  # 目前的解碼工作
+
+    def submit(self, path, out_of_core=False):
+        """
+        開始在背景解碼圖片，取代尚未完成的解碼工作。必須在主執行緒呼叫。
+
+        參數:
+        path (str): 圖片路徑。
+        out_of_core (bool): 是否解碼到磁碟映射陣列。
+        """
+        self._future = self._executor.submit(self._decode, path, out_of_core)  # 送出解碼工作
+        self.widget.after(self.poll_ms, self._poll, self._future)  # 開始輪詢
+
+    def cancel(self):
+        """
+        丟棄目前的解碼工作(已開始的解碼會執行完，但結果不會交回)。
+        """
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def is_loading(self):
+        """
+        是否有尚未交回的解碼工作。
+        """
+        return self._future is not None
+
+    def pending(self):
+        """
+        回傳尚未交回的解碼工作，沒有時回傳None。其他執行緒可以等待它的結果(解碼結果, 解碼秒數)，
+        結果仍照常由輪詢交回主執行緒。
+        """
+        return self._future
+
+    def wait(self):
+        """
+        等待目前的解碼工作完成並在呼叫端交回結果，用於需要完整解析度的操作(例如保存)。
+        """
+        future, self._future = self._future, None
+        if future is not None:
+            self.on_loaded(*future.result())
+
+    @staticmethod
+    def _decode(path, out_of_core):
+        """
+        背景執行緒中的解碼工作。
+        """
+        start = time.perf_counter()
+        result = decode_full(path, out_of_core)
+        return result, time.perf_counter() - start
+
+    def _poll(self, future):
+        """
+        在主執行緒檢查解碼是否完成。
+
+        參數:
+        future (concurrent.futures.Future): 被輪詢的解碼工作。
+        """
+        if future is not self._future:  # 已被取代或取消
+            return
+        if not future.done():  # 尚未完成
+            self.widget.after(self.poll_ms, self._poll, future)
+            return
+        self._future = None
+        try:
+            result = future.result()
+        except Exception as exc:  # 回報解碼錯誤
+            logger.error("Image decode failed: %s", exc)  # 記錄錯誤
+            return
+        self.on_loaded(*result)  # 交回結果
@@ -1,10 +1,35 @@
-from tkinter import filedialog  # 導入文件對話框
-from PIL import Image, ImageTk, ImageEnhance  # 導入PIL庫中的Image, ImageTk, ImageEnhance
-import cv2  # 導入OpenCV
-import numpy as np  # 導入NumPy
+from tkinter import filedialog, messagebox  # 導入文件對話框與訊息框
+from PIL import Image, ImageTk  # 導入PIL庫中的Image, ImageTk
+import itertools  # 導入itertools，用於產生圖片識別碼
+import logging  # 導入日誌模組
+import os  # 導入os，用於處理匯出路徑
+import time  # 導入時間模組，用於量測開啟圖片的時間
+import pipeline  # 導入處理鏈模組
+import bands  # 導入多核心分帶處理
+import disk_cache  # 導入磁碟快取
+import exporter  # 導入背景匯出模組
+import instrumentation  # 導入效能量測層
+import image_loader  # 導入快速開啟圖片模組
+import tiled  # 導入分塊處理模組
+import video  # 導入影片與圖片序列處理模組
+from history import History  # 導入復原/重做歷史紀錄
+from pyramid import Pyramid  # 導入顯示用的影像金字塔
+from render_worker import RenderWorker  # 導入背景渲染工作者
+from stage_cache import StageCache  # 導入階段結果快取
+
+MIN_PROXY_SIZE = 512  # 畫布尚未顯示時代理圖的最小邊長
+PROXY_HEADROOM = 1.5  # 代理圖比實際需要多保留的比例
+MAX_ZOOM = 16.0  # 最大顯示倍率(每個原始像素對應的畫面像素數)
+SNAPSHOT_MIN_SECONDS = 0.1  # 渲染超過此秒數的狀態才保存快照，較快的狀態復原時直接重新計算
+MB = 1024 * 1024  # 一MB的位元組數
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
 
 class ImageProcessor:
-    def __init__(self, canvas, left_frame, width_entry, height_entry, blur_type_var):
+    def __init__(self, canvas, left_frame, width_entry, height_entry, blur_type_var, cache_budget_mb=512, proxy_mode=True,
+                 background_render=True, out_of_core_megapixels=150, fast_open=True, history_budget_mb=64,
+                 disk_cache_mb=1024, disk_cache_dir=None, render_threads=None):
         """
         初始化ImageProcessor類別
 
@@ -14,6 +39,15 @@ class ImageProcessor:
         width_entry (tk.Entry): 輸入框，用於輸入新寬度。
         height_entry (tk.Entry): 輸入框，用於輸入新高度。
         blur_type_var (tk.StringVar): 單選框變數，用於選擇模糊類型。
+        cache_budget_mb (int): 階段結果快取可使用的記憶體上限(MB)。
+        proxy_mode (bool): 是否以縮小的代理圖進行互動預覽，完整解析度只在保存或呼叫render時計算。
+        background_render (bool): 是否在背景執行緒渲染預覽，避免阻塞Tk主迴圈。
+        out_of_core_megapixels (float): 超過此像素數(百萬)的圖片改用磁碟映射與分塊處理。
+        fast_open (bool): 是否先以低解析度解碼(JPEG縮小解碼或EXIF縮圖)顯示預覽，完整解析度在背景解碼。
+        history_budget_mb (int): 復原紀錄中快照可使用的記憶體上限(MB)。
+        disk_cache_mb (int): 磁碟快取(縮圖、預覽與完整解析度結果)的大小上限(MB)，0表示不使用。
+        disk_cache_dir (str): 磁碟快取資料夾，為None時使用disk_cache.default_directory()。
+        render_threads (int): 色彩、銳化與模糊分帶處理的執行緒數，1表示單執行緒，為None時沿用bands的設定(預設為CPU數量)。
         """
         self.canvas = canvas  # 設置畫布
         self.left_frame = left_frame  # 設置左側框架
@@ -23,9 +57,9 @@ class ImageProcessor:
         self.scale_factor = 1.0  # 初始縮放比例為1.0
         self.img = None  # 當前顯示的圖片
         self.img_tk = None  # 用於在Tkinter中顯示的圖片
-        self.original_img = None  # 用於儲存上傳時的圖片
+        self.original_img = None  # 用於儲存上傳時的圖片(RGB陣列)
         self.current_angle = 0  # 當前旋轉角度為0
-        self.current_img = None  # 用於儲存當前狀態的圖片
+        self.current_img = None  # 用於儲存當前狀態的圖片(RGB陣列)
         self.sharpen_factor = 1.0  # 初始銳化比例為1.0
         self.blur_factor = 0.0  # 初始模糊比例為0.0
         self.brightness_factor = 1.0  # 初始亮度比例為1.0
@@ -35,46 +69,309 @@ class ImageProcessor:
         self.is_flipped_vertically = False  # 垂直翻轉狀態
         self.resized_width = None  # 調整大小後的寬度
         self.resized_height = None  # 調整大小後的高度
+        self.stage_cache = StageCache(cache_budget_mb * 1024 * 1024)  # 階段結果快取
+        self._source_ids = itertools.count()  # 圖片識別碼產生器
+        self.source_key = None  # 目前原始圖片的識別碼
+        self.proxy_mode = proxy_mode  # 是否使用代理圖預覽
+        self.proxy_img = None  # 縮小的代理圖
+        self.proxy_scale = 1.0  # 代理圖相對於原始圖片的比例
+        self.current_scale = 1.0  # current_img相對於完整解析度的比例
+        self._rendered_key = None  # current_img為完整解析度渲染結果時對應的(圖片識別碼, 參數)，其他情況為None
+        self.out_of_core_megapixels = out_of_core_megapixels  # 分塊處理的門檻
+        self.out_of_core = False  # 目前圖片是否使用分塊處理
+        self.pyramid = None  # current_img的顯示金字塔
+        self.view_center = (0.5, 0.5)  # 畫布中央對應的圖片位置(相對於寬高的比例)
+        self._image_item = None  # 畫布上的圖片項目
+        self._pan_anchor = None  # 平移拖曳的上一個滑鼠位置
+        self.image_loader = image_loader.ImageLoader(canvas, self._on_image_loaded) if fast_open else None  # 背景解碼
+        self._open_started = None  # 開始開啟圖片的時間
+        self.history = History(history_budget_mb * 1024 * 1024)  # 復原/重做歷史紀錄
+        self._history_params = None  # 上一次記錄到歷史紀錄的參數
+        self._restoring = False  # 是否正在復原或重做(不記錄為新的步驟)
+        self.on_params_restored = None  # 復原或重做後呼叫，參數為目前的參數，用於同步介面上的滑桿
+        self.render_worker = RenderWorker(canvas, self._on_render_done) if background_render else None  # 背景渲染工作者
+        self.export_preset = exporter.DEFAULT_PRESET  # 匯出的編碼設定("fast"、"balanced"或"small")
+        self.on_export_progress = None  # 匯出進度回呼，參數為(完成比例, 已完成數量, 總數量)
+        self.exporter = exporter.Exporter(canvas, self._on_export_progress)  # 背景匯出
+        self._export_render = None  # 進行中匯出的(ExportJob, 渲染對應的(圖片識別碼, 參數))，完成後可直接顯示
+        self.video_job = None  # 處理中的影片
+        self.on_video_progress = None  # 影片進度回呼，參數為(已完成畫格數, 總畫格數或None, fps)
+        self.on_video_done = None  # 影片處理結束回呼，參數為結果字典
+        self.disk_cache = None  # 磁碟快取
+        if disk_cache_mb:
+            try:
+                self.disk_cache = disk_cache.DiskCache(disk_cache_dir, disk_cache_mb * MB)
+            except OSError as exc:  # 無法建立快取資料夾時照常運作
+                logger.warning("Disk cache disabled: %s", exc)  # 記錄警告訊息
+        self.content_key = None  # 目前圖片的內容鍵(磁碟快取使用)，背景計算完成前為None
+        self._content_future = None  # 背景計算中的內容鍵
+        if render_threads is not None:
+            bands.set_workers(render_threads)  # 設定分帶處理的執行緒數
 
     def upload_image(self):
         """
         開啟文件對話框讓使用者選擇圖片並上傳。
         選擇圖片後，重置縮放比例並更新畫布顯示圖片。
+        啟用快速開啟時先顯示低解析度預覽，完整解析度解碼完成後才取代。
         """
         file_path = filedialog.askopenfilename()  # 開啟文件選擇對話框
         if file_path:  # 如果選擇了文件
-            self.img = Image.open(file_path)  # 開啟圖片
-            self.original_img = self.img.copy()  # 儲存原始圖片
-            self.scale_factor = 1.0  # 重置縮放比例
-            self.current_angle = 0  # 重置旋轉角度
-            self.current_img = self.img.copy()  # 儲存當前狀態
-            self.is_flipped_horizontally = False  # 重置水平翻轉狀態
-            self.is_flipped_vertically = False  # 重置垂直翻轉狀態
-            self.resized_width = None  # 重置調整大小寬度
-            self.resized_height = None  # 重置調整大小高度
-            self.apply_all_filters()  # 應用所有濾鏡
+            self.open_image(file_path)
+
+    def open_image(self, file_path):
+        """
+        開啟指定的圖片(上傳對話框與資料夾瀏覽列共用)。
+        磁碟快取中有這張圖片的預覽時先顯示預覽，否則嘗試快速解碼。
+
+        參數:
+        file_path (str): 圖片路徑。
+        """
+        self._open_started = time.perf_counter()  # 開始量測開啟時間
+        if self.image_loader is not None:
+            self.image_loader.cancel()  # 丟棄上一張圖片尚未完成的解碼
+        if self.render_worker is not None:
+            self.render_worker.cancel()  # 丟棄上一張圖片進行中的渲染
+        self.img = Image.open(file_path)  # 開啟圖片(只讀取標頭)
+        width, height = self.img.size  # 圖片尺寸
+        self.out_of_core = width * height > self.out_of_core_megapixels * 1e6  # 是否超過分塊處理門檻
+        self.scale_factor = 1.0  # 重置縮放比例
+        self.view_center = (0.5, 0.5)  # 重置平移位置
+        self.current_angle = 0  # 重置旋轉角度
+        self.is_flipped_horizontally = False  # 重置水平翻轉狀態
+        self.is_flipped_vertically = False  # 重置垂直翻轉狀態
+        self.resized_width = None  # 重置調整大小寬度
+        self.resized_height = None  # 重置調整大小高度
+        self.history.reset()  # 清除上一張圖片的歷史紀錄
+        self._history_params = self.get_params()  # 歷史紀錄的初始狀態
+        self._start_content_key(file_path)  # 磁碟快取的鍵(只查索引)
+        preview = None
+        if self.image_loader is not None:  # 快速開啟
+            preview = self._cached_preview(width)  # 先查磁碟快取
+            if preview is None:
+                box = (max(self.left_frame.winfo_width(), MIN_PROXY_SIZE), max(self.left_frame.winfo_height(), MIN_PROXY_SIZE))  # 預覽所需尺寸
+                preview = image_loader.open_preview(file_path, box)
+        if preview is not None:  # 先顯示預覽，完整解析度在背景解碼
+            self.original_img = None  # 完整解析度尚未解碼
+            self._set_source(preview[0], preview[1])  # 以預覽圖作為代理圖
             self.update_image()  # 更新畫布顯示圖片
-            print(f"Image loaded: {file_path}")  # 打印除錯訊息
+            elapsed = time.perf_counter() - self._open_started  # 開啟到第一次顯示的時間
+            instrumentation.record("first_preview", elapsed, output_size=pipeline.array_size(preview[0]))  # 記錄開啟時間
+            logger.info("First preview in %.1f ms (%dx%d)", elapsed * 1000, *pipeline.array_size(preview[0]))  # 記錄開啟時間
+            self.image_loader.submit(file_path, self.out_of_core)  # 背景解碼完整解析度
+        else:
+            self._on_image_loaded(image_loader.decode_full(file_path, self.out_of_core), None)  # 同步解碼
+        if self.content_key is None and self.disk_cache is not None:  # 索引中沒有，顯示後才在背景計算雜湊
+            self._content_future = self.disk_cache.content_key_later(file_path)
+        logger.debug("Image loaded: %s", file_path)  # 記錄除錯訊息
+
+    def _start_content_key(self, file_path):
+        """
+        從索引取得圖片的內容鍵，索引中有記錄且檔案未變動時立即可用。沒有時由open_image在顯示後
+        於背景讀取整個檔案計算雜湊，完成前不使用磁碟快取，避免大檔案的雜湊延遲第一次顯示。
+
+        參數:
+        file_path (str): 圖片路徑。
+        """
+        self.content_key, self._content_future = None, None
+        if self.disk_cache is None:
+            return
+        try:
+            self.content_key = self.disk_cache.known_key(file_path)  # 只讀取檔案狀態
+        except OSError as exc:
+            logger.warning("Disk cache key failed: %s", exc)  # 記錄警告訊息
+
+    def _ready_content_key(self):
+        """
+        回傳目前圖片的內容鍵，背景計算尚未完成或失敗時回傳None。
+        """
+        future = self._content_future
+        if self.content_key is None and future is not None and future.done():
+            self._content_future = None
+            try:
+                self.content_key = future.result()
+            except OSError as exc:
+                logger.warning("Disk cache key failed: %s", exc)  # 記錄警告訊息
+        return self.content_key
+
+    def _cached_preview(self, full_width):
+        """
+        取得磁碟快取中的預覽圖。
+
+        參數:
+        full_width (int): 完整解析度寬度。
+
+        回傳:
+        tuple: (預覽RGB陣列, 相對於完整解析度的比例)；沒有快取時回傳None。
+        """
+        if self.content_key is None:
+            return None
+        preview = self.disk_cache.get(self.content_key, "preview")
+        if preview is None:
+            return None
+        return preview, pipeline.array_size(preview)[0] / full_width
+
+    def _cache_preview(self):
+        """
+        完整解析度解碼後，在背景將代理圖存為磁碟快取中的預覽，下次開啟時可以立即顯示。
+        """
+        if self.disk_cache is None or self.proxy_img is None or self.proxy_scale >= 1.0:  # 小圖片直接解碼即可
+            return
+        proxy, future = self.proxy_img, self._content_future
+        if self._ready_content_key() is not None:
+            self._store_preview(self.content_key, proxy)
+        elif future is not None:  # 雜湊完成後在背景執行緒存入
+            future.add_done_callback(lambda done: done.exception() is None and self._store_preview(done.result(), proxy))
+
+    def _store_preview(self, key, proxy):
+        """
+        將代理圖存為key的預覽，已存在時不重複寫入。可在任何執行緒呼叫。
+        """
+        if not self.disk_cache.contains(key, "preview"):
+            self.disk_cache.put_later(key, "preview", proxy)
+
+    def _render_cache_key(self, params):
+        """
+        回傳目前圖片套用params的結果在磁碟快取中的鍵，沒有任何階段需要執行時回傳None。
+
+        參數:
+        params (dict): 濾鏡參數。
+        """
+        content_key = self._ready_content_key()  # 背景雜湊尚未完成時不使用磁碟快取
+        if content_key is None or not any(stage.is_active(params) for stage in pipeline.STAGES):
+            return None
+        return disk_cache.recipe_key(content_key, params)
+
+    def _set_source(self, proxy, proxy_scale):
+        """
+        更換處理鏈的輸入：清除快取並產生新的圖片識別碼。
+
+        參數:
+        proxy (numpy.ndarray): 代理圖，為None時稍後由原始圖片建立。
+        proxy_scale (float): 代理圖相對於完整解析度的比例。
+        """
+        if self.render_worker is not None:
+            self.render_worker.cancel()  # 丟棄以舊輸入進行中的渲染
+        self.stage_cache.clear()  # 清除之前的階段結果
+        self.source_key = next(self._source_ids)  # 產生新的圖片識別碼
+        self.proxy_img, self.proxy_scale = proxy, proxy_scale  # 設置代理圖
+        self.current_img, self.current_scale = (proxy, proxy_scale) if proxy is not None else (self.original_img, 1.0)  # 儲存當前狀態(唯讀陣列，不需複製)
+        self._rendered_key = None  # 尚未以目前參數渲染
+
+    def _on_image_loaded(self, original, decode_seconds):
+        """
+        完整解析度解碼完成時在主執行緒呼叫，取代預覽圖並重新套用目前的濾鏡。
+
+        參數:
+        original (numpy.ndarray): 完整解析度的RGB陣列。
+        decode_seconds (float): 背景解碼秒數，同步解碼時為None。
+        """
+        self.original_img = original  # 儲存原始圖片
+        self._set_source(None, 1.0)  # 代理圖改由完整解析度重建
+        self.apply_all_filters()  # 應用所有濾鏡(套用預覽期間調整的參數)
+        self._cache_preview()  # 保存預覽供下次開啟使用
+        self._show_proxy_until_rendered()  # 背景渲染完成前先顯示代理圖
+        self.update_image()  # 更新畫布顯示圖片
+        elapsed = time.perf_counter() - self._open_started  # 開啟到完整解析度的時間
+        if decode_seconds is None:
+            instrumentation.record("first_preview", elapsed, output_size=pipeline.array_size(original))  # 記錄開啟時間
+            logger.info("First preview in %.1f ms (full decode)", elapsed * 1000)  # 記錄開啟時間
+        else:
+            instrumentation.record("full_resolution_ready", elapsed, decode_seconds=decode_seconds)  # 記錄開啟時間
+            logger.info("Full resolution ready in %.1f ms (decode %.1f ms)", elapsed * 1000, decode_seconds * 1000)  # 記錄開啟時間
 
     def update_image(self):
         """
-        根據當前的縮放比例更新畫布顯示的圖片。
+        根據當前的縮放比例與平移位置更新畫布顯示的圖片。
+        只從影像金字塔中選擇適當的一層，裁切並縮放畫布可見的區域。
+        """
+        if self.current_img is None:  # 如果圖片尚未載入
+            return
+        if self.pyramid is None or self.pyramid.levels[0] is not self.current_img:  # 每個渲染結果只建立一次金字塔
+            self.pyramid = Pyramid(self.current_img, self.current_scale)
+        view_size = (self.canvas.winfo_width(), self.canvas.winfo_height())  # 畫布尺寸
+        if view_size[0] <= 1 or view_size[1] <= 1:  # 畫布尚未顯示，等待<Configure>事件
+            return
+        zoom = self.display_zoom()  # 顯示倍率
+        self._clamp_view_center(zoom, view_size)  # 避免平移到圖片外
+        full_width, full_height = self.pyramid.full_size  # 完整解析度尺寸
+        center = (self.view_center[0] * full_width, self.view_center[1] * full_height)  # 畫布中央的完整解析度座標
+        with instrumentation.measure("display", self.current_img) as span:
+            display_img, position = self.pyramid.view(zoom, center, view_size)  # 只處理可見區域
+            if display_img is None:  # 沒有可見區域
+                return
+            image = pipeline.to_image(span.result(display_img))  # 在顯示邊界才轉換為PIL
+            if self.img_tk is not None and (self.img_tk.width(), self.img_tk.height()) == image.size:
+                self.img_tk.paste(image)  # 尺寸相同時重用PhotoImage(平移時)
+            else:
+                self.img_tk = ImageTk.PhotoImage(image)  # 轉換為Tkinter格式
+        if self._image_item is None:  # 第一次顯示時建立圖片項目
+            self._image_item = self.canvas.create_image(position[0], position[1], anchor="nw", image=self.img_tk)
+        else:
+            self.canvas.coords(self._image_item, position[0], position[1])  # 移動圖片項目
+            self.canvas.itemconfig(self._image_item, image=self.img_tk)  # 更新圖片
+        self.canvas.image = self.img_tk  # 保持引用，避免圖片被垃圾回收
+        logger.debug("Image updated on canvas")  # 記錄除錯訊息
+
+    def display_zoom(self):
+        """
+        回傳目前的顯示倍率(每個完整解析度像素對應的畫面像素數)。
+        scale_factor為1時與原本相同：縮小到符合畫布，但不放大。
         """
-        if self.current_img:  # 如果圖片已經載入
-            max_width, max_height = self.left_frame.winfo_width(), self.left_frame.winfo_height()  # 獲取畫布的最大寬度和高度
-            display_img = self.current_img.copy()  # 複製圖片
-            display_img.thumbnail((max_width * self.scale_factor, max_height * self.scale_factor), Image.LANCZOS)  # 按縮放比例調整大小
-            self.img_tk = ImageTk.PhotoImage(display_img)  # 將調整後的圖片轉換為Tkinter顯示格式
-            self.canvas.delete("all")  # 清除之前的圖片
-            
-            def update_canvas():
-                canvas_width = self.canvas.winfo_width()  # 獲取畫布寬度
-                canvas_height = self.canvas.winfo_height()  # 獲取畫布高度
-                self.canvas.create_image(canvas_width // 2, canvas_height // 2, anchor="center", image=self.img_tk)  # 在畫布中央顯示圖片
-                self.canvas.image = self.img_tk  # 保持引用，避免圖片被垃圾回收
-                print("Image updated on canvas")  # 打印除錯訊息
-            
-            self.canvas.after(100, update_canvas)  # 延遲執行，確保畫布已經更新尺寸
+        full_width, full_height = self.pyramid.full_size  # 完整解析度尺寸
+        fit = min(self.left_frame.winfo_width() / full_width, self.left_frame.winfo_height() / full_height, 1.0)  # 符合畫布的倍率
+        return min(fit * self.scale_factor, MAX_ZOOM)
+
+    def _clamp_view_center(self, zoom, view_size):
+        """
+        限制平移位置：圖片小於畫布時置中，否則不讓畫布露出圖片外的區域。
+
+        參數:
+        zoom (float): 顯示倍率。
+        view_size (tuple): 畫布尺寸(寬, 高)。
+        """
+        center = list(self.view_center)
+        for axis in (0, 1):
+            visible = view_size[axis] / zoom / self.pyramid.full_size[axis]  # 可見範圍佔圖片的比例
+            if visible >= 1.0:  # 整張圖片都可見
+                center[axis] = 0.5
+            else:
+                center[axis] = min(max(center[axis], visible / 2.0), 1.0 - visible / 2.0)
+        self.view_center = tuple(center)
+
+    def on_canvas_configure(self, event):
+        """
+        畫布尺寸改變(包含第一次顯示)時重新繪製圖片，取代固定的延遲繪製。
+
+        參數:
+        event (tk.Event): <Configure>事件對象。
+        """
+        self.update_image()  # 以新的畫布尺寸重新繪製
+
+    def start_pan(self, event):
+        """
+        開始拖曳平移。
+
+        參數:
+        event (tk.Event): 滑鼠按下事件對象。
+        """
+        self._pan_anchor = (event.x, event.y)  # 記錄滑鼠位置
+
+    def pan(self, event):
+        """
+        拖曳平移放大後的圖片。
+
+        參數:
+        event (tk.Event): 滑鼠拖曳事件對象。
+        """
+        if self.pyramid is None or self._pan_anchor is None:  # 尚未顯示圖片
+            return
+        zoom = self.display_zoom()  # 顯示倍率
+        full_width, full_height = self.pyramid.full_size
+        delta_x, delta_y = event.x - self._pan_anchor[0], event.y - self._pan_anchor[1]  # 滑鼠移動量(畫面像素)
+        self.view_center = (self.view_center[0] - delta_x / zoom / full_width,
+                            self.view_center[1] - delta_y / zoom / full_height)  # 圖片跟著滑鼠移動
+        self._pan_anchor = (event.x, event.y)
+        self.update_image()  # 更新畫布顯示圖片
 
     def zoom(self, event):
         """
@@ -83,12 +380,24 @@ class ImageProcessor:
         參數:
         event (tk.Event): 滾輪事件對象，包含滾輪滾動的方向。
         """
+        old_zoom = self.display_zoom() if self.pyramid is not None else None  # 縮放前的顯示倍率
         if event.delta > 0:  # 滾輪向上滾動
-            self.scale_factor *= 1.1  # 放大圖片
+            if old_zoom is None or old_zoom * 1.1 <= MAX_ZOOM:  # 未超過最大倍率
+                self.scale_factor *= 1.1  # 放大圖片
         else:  # 滾輪向下滾動
             self.scale_factor /= 1.1  # 縮小圖片
-        self.update_image()  # 更新畫布顯示圖片
-        print(f"Zoom event: scale_factor = {self.scale_factor}")   # 打印除錯訊息
+        if old_zoom is not None:  # 保持滑鼠下的點不動
+            new_zoom = self.display_zoom()
+            full_width, full_height = self.pyramid.full_size
+            offset_x = event.x - self.canvas.winfo_width() / 2.0  # 滑鼠相對於畫布中央的位置
+            offset_y = event.y - self.canvas.winfo_height() / 2.0
+            self.view_center = (self.view_center[0] + offset_x * (1.0 / old_zoom - 1.0 / new_zoom) / full_width,
+                                self.view_center[1] + offset_y * (1.0 / old_zoom - 1.0 / new_zoom) / full_height)
+        if self.original_img is not None and self._ensure_proxy():  # 放大超過代理圖解析度時重建代理圖
+            self.apply_all_filters()  # 以新的代理圖重新計算
+        else:
+            self.update_image()  # 更新畫布顯示圖片
+        logger.debug("Zoom event: scale_factor = %s", self.scale_factor)   # 記錄除錯訊息
 
     def resize_image(self, width, height):
         """
@@ -98,11 +407,11 @@ class ImageProcessor:
         width (int): 新的寬度。
         height (int): 新的高度。
         """
-        if self.current_img:  # 如果圖片已經載入
+        if self.current_img is not None:  # 如果圖片已經載入
             self.resized_width = width  # 儲存調整大小後的寬度
             self.resized_height = height  # 儲存調整大小後的高度
             self.apply_all_filters()  # 應用所有濾鏡
-            print(f"Image resized to: {width}x{height}")  # 打印除錯訊息
+            logger.debug("Image resized to: %sx%s", width, height)  # 記錄除錯訊息
 
     def resize_command(self):
         """
@@ -111,16 +420,16 @@ class ImageProcessor:
         try:
             width_str = self.width_entry.get()  # 獲取寬度輸入框的值
             height_str = self.height_entry.get()  # 獲取高度輸入框的值
-            print(f"Width entry value: '{width_str}'")  # 打印除錯訊息
-            print(f"Height entry value: '{height_str}'")  # 打印除錯訊息
+            logger.debug("Width entry value: %r", width_str)  # 記錄除錯訊息
+            logger.debug("Height entry value: %r", height_str)  # 記錄除錯訊息
             
             width = int(width_str)  # 將寬度值轉換為整數
             height = int(height_str)  # 將高度值轉換為整數
             
-            print(f"Resizing to width: {width}, height: {height}")   # 打印除錯訊息
+            logger.debug("Resizing to width: %s, height: %s", width, height)   # 記錄除錯訊息
             self.resize_image(width, height)  # 調整圖片大小
         except ValueError:
-            print("請輸入有效的寬度和高度。")  # 打印錯誤訊息
+            logger.warning("請輸入有效的寬度和高度。")  # 記錄警告訊息
 
     def rotate_command(self, angle):
         """
@@ -129,28 +438,28 @@ class ImageProcessor:
         參數:
         angle (int): 旋轉角度。
         """
-        if self.original_img:  # 如果圖片已經載入
+        if self.current_img is not None:  # 如果圖片已經載入(包含預覽圖)
             self.current_angle = angle  # 設定旋轉角度
             self.apply_all_filters()  # 應用所有濾鏡
-            print(f"Image rotated to {angle} degrees")  # 打印除錯訊息
+            logger.debug("Image rotated to %s degrees", angle)  # 記錄除錯訊息
 
     def flip_vertical(self):
         """
         垂直翻轉圖片。
         """
-        if self.current_img:  # 如果圖片已經載入
+        if self.current_img is not None:  # 如果圖片已經載入
             self.is_flipped_vertically = not self.is_flipped_vertically  # 切換垂直翻轉狀態
             self.apply_all_filters()  # 應用所有濾鏡
-            print("Image flipped vertically")  # 打印除錯訊息
+            logger.debug("Image flipped vertically")  # 記錄除錯訊息
 
     def flip_horizontal(self):
         """
         水平翻轉圖片。
         """
-        if self.current_img:  # 如果圖片已經載入
+        if self.current_img is not None:  # 如果圖片已經載入
             self.is_flipped_horizontally = not self.is_flipped_horizontally  # 切換水平翻轉狀態
             self.apply_all_filters()  # 應用所有濾鏡
-            print("Image flipped horizontally")  # 打印除錯訊息
+            logger.debug("Image flipped horizontally")  # 記錄除錯訊息
 
     def adjust_brightness(self, brightness_factor):
         """
@@ -161,7 +470,7 @@ class ImageProcessor:
         """
         self.brightness_factor = brightness_factor  # 設定亮度比例
         self.apply_all_filters()  # 應用所有濾鏡
-        print(f"Brightness adjusted by factor: {brightness_factor}")  # 打印除錯訊息
+        logger.debug("Brightness adjusted by factor: %s", brightness_factor)  # 記錄除錯訊息
 
     def adjust_contrast(self, contrast_factor):
         """
@@ -172,7 +481,7 @@ class ImageProcessor:
         """
         self.contrast_factor = contrast_factor  # 設定對比度比例
         self.apply_all_filters()  # 應用所有濾鏡
-        print(f"Contrast adjusted by factor: {contrast_factor}")  # 打印除錯訊息
+        logger.debug("Contrast adjusted by factor: %s", contrast_factor)  # 記錄除錯訊息
 
     def adjust_saturation(self, saturation_factor):
         """
@@ -183,7 +492,7 @@ class ImageProcessor:
         """
         self.saturation_factor = saturation_factor  # 設定飽和度比例
         self.apply_all_filters()  # 應用所有濾鏡
-        print(f"Saturation adjusted by factor: {saturation_factor}")  # 打印除錯訊息
+        logger.debug("Saturation adjusted by factor: %s", saturation_factor)  # 記錄除錯訊息
 
     def sharpen_image(self, sharpen_factor):
         """
@@ -194,7 +503,7 @@ class ImageProcessor:
         """
         self.sharpen_factor = sharpen_factor  # 設定銳化比例
         self.apply_all_filters()  # 應用所有濾鏡
-        print(f"Image sharpened by factor: {sharpen_factor}")  # 打印除錯訊息
+        logger.debug("Image sharpened by factor: %s", sharpen_factor)  # 記錄除錯訊息
 
     def blur_image(self, blur_factor):
         """
@@ -205,67 +514,240 @@ class ImageProcessor:
         """
         self.blur_factor = blur_factor  # 設定模糊比例
         self.apply_all_filters()  # 應用所有濾鏡
-        print(f"Image blurred by factor: {blur_factor}")  # 打印除錯訊息
+        logger.debug("Image blurred by factor: %s", blur_factor)  # 記錄除錯訊息
+
+    def get_params(self):
+        """
+        取得目前所有濾鏡參數。
+
+        回傳:
+        dict: 參數名稱對應目前的值，格式同pipeline.default_params()。
+        """
+        params = {name: getattr(self, name) for name in pipeline.default_params() if name != "blur_type"}  # 讀取各項參數
+        params["blur_type"] = self.blur_type_var.get()  # 獲取模糊類型
+        return params
+
+    def set_cache_budget(self, budget_mb):
+        """
+        設定階段結果快取的記憶體上限。
+
+        參數:
+        budget_mb (int): 記憶體上限(MB)。
+        """
+        self.stage_cache.set_budget(budget_mb * 1024 * 1024)  # 更新快取預算
+
+    def _ensure_proxy(self):
+        """
+        確保代理圖的解析度足以填滿目前的顯示區域(left_frame 乘以 scale_factor)。
+
+        回傳:
+        bool: 代理圖是否被重新建立。
+        """
+        if not (self.proxy_mode or self.out_of_core):  # 未啟用代理模式
+            return False
+        box_width = max(self.left_frame.winfo_width(), MIN_PROXY_SIZE) * self.scale_factor  # 顯示區域寬度
+        box_height = max(self.left_frame.winfo_height(), MIN_PROXY_SIZE) * self.scale_factor  # 顯示區域高度
+        scale = pipeline.proxy_scale(pipeline.array_size(self.original_img), (box_width, box_height))  # 所需的代理圖比例
+        if self.resized_width and self.resized_height:  # 調整大小後的輸出也要有足夠解析度
+            scale = max(scale, pipeline.proxy_scale((self.resized_width, self.resized_height), (box_width, box_height)))
+        if self.proxy_img is not None and scale <= self.proxy_scale:  # 現有代理圖已足夠
+            return False
+        self.proxy_scale = min(1.0, scale * PROXY_HEADROOM)  # 預留空間，避免每次放大都重建
+        self.proxy_img = pipeline.make_proxy(self.original_img, self.proxy_scale)  # 建立代理圖
+        logger.debug("Proxy built: %s, scale = %.3f", pipeline.array_size(self.proxy_img), self.proxy_scale)  # 記錄除錯訊息
+        return True
 
     def apply_all_filters(self):
         """
         根據當前的各種濾鏡參數應用濾鏡效果。
+        只會重新計算參數有變動的階段及其之後的階段，之前的階段結果取自快取。
+        代理模式下只處理縮小的代理圖，完整解析度延後到render或save_image。
+        啟用背景渲染時立即返回，結果完成後才更新畫布。
+        """
+        if self.original_img is None and self.proxy_img is None:  # 圖片尚未載入
+            return
+        self._record_history()  # 記錄參數變動
+        if self.original_img is None:  # 完整解析度尚在背景解碼
+            source, scale = self.proxy_img, self.proxy_scale  # 先處理預覽圖
+        elif self.proxy_mode or self.out_of_core:  # 代理模式(分塊處理時一律使用代理圖預覽)
+            self._ensure_proxy()  # 確保代理圖已建立
+            source, scale = self.proxy_img, self.proxy_scale  # 以代理圖執行處理鏈
+        else:
+            source, scale = self.original_img, 1.0  # 完整解析度
+        if self.render_worker is not None:  # 背景渲染
+            self.render_worker.submit(source, self.source_key, self.get_params(), self.stage_cache, scale)
+        else:
+            start = time.perf_counter()  # 計算處理鏈的執行時間
+            result = pipeline.render(source, self.source_key, self.get_params(), self.stage_cache, scale)
+            self._on_render_done(result, scale, self.source_key, time.perf_counter() - start)
+
+    def _show_proxy_until_rendered(self):
+        """
+        背景渲染尚未完成時，以代理圖取代完整解析度的原始圖片顯示，避免對整張圖片建立金字塔。
+        """
+        if self.current_img is self.original_img and self.proxy_img is not None:
+            self.current_img, self.current_scale = self.proxy_img, self.proxy_scale  # 代理圖與原始圖片內容相同，只是較小
+            self._rendered_key = None
+
+    def _on_render_done(self, result, scale, source_key, seconds):
+        """
+        渲染完成時在主執行緒呼叫，更新目前圖片與畫布。輸入已更換(開啟其他圖片或完整解析度解碼完成)時丟棄結果。
+
+        參數:
+        result (numpy.ndarray): 渲染結果。
+        scale (float): 結果相對於完整解析度的比例。
+        source_key (int): 渲染時的圖片識別碼。
+        seconds (float): 處理鏈本身的執行秒數，用於判斷是否值得保存快照。
+        """
+        if source_key != self.source_key:  # 舊輸入的結果，不顯示也不保存快照
+            logger.debug("Discarded render of a previous source")  # 記錄除錯訊息
+            return
+        self.current_img = result  # 更新目前圖片
+        self.current_scale = scale  # 記錄目前圖片的比例
+        self._rendered_key = None  # 預覽結果，存檔前仍需要render
+        entry = self.history.current()  # 此結果對應的歷史狀態
+        if entry.snapshot is None and seconds >= SNAPSHOT_MIN_SECONDS:  # 重新計算較慢時保存快照
+            self.history.attach_snapshot(entry, result, scale)
+        self.update_image()  # 更新畫布顯示圖片
+
+    def _record_history(self):
+        """
+        比較目前參數與上一次記錄的參數，有變動時記錄為歷史紀錄的一步。
+        """
+        params = self.get_params()  # 目前參數
+        if self._history_params is not None and not self._restoring:
+            changes = {name: (self._history_params[name], value) for name, value in params.items()
+                       if self._history_params[name] != value}  # 有變動的參數
+            if changes:
+                self.history.record(changes)
+        self._history_params = params
+
+    def undo(self):
+        """
+        復原上一步。有快照時立即顯示，完整結果在背景重新計算。
+        """
+        step = self.history.undo()
+        if step is not None:
+            self._restore(*step)
+            logger.debug("Undo: %s", sorted(step[0]))  # 記錄除錯訊息
+
+    def redo(self):
+        """
+        重做下一步。有快照時立即顯示，完整結果在背景重新計算。
+        """
+        step = self.history.redo()
+        if step is not None:
+            self._restore(*step)
+            logger.debug("Redo: %s", sorted(step[0]))  # 記錄除錯訊息
+
+    def _restore(self, values, snapshot):
         """
-        if self.original_img:  # 如果圖片已經載入
-            self.current_img = self.original_img.copy()  # 複製原始圖片
-            if self.current_angle != 0:  # 如果圖片旋轉角度不為0
-                self.current_img = self.current_img.rotate(-self.current_angle, expand=True)  # 旋轉圖片
-            if self.is_flipped_horizontally:  # 如果圖片水平翻轉
-                self.current_img = self.current_img.transpose(Image.FLIP_LEFT_RIGHT)  # 水平翻轉圖片
-            if self.is_flipped_vertically:  # 如果圖片垂直翻轉
-                self.current_img = self.current_img.transpose(Image.FLIP_TOP_BOTTOM)  # 垂直翻轉圖片
-            if self.resized_width and self.resized_height:  # 如果已經調整大小
-                self.current_img = self.current_img.resize((self.resized_width, self.resized_height), Image.LANCZOS)  # 調整圖片大小
-            if self.brightness_factor != 1.0:  # 如果亮度比例不為1.0
-                enhancer = ImageEnhance.Brightness(self.current_img)  # 創建亮度調整器
-                self.current_img = enhancer.enhance(self.brightness_factor)  # 調整亮度
-            if self.contrast_factor != 1.0:  # 如果對比度比例不為1.0
-                enhancer = ImageEnhance.Contrast(self.current_img)  # 創建對比度調整器
-                self.current_img = enhancer.enhance(self.contrast_factor)  # 調整對比度
-            if self.saturation_factor != 1.0:  # 如果飽和度比例不為1.0
-                enhancer = ImageEnhance.Color(self.current_img)  # 創建飽和度調整器
-                self.current_img = enhancer.enhance(self.saturation_factor)  # 調整飽和度
-            if self.sharpen_factor != 1.0:  # 如果銳化比例不為1.0
-                self.apply_opencv_sharpen()  # 使用OpenCV進行銳化處理
-            if self.blur_factor != 0.0:  # 如果模糊比例不為0.0
-                self.apply_opencv_blur()  # 使用OpenCV進行模糊處理
+        套用歷史紀錄中的參數值。
+
+        參數:
+        values (dict): 參數名稱對應要套用的值。
+        snapshot (history.Snapshot): 該狀態的快照，沒有時為None。
+        """
+        self._restoring = True  # 不把還原的參數記錄為新的步驟
+        try:
+            for name, value in values.items():
+                if name == "blur_type":
+                    self.blur_type_var.set(value)  # 模糊類型存在單選框變數中
+                else:
+                    setattr(self, name, value)  # 還原參數
+            if snapshot is not None:  # 立即顯示快照
+                self.current_img, self.current_scale = snapshot.to_array(), snapshot.scale
+                self._rendered_key = None
+                self.update_image()
+            self.apply_all_filters()  # 重新計算目前解析度的結果(快取中的階段不會重算)
+        finally:
+            self._restoring = False
+        if self.on_params_restored is not None:
+            self.on_params_restored(self.get_params())  # 同步介面
+
+    def render(self):
+        """
+        以完整解析度執行處理鏈，並將結果顯示在畫布上。
+        目前顯示的不是以目前參數渲染的完整解析度結果時(代理圖、預覽或參數已變動)才重新計算。
+
+        回傳:
+        numpy.ndarray: 完整解析度的處理結果(RGB陣列)，未載入圖片時回傳None。
+        """
+        if self.image_loader is not None and self.image_loader.is_loading():  # 完整解析度尚在背景解碼
+            try:
+                self.image_loader.wait()  # 等待解碼完成
+            except Exception as exc:  # 例如預覽可以顯示但後段損毀的JPEG，視為未載入圖片
+                logger.error("Image decode failed: %s", exc)  # 記錄錯誤
+                messagebox.showerror("無法讀取圖片", f"完整解析度解碼失敗：{exc}")
+                return None
+        if self.original_img is None:  # 如果圖片尚未載入
+            return None
+        if self.render_worker is not None:
+            self.render_worker.cancel()  # 捨棄進行中的預覽，避免覆蓋完整解析度結果
+        params = self.get_params()  # 目前參數
+        rendered_key = (self.source_key, params)  # 此次渲染對應的圖片與參數
+        if self._rendered_key != rendered_key:  # 目前圖片不是以目前參數渲染的完整解析度結果
+            self.current_img = self._full_render()()  # 在主執行緒執行
+            self.current_scale = 1.0  # 記錄目前圖片為完整解析度
+            self._rendered_key = rendered_key  # 參數未變動時直接回傳
             self.update_image()  # 更新畫布顯示圖片
+            logger.debug("Full resolution render finished")  # 記錄除錯訊息
+        return self.current_img
+
+    def _full_render(self):
+        """
+        在主執行緒擷取以完整解析度渲染目前參數所需的狀態，回傳可以在任何執行緒呼叫的函式(render與匯出共用)。
+        完整解析度尚在背景解碼時函式會等待解碼完成；此時不使用階段快取，因為解碼交回後圖片識別碼會更換。
+
+        回傳:
+        callable: 呼叫後回傳完整解析度的唯讀陣列。
+        """
+        pending = self.image_loader.pending() if self.image_loader is not None else None  # 尚未交回的解碼工作
+        original, source_key, params = self.original_img, self.source_key, self.get_params()  # 目前的圖片與參數
+        cache = self.stage_cache if pending is None else None  # 解碼中的圖片識別碼只屬於預覽
+        out_of_core, store = self.out_of_core, self.disk_cache  # 處理方式與磁碟快取
+        key = self._render_cache_key(params)  # 磁碟快取的鍵
+
+        def run():
+            cached = store.get(key, "render") if key is not None else None  # 同一張圖片與設定之前渲染過
+            if cached is not None:
+                logger.debug("Full resolution render loaded from disk cache")  # 記錄除錯訊息
+                return cached  # 唯讀記憶體映射，不需要重新計算
+            source = pending.result()[0] if pending is not None else original  # 等待完整解析度解碼
+            if out_of_core:  # 分塊處理，結果寫入磁碟映射陣列
+                result = tiled.render_tiled(source, params)
+            else:
+                result = pipeline.render(source, source_key, params, cache)  # 完整解析度處理
+            if key is not None:
+                store.put_later(key, "render", result)  # 背景寫入磁碟快取
+            return result
+        return run
 
     def apply_opencv_sharpen(self):
         """
         使用 OpenCV 拉普拉斯運算子
         """
-        if self.current_img:  # 如果圖片已經載入
-            img_cv = cv2.cvtColor(np.array(self.current_img), cv2.COLOR_RGB2BGR)  # 將PIL圖片轉換為OpenCV格式
-            laplacian = cv2.Laplacian(img_cv, cv2.CV_64F)  # 使用拉普拉斯運算子進行銳化處理
-            sharpened = cv2.convertScaleAbs(img_cv + self.sharpen_factor * laplacian)  # 應用銳化因子
-            self.current_img = Image.fromarray(cv2.cvtColor(sharpened, cv2.COLOR_BGR2RGB))  # 將OpenCV圖片轉換為PIL格式
+        if self.current_img is not None:  # 如果圖片已經載入
+            self.current_img = pipeline.sharpen(self.current_img, self.sharpen_factor)  # 銳化當前圖片
+            self._rendered_key = None
 
     def apply_opencv_blur(self):
         """
         使用OpenCV 模糊效果。
         """
-        if self.current_img:  # 如果圖片已經載入
-            img_cv = cv2.cvtColor(np.array(self.current_img), cv2.COLOR_RGB2BGR)  # 將PIL圖片轉換為OpenCV格式
-            blur_type = self.blur_type_var.get()  # 獲取模糊類型
-            if blur_type == "average":  # 如果選擇平均模糊
-                img_cv = cv2.blur(img_cv, (int(self.blur_factor), int(self.blur_factor)))  # 應用平均模糊
-            elif blur_type == "gaussian":  # 如果選擇高斯模糊
-                img_cv = cv2.GaussianBlur(img_cv, (int(self.blur_factor) * 2 + 1, int(self.blur_factor) * 2 + 1), 0)  # 應用高斯模糊
-            self.current_img = Image.fromarray(cv2.cvtColor(img_cv, cv2.COLOR_BGR2RGB))  # 將OpenCV圖片轉換為PIL格式
+        if self.current_img is not None:  # 如果圖片已經載入
+            self.current_img = pipeline.blur(self.current_img, self.blur_factor, self.blur_type_var.get())  # 模糊當前圖片
+            self._rendered_key = None
 
     def reset_image(self):
         """
         恢復圖片到上傳時的狀態。
         """
-        if self.original_img:  # 如果圖片已經載入
-            self.current_img = self.original_img.copy()  # 恢復到原始圖片
+        if self.original_img is not None:  # 如果圖片已經載入
+            self.current_img, self.current_scale = self.original_img, 1.0  # 恢復到原始圖片
+            self._rendered_key = None
             self.scale_factor = 1.0  # 重置縮放比例
+            self.view_center = (0.5, 0.5)  # 重置平移位置
             self.current_angle = 0  # 重置旋轉角度
             self.is_flipped_horizontally = False  # 重置水平翻轉狀態
             self.is_flipped_vertically = False  # 重置垂直翻轉狀態
@@ -277,15 +759,117 @@ class ImageProcessor:
             self.resized_width = None  # 重置調整大小寬度
             self.resized_height = None  # 重置調整大小高度
             self.apply_all_filters()  # 應用所有濾鏡
-            print("Image reset to original state")  # 打印除錯訊息
+            self._show_proxy_until_rendered()  # 背景渲染完成前先顯示代理圖
+            logger.debug("Image reset to original state")  # 記錄除錯訊息
 
     def save_image(self):
         """
-        保存當前圖片到檔案。
+        保存當前圖片到檔案。編碼在背景執行緒進行，不會凍結介面；格式由副檔名決定。
         """
-        if self.current_img:
+        if self.current_img is not None:
             file_path = filedialog.asksaveasfilename(defaultextension=".png",
-                                                     filetypes=[("PNG files", "*.png"), ("All files", "*.*")])
+                                                     filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg *.jpeg"),
+                                                                ("WebP files", "*.webp"), ("TIFF files", "*.tif *.tiff"),
+                                                                ("All files", "*.*")])
             if file_path:
-                self.current_img.save(file_path)
-                print(f"Image saved to {file_path}")  # 打印除錯訊息
+                self.export([exporter.ExportTarget(file_path, preset=self.export_preset)])
+                logger.debug("Image saving to %s", file_path)  # 記錄除錯訊息
+
+    def export_set(self):
+        """
+        選擇資料夾，從同一次渲染同時匯出完整解析度PNG、網頁用JPEG與縮圖。
+        """
+        if self.current_img is not None:
+            directory = filedialog.askdirectory()  # 開啟資料夾選擇對話框
+            if directory:
+                stem = os.path.splitext(os.path.basename(getattr(self.img, "filename", "") or "image"))[0]  # 以原檔名命名
+                self.export(exporter.export_set(directory, stem, self.export_preset))
+
+    def export(self, targets):
+        """
+        以完整解析度渲染一次，並寫出所有輸出。等待解碼、渲染與編碼都在匯出的執行緒池中進行，
+        介面不會凍結；目前顯示的已是以目前參數渲染的完整解析度結果時直接編碼。
+
+        參數:
+        targets (list): exporter.ExportTarget串列。
+
+        回傳:
+        exporter.ExportJob: 此次匯出，未載入圖片時回傳None。
+        """
+        if self.original_img is None and (self.image_loader is None or self.image_loader.pending() is None):  # 圖片尚未載入
+            return None
+        rendered_key = (self.source_key, self.get_params())  # 此次渲染對應的圖片與參數
+        if self._rendered_key == rendered_key:  # 不需要重新渲染(唯讀陣列，之後的編輯不會影響匯出內容)
+            return self.exporter.submit(self.current_img, targets)
+        job = self.exporter.submit_render(self._full_render(), targets)  # 渲染與編碼作為同一次背景匯出
+        self._export_render = (job, rendered_key)
+        return job
+
+    def _adopt_export_render(self):
+        """
+        匯出的渲染步驟完成時在主執行緒呼叫。圖片與參數都沒有變動時顯示這個完整解析度結果，
+        之後的render與匯出不需要重新計算；渲染失敗時顯示錯誤。
+        """
+        if self._export_render is None or not self._export_render[0].render_future.done():
+            return
+        (job, rendered_key), self._export_render = self._export_render, None
+        error = job.render_future.exception()
+        if error is not None:  # 例如預覽可以顯示但後段損毀的JPEG
+            logger.error("Export render failed: %s", error)  # 記錄錯誤
+            messagebox.showerror("匯出失敗", f"完整解析度渲染失敗：{error}")
+            return
+        if rendered_key != (self.source_key, self.get_params()):  # 已開啟其他圖片或變更參數
+            return
+        if self.render_worker is not None:
+            self.render_worker.cancel()  # 捨棄進行中的預覽，避免覆蓋完整解析度結果
+        self.current_img, self.current_scale = job.render_future.result(), 1.0  # 記錄目前圖片為完整解析度
+        self._rendered_key = rendered_key
+        self.update_image()  # 更新畫布顯示圖片
+
+    def _on_export_progress(self, fraction, completed, total):
+        """
+        匯出進度更新時在主執行緒呼叫，轉交給介面。
+        """
+        self._adopt_export_render()  # 渲染步驟完成時顯示結果
+        if self.on_export_progress is not None:
+            self.on_export_progress(fraction, completed, total)
+
+    def process_video(self, sequence=False):
+        """
+        選擇影片或圖片序列的資料夾與輸出路徑，以目前的濾鏡參數在背景處理每個畫格。
+        處理中再次呼叫時停止處理，已寫入的畫格保留。
+
+        參數:
+        sequence (bool): 是否以資料夾選擇圖片序列作為輸入(依檔名中的數字順序讀取)。
+
+        回傳:
+        video.VideoJob: 此次處理，停止或未選擇檔案時回傳None。
+        """
+        if self.video_job is not None and self.video_job.is_running():
+            self.video_job.cancel()  # 停止處理中的影片
+            return None
+        if sequence:
+            source = filedialog.askdirectory(title="選擇圖片序列資料夾")  # 資料夾由video.open_source讀取為圖片序列
+        else:
+            source = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4 *.m4v *.mov *.avi *.mkv"), ("All files", "*.*")])
+        if not source:
+            return None
+        destination = filedialog.asksaveasfilename(defaultextension=".mp4",
+                                                   filetypes=[("MP4 files", "*.mp4"), ("AVI files", "*.avi"),
+                                                              ("Image sequence", "*.png *.jpg"), ("All files", "*.*")])
+        if not destination:
+            return None
+        self.video_job = video.VideoJob(self.canvas, source, destination, self.get_params(),
+                                        on_progress=self.on_video_progress, on_done=self.on_video_done)
+        logger.debug("Video processing %s -> %s", source, destination)  # 記錄除錯訊息
+        return self.video_job
+
+    def save_recipe(self):
+        """
+        將目前的濾鏡參數保存為JSON設定檔，可供batch.py批次處理使用。
+        """
+        file_path = filedialog.asksaveasfilename(defaultextension=".json",
+                                                 filetypes=[("Recipe files", "*.json"), ("All files", "*.*")])
+        if file_path:
+            pipeline.save_recipe(self.get_params(), file_path)  # 寫入設定檔
+            logger.debug("Recipe saved to %s", file_path)  # 記錄除錯訊息
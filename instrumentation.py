@@ -0,0 +1,360 @@
+"""
+輕量的效能量測層，取代分散在各處的print除錯訊息。
+
+處理鏈的每個階段、顯示與解碼都以measure包起來，記錄耗時、輸入與輸出尺寸以及配置的
+記憶體，交給已註冊的收集器(collector)處理。收集器可以在執行中隨時加入或移除：
+LogCollector寫入JSON Lines檔案、StatusCollector提供main.py狀態列的摘要、
+ProfileCollector以cProfile與tracemalloc進行詳細分析。
+沒有任何收集器時measure直接回傳共用的空物件，成本只有一次函式呼叫。
+"""
+import collections  # 導入collections，用於保留最近的紀錄
+import cProfile  # 導入cProfile，用於分析模式
+import io  # 導入io，用於輸出分析報告
+import json  # 導入JSON模組，用於寫入紀錄檔
+import pstats  # 導入pstats，用於整理分析結果
+import threading  # 導入執行緒模組
+import time  # 導入時間模組
+import tracemalloc  # 導入tracemalloc，用於量測記憶體
+
+_collectors = []  # 已註冊的收集器(以新串列取代，讀取時不需要鎖)
+_lock = threading.Lock()  # 保護收集器的註冊與移除
+_local = threading.local()  # 每個執行緒目前進行中的量測
+
+
+def add_collector(collector):
+    """
+    註冊收集器，之後的量測都會交給它。
+
+    參數:
+    collector: 具有collect(record)方法的物件，可選擇實作start()與close()。
+    """
+    global _collectors
+    with _lock:
+        if collector in _collectors:
+            return
+        if hasattr(collector, "start"):
+            collector.start()
+        _collectors = _collectors + [collector]
+
+
+def remove_collector(collector):
+    """
+    移除收集器並呼叫它的close()。
+
+    參數:
+    collector: 先前以add_collector註冊的收集器。
+    """
+    global _collectors
+    with _lock:
+        if collector not in _collectors:
+            return
+        _collectors = [item for item in _collectors if item is not collector]
+    if hasattr(collector, "close"):
+        collector.close()
+
+
+def is_enabled():
+    """
+    是否有任何收集器。
+    """
+    return bool(_collectors)
+
+
+def size_of(arr):
+    """
+    回傳陣列的(寬, 高)，不是陣列時回傳None。
+    """
+    shape = getattr(arr, "shape", None)
+    return (shape[1], shape[0]) if shape is not None and len(shape) >= 2 else None
+
+
+def record(name, seconds, **fields):
+    """
+    直接送出一筆紀錄，用於不適合以measure包起來的事件(例如開啟圖片到第一次顯示的時間)。
+
+    參數:
+    name (str): 事件名稱。
+    seconds (float): 耗時(秒)。
+    fields: 其他欄位。
+    """
+    collectors = _collectors
+    if not collectors:
+        return
+    entry = {"name": name, "seconds": seconds, "time": time.time(), "thread": threading.current_thread().name}
+    entry.update(fields)
+    for collector in collectors:
+        collector.collect(entry)
+
+
+class _NullSpan:
+    """
+    沒有收集器時使用的空量測，所有操作都不做事。
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def result(self, value):
+        """
+        原樣回傳輸出。
+        """
+        return value
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, source, collectors):
+        """
+        初始化_Span類別，量測一段程式。
+
+        參數:
+        name (str): 量測名稱。
+        source (numpy.ndarray): 輸入陣列，用於記錄輸入尺寸。
+        collectors (list): 開始時註冊的收集器。
+        """
+        self.name = name  # 量測名稱
+        self.input_size = size_of(source)  # 輸入尺寸
+        self.source_id = id(source) if source is not None else None  # 用於判斷輸出是否為新配置的陣列
+        self.collectors = collectors  # 收集器
+        self.output = None  # 輸出
+        self.peak = 0  # 內層量測回報的記憶體峰值(tracemalloc)
+        self.profile = None  # 最外層量測的cProfile
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)  # 巢狀深度
+        self.tracing = tracemalloc.is_tracing()  # 分析模式才量測實際配置
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()  # 開始時已配置的記憶體與外層至今的峰值
+            if stack:  # 重設峰值前先交給外層量測保存
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self.start_memory = current
+            tracemalloc.reset_peak()
+        stack.append(self)
+        if self.depth == 0 and any(getattr(collector, "profiles", False) for collector in self.collectors):
+            self.profile = cProfile.Profile()  # cProfile只分析所在的執行緒，因此每個最外層量測各自建立
+            self.profile.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def result(self, value):
+        """
+        記錄輸出並原樣回傳，用法為 img = span.result(stage.apply(img))。
+        """
+        self.output = value
+        return value
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+        _local.stack.pop()
+        entry = {"name": self.name, "seconds": seconds, "depth": self.depth, "time": time.time(),
+                 "thread": threading.current_thread().name, "input_size": self.input_size,
+                 "output_size": size_of(self.output)}
+        if self.tracing and tracemalloc.is_tracing():  # 配置的記憶體峰值(包含內層量測)
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak)
+            entry["allocated_bytes"] = max(0, peak - self.start_memory)
+            if _local.stack:  # 讓外層量測知道這段期間的峰值
+                parent = _local.stack[-1]
+                parent.peak = max(parent.peak, peak)
+        elif self.output is not None and id(self.output) != self.source_id:  # 沒有tracemalloc時以輸出陣列大小估計
+            entry["allocated_bytes"] = getattr(self.output, "nbytes", 0)
+        else:
+            entry["allocated_bytes"] = 0
+        if exc_type is not None:
+            entry["error"] = exc_type.__name__
+        for collector in self.collectors:
+            if self.profile is not None and getattr(collector, "profiles", False):
+                collector.add_profile(self.profile)
+            collector.collect(entry)
+        self.output = None  # 不保留輸出陣列的參照
+        return False
+
+
+def measure(name, source=None):
+    """
+    量測一段程式，用法:
+
+        with instrumentation.measure("color", img) as span:
+            img = span.result(adjust(img))
+
+    參數:
+    name (str): 量測名稱。
+    source (numpy.ndarray): 輸入陣列，用於記錄輸入尺寸。
+    """
+    collectors = _collectors
+    if not collectors:  # 沒有收集器時幾乎沒有成本
+        return _NULL_SPAN
+    return _Span(name, source, collectors)
+
+
+class LogCollector:
+    def __init__(self, path):
+        """
+        初始化LogCollector類別，將每筆紀錄以JSON Lines格式附加到檔案。
+
+        參數:
+        path (str): 紀錄檔路徑。
+        """
+        self.path = path  # 紀錄檔路徑
+        self._file = None  # 開啟的檔案
+        self._lock = threading.Lock()  # 多個執行緒同時寫入時保護檔案
+
+    def start(self):
+        """
+        註冊時開啟紀錄檔。
+        """
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def collect(self, entry):
+        """
+        寫入一筆紀錄。
+
+        參數:
+        entry (dict): 紀錄內容。
+        """
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def close(self):
+        """
+        移除時關閉紀錄檔。
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class StatusCollector:
+    def __init__(self, history=50):
+        """
+        初始化StatusCollector類別，保留最近的紀錄並產生一行摘要，供狀態列顯示。
+        紀錄可能來自背景執行緒，因此由主執行緒以after定期呼叫summary讀取。
+
+        參數:
+        history (int): 保留的紀錄筆數。
+        """
+        self._records = collections.deque(maxlen=history)  # 最近的紀錄
+        self._lock = threading.Lock()  # 保護紀錄
+
+    def collect(self, entry):
+        """
+        保留一筆紀錄。
+
+        參數:
+        entry (dict): 紀錄內容。
+        """
+        with self._lock:
+            self._records.append(entry)
+
+    def summary(self):
+        """
+        回傳最近一次渲染各階段的耗時摘要，例如 "render 42.0 ms | rotate 12.1 | color 5.3 | ..."。
+        """
+        with self._lock:
+            records = list(self._records)
+        latest = {}  # 每個名稱最近一次的紀錄
+        for entry in records:
+            latest[entry["name"]] = entry
+        if not latest:
+            return ""
+        parts = []
+        for name, entry in latest.items():
+            text = f"{name} {entry['seconds'] * 1000:.1f} ms"
+            if entry.get("allocated_bytes"):
+                text += f" ({entry['allocated_bytes'] / 1e6:.1f} MB)"
+            parts.append(text)
+        return " | ".join(parts)
+
+
+class ProfileCollector:
+    profiles = True  # 讓最外層的量測建立cProfile
+
+    def __init__(self, path, top=30):
+        """
+        初始化ProfileCollector類別。啟用期間以tracemalloc量測每個階段實際配置的記憶體，
+        並以cProfile分析每次最外層量測(例如一次渲染)；移除時寫出報告。
+
+        參數:
+        path (str): 報告路徑，另外寫出 path + ".prof" 供pstats或snakeviz讀取。
+        top (int): 報告中列出的函式與記憶體配置位置數量。
+        """
+        self.path = path  # 報告路徑
+        self.top = top  # 報告列出的數量
+        self._stats = None  # 累計的cProfile結果
+        self._records = []  # 啟用期間的紀錄
+        self._lock = threading.Lock()  # 保護累計結果
+        self._started_tracing = False  # 是否由這個收集器啟動tracemalloc
+
+    def start(self):
+        """
+        註冊時開始以tracemalloc追蹤記憶體配置。
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def collect(self, entry):
+        """
+        保留一筆紀錄，移除時整理成報告。
+
+        參數:
+        entry (dict): 紀錄內容。
+        """
+        with self._lock:
+            self._records.append(entry)
+
+    def add_profile(self, profile):
+        """
+        累計一次最外層量測的cProfile結果。
+
+        參數:
+        profile (cProfile.Profile): 已停止的分析器。
+        """
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def close(self):
+        """
+        移除時停止追蹤並寫出報告。
+        """
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None  # 目前仍在使用的記憶體
+        if self._started_tracing:
+            tracemalloc.stop()
+        report = io.StringIO()
+        report.write("stage timings (ms):\n")
+        totals = collections.defaultdict(list)
+        with self._lock:
+            for entry in self._records:
+                totals[entry["name"]].append(entry)
+            stats = self._stats
+        for name, entries in totals.items():
+            seconds = [entry["seconds"] * 1000 for entry in entries]
+            allocated = max(entry.get("allocated_bytes", 0) for entry in entries)
+            report.write(f"  {name:24s} n={len(entries):5d} mean={sum(seconds) / len(seconds):9.2f} "
+                         f"max={max(seconds):9.2f} peak_alloc={allocated / 1e6:8.1f} MB\n")
+        if stats is not None:
+            stats.dump_stats(self.path + ".prof")
+            stats.stream = report
+            report.write("\ncProfile (cumulative):\n")
+            stats.sort_stats("cumulative").print_stats(self.top)
+        if snapshot is not None:
+            report.write("\nlive allocations at close:\n")
+            for stat in snapshot.statistics("lineno")[:self.top]:
+                report.write(f"  {stat}\n")
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(report.getvalue())
@@ -0,0 +1,50 @@
+"""
+延遲載入大型模組(cv2、numpy)，讓視窗不必等待它們載入就能顯示。
+
+lazy_module回傳一個代理模組，第一次存取屬性時才真正匯入，之後把用過的屬性
+直接存在代理模組上，後續存取與一般模組相同。真正的匯入交給importlib，
+匯入系統本身有模組鎖，因此主執行緒與背景執行緒同時第一次使用也是安全的。
+"""
+import importlib  # 導入importlib，用於實際匯入模組
+import types  # 導入types，用於建立代理模組
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        """
+        初始化LazyModule類別。
+
+        參數:
+        name (str): 要延遲匯入的模組名稱。
+        """
+        super().__init__(name)
+        self._module = None  # 實際的模組，第一次使用時才匯入
+
+    def __getattr__(self, attr):
+        """
+        只有代理模組上找不到屬性時才會呼叫：匯入實際模組並快取該屬性。
+
+        參數:
+        attr (str): 屬性名稱。
+        """
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)  # 實際匯入
+        value = getattr(self._module, attr)
+        setattr(self, attr, value)  # 快取，之後不再經過__getattr__
+        return value
+
+    def is_loaded(self):
+        """
+        實際模組是否已經匯入。
+        """
+        return self._module is not None
+
+
+def lazy_module(name):
+    """
+    回傳延遲匯入的模組。
+
+    參數:
+    name (str): 模組名稱，例如 "cv2" 或 "numpy"。
+    """
+    return LazyModule(name)
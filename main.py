@@ -1,7 +1,15 @@
+import logging  # 導入日誌模組
+import os  # 導入os，用於讀取環境變數
 import tkinter as tk
 from tkinter import filedialog, ttk
+import instrumentation  # 導入效能量測層
+from filmstrip import Filmstrip  # 導入資料夾瀏覽列
 from image_processor import ImageProcessor  # 引用自定義的ImageProcessor類別
 
+# 設定日誌：預設只顯示INFO以上，除錯時設定環境變數 IMAGE_EDITOR_LOG_LEVEL=DEBUG
+logging.basicConfig(level=os.environ.get("IMAGE_EDITOR_LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
 # 建立主視窗
 root = tk.Tk()
 root.title("修圖軟體 v1.0")
@@ -21,6 +29,18 @@ left_frame.grid(row=0, column=0, sticky="nsew")
 canvas = tk.Canvas(left_frame, bg="gray")
 canvas.grid(row=0, column=0, sticky="nsew")
 
+# 畫布下方的狀態列，顯示最近一次渲染各階段的耗時
+status_var = tk.StringVar(value="")
+status_label = tk.Label(left_frame, textvariable=status_var, anchor="w", font=("Consolas", 9))
+status_label.grid(row=1, column=0, sticky="ew")
+
+# 狀態列下方的資料夾瀏覽列(縮圖)與水平捲動條
+filmstrip_canvas = tk.Canvas(left_frame, bg="#333", highlightthickness=0)
+filmstrip_canvas.grid(row=2, column=0, sticky="ew")
+filmstrip_scrollbar = tk.Scrollbar(left_frame, orient="horizontal", command=filmstrip_canvas.xview)
+filmstrip_scrollbar.grid(row=3, column=0, sticky="ew")
+filmstrip_canvas.configure(xscrollcommand=filmstrip_scrollbar.set)
+
 # 調整left_frame的grid設定
 left_frame.grid_rowconfigure(0, weight=1)
 left_frame.grid_columnconfigure(0, weight=1)
@@ -56,6 +76,24 @@ reset_button.grid(row=0, column=1, pady=10, padx=10, sticky="w")
 save_button = tk.Button(right_frame, text="保存圖片", command=lambda: image_processor.save_image(), font=font_settings)
 save_button.grid(row=0, column=2, pady=10, padx=10, sticky="w")
 
+# 完整解析度渲染按鈕
+render_button = tk.Button(right_frame, text="完整渲染", command=lambda: image_processor.render(), font=font_settings)
+render_button.grid(row=0, column=3, pady=10, padx=10, sticky="w")
+
+# 匯出編輯設定按鈕(供batch.py批次處理使用)
+recipe_button = tk.Button(right_frame, text="匯出設定", command=lambda: image_processor.save_recipe(), font=font_settings)
+recipe_button.grid(row=0, column=4, pady=10, padx=10, sticky="w")
+
+# 復原與重做按鈕
+undo_button = tk.Button(right_frame, text="復原", command=lambda: image_processor.undo(), font=font_settings)
+undo_button.grid(row=0, column=5, pady=10, padx=10, sticky="w")
+redo_button = tk.Button(right_frame, text="重做", command=lambda: image_processor.redo(), font=font_settings)
+redo_button.grid(row=0, column=6, pady=10, padx=10, sticky="w")
+
+# 開啟資料夾按鈕(在瀏覽列顯示縮圖)
+folder_button = tk.Button(right_frame, text="開啟資料夾", font=font_settings)
+folder_button.grid(row=0, column=7, pady=10, padx=10, sticky="w")
+
 # 調整圖片大小區域
 resize_frame = tk.Frame(right_frame, bd=2, relief="groove")
 resize_frame.grid(row=1, column=0, columnspan=3, pady=10, padx=10, sticky="w")
@@ -87,7 +125,8 @@ rotate_label = tk.Label(rotate_frame, text="旋轉圖片", font=font_settings)
 rotate_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
 
 # 旋轉圖片的滑桿
-rotate_slider = tk.Scale(rotate_frame, from_=0, to=360, orient=tk.HORIZONTAL, length=300, font=font_settings)
+rotate_slider = tk.Scale(rotate_frame, from_=0, to=360, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                         command=lambda value: image_processor.rotate_command(int(float(value))))  # 拖動滑桿時即時預覽
 rotate_slider.grid(row=0, column=1, pady=10, padx=5)
 
 # 旋轉圖片按鈕
@@ -117,7 +156,8 @@ brightness_label = tk.Label(brightness_frame, text="亮度調整", font=font_set
 brightness_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
 
 # 亮度調整滑桿
-brightness_slider = tk.Scale(brightness_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings)
+brightness_slider = tk.Scale(brightness_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                             command=lambda value: image_processor.adjust_brightness(float(value)))  # 拖動滑桿時即時預覽
 brightness_slider.grid(row=0, column=1, pady=10, padx=5)
 brightness_slider.set(1.0)  # 設定滑桿預設值為1.0
 
@@ -133,7 +173,8 @@ contrast_label = tk.Label(contrast_frame, text="對比度調整", font=font_sett
 contrast_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
 
 # 對比度調整滑桿
-contrast_slider = tk.Scale(contrast_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings)
+contrast_slider = tk.Scale(contrast_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                           command=lambda value: image_processor.adjust_contrast(float(value)))  # 拖動滑桿時即時預覽
 contrast_slider.grid(row=0, column=1, pady=10, padx=5)
 contrast_slider.set(1.0)  # 設定滑桿預設值為1.0
 
@@ -149,7 +190,8 @@ saturation_label = tk.Label(saturation_frame, text="飽和度調整", font=font_
 saturation_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
 
 # 飽和度調整滑桿
-saturation_slider = tk.Scale(saturation_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings)
+saturation_slider = tk.Scale(saturation_frame, from_=0.5, to=2.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                             command=lambda value: image_processor.adjust_saturation(float(value)))  # 拖動滑桿時即時預覽
 saturation_slider.grid(row=0, column=1, pady=10, padx=5)
 saturation_slider.set(1.0)  # 設定滑桿預設值為1.0
 
@@ -165,7 +207,8 @@ filter_label = tk.Label(filter_frame, text="濾鏡效果", font=font_settings)
 filter_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
 
 # 銳化滑桿
-sharpen_slider = tk.Scale(filter_frame, from_=1.0, to=5.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings)
+sharpen_slider = tk.Scale(filter_frame, from_=1.0, to=5.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                          command=lambda value: image_processor.sharpen_image(float(value)))  # 拖動滑桿時即時預覽
 sharpen_slider.grid(row=0, column=1, pady=10, padx=5)
 sharpen_slider.set(1.0)  # 設定滑桿預設值為1.0
 
@@ -173,8 +216,9 @@ sharpen_slider.set(1.0)  # 設定滑桿預設值為1.0
 sharpen_button = tk.Button(filter_frame, text="調整銳化", command=lambda: image_processor.sharpen_image(sharpen_slider.get()), font=font_settings)
 sharpen_button.grid(row=0, column=2, pady=10, padx=5)
 
-# 模糊滑桿
-blur_slider = tk.Scale(filter_frame, from_=0.0, to=10.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings)
+# 模糊滑桿(高斯模糊在約80以上時sigma超過24，改為先縮小再模糊，成本不隨半徑增加)
+blur_slider = tk.Scale(filter_frame, from_=0.0, to=200.0, resolution=0.1, orient=tk.HORIZONTAL, length=300, font=font_settings,
+                       command=lambda value: image_processor.blur_image(float(value)))  # 拖動滑桿時即時預覽
 blur_slider.grid(row=1, column=1, pady=10, padx=5)
 blur_slider.set(0.0)  # 設定滑桿預設值為0.0
 
@@ -187,23 +231,260 @@ blur_type_frame = tk.Frame(filter_frame)
 blur_type_frame.grid(row=2, column=1, columnspan=3, sticky="w", pady=10)
 
 blur_type_var = tk.StringVar(value="average")
-blur_avg_rb = ttk.Radiobutton(blur_type_frame, text="平均濾波器", variable=blur_type_var, value="average")
+blur_avg_rb = ttk.Radiobutton(blur_type_frame, text="平均濾波器", variable=blur_type_var, value="average",
+                              command=lambda: image_processor.apply_all_filters())
 blur_avg_rb.grid(row=0, column=0, padx=5, sticky='w')
 
-blur_gaussian_rb = ttk.Radiobutton(blur_type_frame, text="高斯濾波器", variable=blur_type_var, value="gaussian")
+blur_gaussian_rb = ttk.Radiobutton(blur_type_frame, text="高斯濾波器", variable=blur_type_var, value="gaussian",
+                                   command=lambda: image_processor.apply_all_filters())
 blur_gaussian_rb.grid(row=0, column=1, padx=5, sticky='w')
 
+# 效能量測區域：可在執行中開啟或關閉
+diagnostics_frame = tk.Frame(right_frame, bd=2, relief="groove")
+diagnostics_frame.grid(row=8, column=0, columnspan=3, pady=10, padx=10, sticky="w")
+
+diagnostics_label = tk.Label(diagnostics_frame, text="效能量測", font=font_settings)
+diagnostics_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
+
+status_collector = instrumentation.StatusCollector()  # 狀態列使用的收集器
+log_collector = instrumentation.LogCollector("instrumentation.jsonl")  # 寫入紀錄檔的收集器
+profile_collector = None  # 分析模式的收集器，每次開啟時重新建立
+
+
+def toggle_collector(enabled, collector):
+    """
+    依核取方塊的狀態註冊或移除收集器。
+
+    參數:
+    enabled (bool): 是否啟用。
+    collector: 收集器。
+    """
+    if enabled:
+        instrumentation.add_collector(collector)
+    else:
+        instrumentation.remove_collector(collector)
+
+
+def toggle_status():
+    """
+    開啟或關閉狀態列的耗時顯示。
+    """
+    toggle_collector(status_enabled.get(), status_collector)
+    if not status_enabled.get():
+        status_var.set("")  # 清除狀態列
+
+
+def toggle_profile():
+    """
+    開啟或關閉分析模式，關閉時寫出報告到profile.txt。
+    """
+    global profile_collector
+    if profile_enabled.get():
+        profile_collector = instrumentation.ProfileCollector("profile.txt")
+        instrumentation.add_collector(profile_collector)
+    elif profile_collector is not None:
+        instrumentation.remove_collector(profile_collector)  # 移除時寫出報告
+        logging.getLogger(__name__).info("Profile written to profile.txt")
+        profile_collector = None
+
+
+def refresh_status():
+    """
+    定期以主執行緒更新狀態列(紀錄可能來自背景執行緒)。
+    """
+    if status_enabled.get():
+        status_var.set(status_collector.summary())
+    root.after(250, refresh_status)
+
+
+status_enabled = tk.BooleanVar(value=True)
+status_check = tk.Checkbutton(diagnostics_frame, text="狀態列", variable=status_enabled, command=toggle_status, font=font_settings)
+status_check.grid(row=0, column=1, pady=10, padx=5)
+
+log_enabled = tk.BooleanVar(value=False)
+log_check = tk.Checkbutton(diagnostics_frame, text="寫入紀錄檔", variable=log_enabled, font=font_settings,
+                           command=lambda: toggle_collector(log_enabled.get(), log_collector))
+log_check.grid(row=0, column=2, pady=10, padx=5)
+
+profile_enabled = tk.BooleanVar(value=False)
+profile_check = tk.Checkbutton(diagnostics_frame, text="分析模式", variable=profile_enabled, command=toggle_profile, font=font_settings)
+profile_check.grid(row=0, column=3, pady=10, padx=5)
+
+toggle_status()  # 預設開啟狀態列
+refresh_status()  # 開始更新狀態列
+
+# 匯出區域：編碼設定、多格式匯出與進度
+export_frame = tk.Frame(right_frame, bd=2, relief="groove")
+export_frame.grid(row=9, column=0, columnspan=3, pady=10, padx=10, sticky="w")
+
+export_label = tk.Label(export_frame, text="匯出", font=font_settings)
+export_label.grid(row=0, column=0, pady=10, padx=5, sticky="w")
+
+# 編碼設定選擇框(速度與檔案大小的取捨)
+export_preset_var = tk.StringVar(value="balanced")
+export_preset_box = ttk.Combobox(export_frame, textvariable=export_preset_var, values=("fast", "balanced", "small"),
+                                 state="readonly", width=10, font=font_settings)
+export_preset_box.grid(row=0, column=1, pady=10, padx=5)
+export_preset_box.bind("<<ComboboxSelected>>", lambda event: setattr(image_processor, "export_preset", export_preset_var.get()))
+
+# 同時匯出完整解析度PNG、網頁用JPEG與縮圖
+export_set_button = tk.Button(export_frame, text="多格式匯出", command=lambda: image_processor.export_set(), font=font_settings)
+export_set_button.grid(row=0, column=2, pady=10, padx=5)
+
+# 匯出進度
+export_progress = ttk.Progressbar(export_frame, length=200, maximum=1.0)
+export_progress.grid(row=0, column=3, pady=10, padx=5)
+export_progress_var = tk.StringVar(value="")
+export_progress_label = tk.Label(export_frame, textvariable=export_progress_var, font=font_settings)
+export_progress_label.grid(row=0, column=4, pady=10, padx=5)
+
+# 以目前的設定處理整段影片或圖片序列，處理中再按一次停止
+video_button = tk.Button(export_frame, text="處理影片", command=lambda: image_processor.process_video(), font=font_settings)
+video_button.grid(row=0, column=5, pady=10, padx=5)
+
+# 以資料夾中的圖片序列作為輸入，處理中再按一次停止
+sequence_button = tk.Button(export_frame, text="處理序列", command=lambda: image_processor.process_video(sequence=True),
+                            font=font_settings)
+sequence_button.grid(row=0, column=6, pady=10, padx=5)
+
 # 建立ImageProcessor物件
 image_processor = ImageProcessor(canvas, left_frame, resize_text_w, resize_text_h, blur_type_var)
 
 # 上傳圖片按鈕設定事件
 upload_button.config(command=image_processor.upload_image)
 
+# 資料夾瀏覽列：縮圖存入磁碟快取，點選時開啟圖片
+filmstrip = Filmstrip(filmstrip_canvas, image_processor.disk_cache, image_processor.open_image)
+
+
+def open_folder():
+    """
+    選擇資料夾並在瀏覽列顯示其中的圖片。
+    """
+    directory = filedialog.askdirectory()  # 開啟資料夾選擇對話框
+    if directory:
+        filmstrip.open_folder(directory)
+
+
+folder_button.config(command=open_folder)
+
 # 恢復預設按鈕設定事件
 reset_button.config(command=image_processor.reset_image)
 
+def sync_controls(params):
+    """
+    復原或重做後，讓滑桿與輸入框顯示目前的參數。
+
+    參數:
+    params (dict): 目前的濾鏡參數。
+    """
+    rotate_slider.set(params["current_angle"])  # 旋轉角度
+    brightness_slider.set(params["brightness_factor"])  # 亮度
+    contrast_slider.set(params["contrast_factor"])  # 對比度
+    saturation_slider.set(params["saturation_factor"])  # 飽和度
+    sharpen_slider.set(params["sharpen_factor"])  # 銳化
+    blur_slider.set(params["blur_factor"])  # 模糊
+    for entry, value in ((resize_text_w, params["resized_width"]), (resize_text_h, params["resized_height"])):
+        entry.delete(0, tk.END)  # 調整大小的寬度與高度
+        if value:
+            entry.insert(0, str(value))
+
+
+image_processor.on_params_restored = sync_controls
+
+
+def show_export_progress(fraction, completed, total):
+    """
+    顯示匯出進度。
+
+    參數:
+    fraction (float): 整體完成比例。
+    completed (int): 已完成的輸出數量。
+    total (int): 輸出總數量。
+    """
+    export_progress["value"] = fraction
+    export_progress_var.set(f"{completed}/{total}" if completed < total else "完成")
+
+
+image_processor.on_export_progress = show_export_progress
+
+
+def show_video_progress(done, total, fps):
+    """
+    顯示影片處理進度。
+
+    參數:
+    done (int): 已完成的畫格數。
+    total (int): 總畫格數，無法取得時為None。
+    fps (float): 目前每秒處理的畫格數。
+    """
+    video_button.config(text="停止")
+    sequence_button.config(text="停止")
+    export_progress["value"] = done / total if total else 0.0
+    export_progress_var.set(f"{done}/{total or '?'} ({fps:.1f} fps)")
+
+
+def show_video_done(result):
+    """
+    影片處理結束後恢復按鈕並顯示結果。
+
+    參數:
+    result (dict): video.process的結果，失敗時包含error欄位。
+    """
+    video_button.config(text="處理影片")
+    sequence_button.config(text="處理序列")
+    if "error" in result:
+        export_progress_var.set("影片處理失敗")
+        return
+    export_progress["value"] = 1.0
+    export_progress_var.set(f"完成 {result['frames']} 格 ({result['fps']:.1f} fps)")
+
+
+image_processor.on_video_progress = show_video_progress
+image_processor.on_video_done = show_video_done
+
+
+def on_close():
+    """
+    關閉視窗前等待背景匯出與磁碟快取寫入完成，避免寫出不完整的檔案。
+    處理中的影片會停止，已寫入的畫格正常結束成檔案。
+    """
+    if image_processor.video_job is not None:
+        image_processor.video_job.cancel()
+        image_processor.video_job.wait()
+    if image_processor.exporter.is_busy():
+        image_processor.exporter.wait()
+    filmstrip.close()  # 取消尚未開始的縮圖
+    if image_processor.disk_cache is not None:
+        image_processor.disk_cache.wait()
+    root.destroy()
+
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+
+# 綁定復原與重做的快捷鍵
+root.bind("<Control-z>", lambda event: image_processor.undo())
+root.bind("<Control-y>", lambda event: image_processor.redo())
+
+# 綁定瀏覽列的上一張與下一張(Page Up / Page Down)
+root.bind("<Prior>", lambda event: filmstrip.previous())
+root.bind("<Next>", lambda event: filmstrip.next())
+
 # 綁定滾輪事件
 canvas.bind("<MouseWheel>", image_processor.zoom)
 
-# 循環顯示視窗
-root.mainloop()
+# 綁定拖曳平移事件
+canvas.bind("<ButtonPress-1>", image_processor.start_pan)
+canvas.bind("<B1-Motion>", image_processor.pan)
+
+# 畫布尺寸改變時重新繪製
+canvas.bind("<Configure>", image_processor.on_canvas_configure)
+
+# 量測啟動時間：設定環境變數時，視窗第一次畫出後立即回報並結束(見benchmarks/bench_startup.py)
+if os.environ.get("IMAGE_EDITOR_STARTUP_BENCHMARK"):
+    root.update()  # 畫出視窗
+    print("first window shown", flush=True)
+    root.destroy()
+else:
+    # 循環顯示視窗
+    root.mainloop()
@@ -3,6 +3,25 @@
 
 block_cipher = None
 
+# 程式沒有用到、但會被相依套件的選用匯入帶進打包檔的模組(見build/main/warn-main.txt與xref-main.html)。
+# 排除後打包檔較小，單檔執行檔啟動時需要解壓縮的內容也較少。
+EXCLUDES = [
+    # 打包與開發工具：setuptools/pkg_resources由PyInstaller的runtime hook與cffi帶入
+    'setuptools', 'pkg_resources', 'distutils', '_distutils_hack', 'packaging', 'pyparsing',
+    'importlib_metadata', 'zipp', 'platformdirs', 'docutils', 'cffi', 'pycparser',
+    # 說明文件與系統資訊工具。numpy 1.x匯入時就需要numpy._pytesttester，不可排除；
+    # numpy.testing與其帶入的unittest、doctest要實際打包並確認程式可以啟動後才排除
+    'pydoc', 'psutil',
+    # 用不到的numpy子套件與設定資訊(numpy.__config__帶入yaml)
+    'numpy.array_api', 'numpy.distutils', 'numpy.f2py', 'yaml',
+    # pyparsing.diagram帶入的樣板引擎
+    'jinja2', 'markupsafe',
+    # OpenCV的G-API、型別提示與輔助套件，cv2載入時缺少它們會自動略過
+    'cv2.gapi', 'cv2.typing', 'cv2.mat_wrapper', 'cv2.utils', 'cv2.misc', 'cv2.data',
+    # Pillow的Qt/顯示/色彩管理整合
+    'PIL.ImageQt', 'PIL.ImageShow', 'PIL.ImageCms', 'defusedxml',
+]
+
 
 a = Analysis(
     ['main.py'],
@@ -13,12 +32,14 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
     noarchive=False,
 )
+# cv2.data只有人臉偵測用的Haar cascade資料檔，程式沒有使用
+a.datas = [entry for entry in a.datas if not entry[0].replace('\\', '/').startswith('cv2/data/')]
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
 exe = EXE(
@@ -33,7 +54,7 @@ exe = EXE(
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
-    upx_exclude=[],
+    upx_exclude=['cv2.pyd', 'opencv_videoio_ffmpeg*.dll'],  # 大型DLL經UPX壓縮後每次啟動都要解壓縮，反而較慢
     runtime_tmpdir=None,
     console=True,
     disable_windowed_traceback=False,
@@ -0,0 +1,468 @@
+import json  # 導入JSON模組，用於讀寫編輯設定檔
+import math  # 導入數學模組
+from PIL import Image  # 導入PIL庫中的Image
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+import bands  # 導入多核心分帶處理
+import blur_engine  # 導入與半徑無關的模糊引擎
+import color_engine  # 導入融合色彩調整引擎
+import geometry  # 導入幾何轉換矩陣
+import instrumentation  # 導入效能量測層
+import sharpen_engine  # 導入低記憶體銳化引擎
+
+
+def default_params():
+    """
+    回傳所有濾鏡參數的預設值，鍵名與ImageProcessor的屬性名稱相同。
+
+    回傳:
+    dict: 參數名稱對應預設值。
+    """
+    return {
+        "current_angle": 0,  # 旋轉角度
+        "is_flipped_horizontally": False,  # 水平翻轉狀態
+        "is_flipped_vertically": False,  # 垂直翻轉狀態
+        "resized_width": None,  # 調整大小後的寬度
+        "resized_height": None,  # 調整大小後的高度
+        "brightness_factor": 1.0,  # 亮度比例
+        "contrast_factor": 1.0,  # 對比度比例
+        "saturation_factor": 1.0,  # 飽和度比例
+        "sharpen_factor": 1.0,  # 銳化比例
+        "blur_factor": 0.0,  # 模糊比例
+        "blur_type": "average",  # 模糊類型
+    }
+
+
+def load_recipe(path):
+    """
+    讀取JSON格式的編輯設定檔。缺少的參數使用預設值，未知的參數會引發錯誤。
+
+    參數:
+    path (str): 設定檔路徑。
+
+    回傳:
+    dict: 濾鏡參數，格式同default_params()。
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        recipe = json.load(file)  # 讀取設定檔
+    params = default_params()  # 從預設值開始
+    unknown = set(recipe) - set(params)  # 找出未知的參數
+    if unknown:
+        raise ValueError(f"未知的設定參數: {', '.join(sorted(unknown))}")
+    params.update(recipe)  # 套用設定檔
+    return params
+
+
+def save_recipe(params, path):
+    """
+    將濾鏡參數寫入JSON格式的編輯設定檔。
+
+    參數:
+    params (dict): 濾鏡參數。
+    path (str): 設定檔路徑。
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(params, file, ensure_ascii=False, indent=2)  # 寫入設定檔
+
+
+def to_array(img):
+    """
+    將PIL圖片轉換為處理鏈使用的RGB連續陣列，只在讀取檔案時呼叫一次。
+    非RGB模式(例如L、P、RGBA)會先轉換為RGB。
+
+    參數:
+    img (PIL.Image.Image): 輸入圖片。
+
+    回傳:
+    numpy.ndarray: (高, 寬, 3)的uint8陣列，設為唯讀以保護快取內容。
+    """
+    if img.mode != "RGB":  # 統一為RGB
+        img = img.convert("RGB")
+    arr = np.ascontiguousarray(np.asarray(img))  # 轉換為連續陣列
+    arr.flags.writeable = False  # 設為唯讀
+    return arr
+
+
+def to_image(arr):
+    """
+    將陣列轉換為PIL圖片，只在顯示(ImageTk)與存檔時使用。
+
+    參數:
+    arr (numpy.ndarray): RGB陣列。
+    """
+    return Image.fromarray(arr)  # 轉換為PIL格式
+
+
+def array_size(arr):
+    """
+    回傳陣列的(寬, 高)，與PIL的size相同順序。
+
+    參數:
+    arr (numpy.ndarray): 圖片陣列。
+    """
+    return arr.shape[1], arr.shape[0]
+
+
+def transform(arr, params, scale=1.0):
+    """
+    一次完成旋轉、翻轉與調整大小，整張圖片只重新取樣一次。
+    沒有調整大小的90度倍數旋轉與翻轉合併為一次無損的轉置(互相抵消時不複製)；
+    其他情況將三者組合成一個仿射矩陣，以cv2.warpAffine單次取樣，擴展後的尺寸由矩陣直接計算。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    params (dict): 濾鏡參數，使用current_angle、翻轉狀態與resized_width/resized_height。
+    scale (float): 圖片相對於原始解析度的比例，用於換算調整大小的目標尺寸。
+    """
+    width, height = array_size(arr)  # 輸入尺寸
+    resized = bool(params["resized_width"] and params["resized_height"])  # 是否調整大小
+    matrix, size = geometry.compose(width, height, params, scale)  # 組合後的矩陣與輸出尺寸
+    turns = geometry.quarter_turns(params["current_angle"])  # 90度倍數時的轉動次數
+    if turns is None or resized:  # 需要重新取樣，與分塊處理共用同一套預濾波與邊界規則
+        return warp(arr, matrix, size, resized, warp_border(params))
+    return transpose(arr, turns, params["is_flipped_horizontally"], params["is_flipped_vertically"])
+
+
+def transpose(arr, turns, horizontal, vertical):
+    """
+    以一次OpenCV呼叫完成90度倍數的旋轉與翻轉(無損)。垂直翻轉等於轉180度再水平翻轉，
+    因此所有組合都可以化簡為(轉動次數, 是否水平翻轉)的8種情況之一。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    turns (int): 順時針轉動90度的次數。
+    horizontal (bool): 轉動後是否水平翻轉。
+    vertical (bool): 轉動後是否垂直翻轉。
+
+    回傳:
+    numpy.ndarray: 結果陣列，互相抵消時為arr本身。
+    """
+    if vertical:  # 垂直翻轉 = 轉180度 + 水平翻轉
+        turns, horizontal = turns + 2, not horizontal
+    turns %= 4
+    if not horizontal:
+        if turns == 0:  # 互相抵消
+            return arr
+        if turns == 2:
+            return cv2.flip(arr, -1)  # 轉180度
+        return cv2.rotate(arr, cv2.ROTATE_90_CLOCKWISE if turns == 1 else cv2.ROTATE_90_COUNTERCLOCKWISE)
+    if turns == 0:
+        return cv2.flip(arr, 1)  # 水平翻轉
+    if turns == 2:
+        return cv2.flip(arr, 0)  # 轉180度再水平翻轉 = 垂直翻轉
+    result = cv2.transpose(arr)  # 順時針轉90度再水平翻轉 = 轉置
+    if turns == 3:  # 逆時針轉90度再水平翻轉 = 反轉置
+        cv2.flip(result, -1, dst=result)
+    return result
+
+
+def warp_interpolation(matrix, resized):
+    """
+    選擇仿射轉換的插值方式。只有旋轉翻轉或像素一一對應時與PIL相同使用最近鄰；
+    調整大小時縮小使用線性插值(搭配預濾波)，放大使用雙三次插值(warpAffine的Lanczos比雙三次慢約4倍)。
+
+    參數:
+    matrix (numpy.ndarray): 輸出到輸入的矩陣。
+    resized (bool): 是否調整大小。
+    """
+    if not resized or np.allclose(matrix, np.round(matrix)):  # 整數矩陣(例如整數倍縮小後的90度旋轉)像素一一對應，最近鄰即無損
+        return cv2.INTER_NEAREST
+    return cv2.INTER_LINEAR if min(geometry.output_scale(matrix)) < 1.0 else cv2.INTER_CUBIC
+
+
+def warp_border(params):
+    """
+    仿射轉換的邊界模式，記憶體內與分塊處理共用。90度倍數的旋轉沒有擴展區域，邊緣延伸原圖；
+    其他角度的擴展區域以黑色填充，與PIL相同。
+
+    參數:
+    params (dict): 濾鏡參數，使用current_angle。
+    """
+    return cv2.BORDER_REPLICATE if geometry.quarter_turns(params["current_angle"]) is not None else cv2.BORDER_CONSTANT
+
+
+def reduce_blocks(arr, factor_x, factor_y, out):
+    """
+    以INTER_AREA做整數倍的區塊平均(不插值，相當於盒狀預濾波)。無法整除的最後一列/行區塊只平均剩餘的像素，
+    每個輸出像素只取決於自己的區塊，因此分條處理(起點對齊區塊)的結果與整張處理相同。
+
+    參數:
+    arr (numpy.ndarray): 輸入陣列。
+    factor_x (int): 水平方向的縮小倍數。
+    factor_y (int): 垂直方向的縮小倍數。
+    out (numpy.ndarray): 輸出陣列，尺寸為輸入尺寸除以倍數後無條件進位。
+    """
+    height, width = arr.shape[:2]  # 輸入尺寸
+    full_x, full_y = width // factor_x * factor_x, height // factor_y * factor_y  # 完整區塊的範圍
+    rows = [(0, full_y, 0, full_y // factor_y), (full_y, height, full_y // factor_y, out.shape[0])]  # (輸入起訖, 輸出起訖)
+    columns = [(0, full_x, 0, full_x // factor_x), (full_x, width, full_x // factor_x, out.shape[1])]
+    for y0, y1, oy0, oy1 in rows:
+        for x0, x1, ox0, ox1 in columns:
+            if y0 < y1 and x0 < x1:  # 略過空的部分
+                out[oy0:oy1, ox0:ox1] = cv2.resize(arr[y0:y1, x0:x1], (ox1 - ox0, oy1 - oy0), interpolation=cv2.INTER_AREA)
+    return out
+
+
+def prefilter(arr, matrix, allocate=None, strip_rows=None):
+    """
+    縮小前的抗鋸齒處理，記憶體內的warp與分塊處理共用：先做整數倍的區塊平均，
+    剩餘不到2倍的縮小再以高斯預濾波。逐條處理，每條只需要讀取自己的範圍(加上高斯的鄰域)，
+    因此輸入可以是memmap，輸出也可以配置在磁碟上；分條與整張處理的結果相同。
+
+    參數:
+    arr (numpy.ndarray): 輸入陣列(可為memmap)。
+    matrix (numpy.ndarray): 3x3矩陣，輸出連續座標對應回輸入連續座標。
+    allocate (callable): 以形狀配置輸出陣列，為None時配置在記憶體中。
+    strip_rows (int): 每條的列數，為None時整張一次處理。
+
+    回傳:
+    tuple: (預濾波後的陣列, 對應到該陣列的矩陣)，不需要縮小時為原本的arr與matrix。
+    """
+    allocate = allocate or (lambda shape: np.empty(shape, dtype=arr.dtype))  # 預設配置在記憶體中
+    scale_x, scale_y = geometry.output_scale(matrix)  # 輸出相對於輸入的倍率
+    factor_x, factor_y = max(1, int(1.0 / scale_x + 1e-6)), max(1, int(1.0 / scale_y + 1e-6))  # 整數倍的縮小
+    if factor_x > 1 or factor_y > 1:
+        height, width = arr.shape[:2]
+        reduced = allocate((-(-height // factor_y), -(-width // factor_x)) + arr.shape[2:])  # 區塊平均後的陣列
+        step = max(1, (strip_rows or height) // factor_y) * factor_y  # 每條的列數，對齊區塊
+        for y0 in range(0, height, step):
+            reduce_blocks(arr[y0:y0 + step], factor_x, factor_y, reduced[y0 // factor_y:(y0 + step) // factor_y])
+        arr = reduced
+        matrix = np.diag([1.0 / factor_x, 1.0 / factor_y, 1.0]) @ matrix  # 輸入座標改為縮小後的座標
+    sigma_x, sigma_y = geometry.prefilter_sigmas(matrix)  # 剩餘的縮小需要的預濾波強度
+    if sigma_x > 0 or sigma_y > 0:
+        height = arr.shape[0]
+        strip_rows = strip_rows or height
+        halo = int(math.ceil(4 * sigma_y)) + 1  # 高斯核的垂直半徑
+        blurred = allocate(arr.shape)
+        for y0 in range(0, height, strip_rows):
+            y1 = min(height, y0 + strip_rows)
+            r0, r1 = max(0, y0 - halo), min(height, y1 + halo)  # 含鄰域的範圍
+            work = cv2.GaussianBlur(np.ascontiguousarray(arr[r0:r1]), (0, 0), max(sigma_x, 0.01), max(sigma_y, 0.01))
+            blurred[y0:y1] = work[y0 - r0:y1 - r0]  # 去除鄰域後寫入
+        arr = blurred
+    return arr, matrix
+
+
+def warp(arr, matrix, size, resized, border=None):
+    """
+    以單次cv2.warpAffine套用仿射轉換，縮小時先以prefilter做區塊平均與高斯預濾波。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    matrix (numpy.ndarray): 3x3矩陣，輸出連續座標對應回輸入連續座標。
+    size (tuple): 輸出(寬, 高)。
+    resized (bool): 是否調整大小。
+    border (int): OpenCV的邊界模式(見warp_border)，為None時以黑色填充。
+    """
+    if resized:
+        arr, matrix = prefilter(arr, matrix)  # 抗鋸齒
+    border = cv2.BORDER_CONSTANT if border is None else border  # 預設以黑色填充
+    return cv2.warpAffine(arr, geometry.to_opencv(matrix), size, flags=warp_interpolation(matrix, resized) | cv2.WARP_INVERSE_MAP,
+                          borderMode=border, borderValue=0)  # 單次取樣
+
+
+def resize_to(arr, size):
+    """
+    將陣列調整為指定的(寬, 高)。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    size (tuple): 目標(寬, 高)。
+    """
+    if size == array_size(arr):  # 尺寸相同時不處理
+        return arr
+    shrinking = size[0] * size[1] < arr.shape[0] * arr.shape[1]  # 是否為縮小
+    interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4  # 選擇插值方式
+    return cv2.resize(arr, size, interpolation=interpolation)  # 調整大小
+
+
+def adjust_color(arr, brightness, contrast, saturation):
+    """
+    一次套用亮度、對比度與飽和度。多核心時分帶處理：對比度需要的直方圖逐條計算後相加，
+    查找表只建立一次，各條直接寫入同一個輸出陣列。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    brightness (float): 亮度比例因子。
+    contrast (float): 對比度比例因子。
+    saturation (float): 飽和度比例因子。
+    """
+    if len(bands.band_ranges(arr.shape[0])) == 1:  # 單執行緒
+        return color_engine.adjust_color(arr, brightness, contrast, saturation)  # 單次融合調整
+    histograms = sum(bands.map_bands(color_engine.channel_histograms, arr)) if contrast != 1.0 else None  # 整張圖片的直方圖
+    tone_lut = color_engine.build_tone_lut(None, brightness, contrast, histograms) if (brightness, contrast) != (1.0, 1.0) else None
+    out = np.empty_like(arr)  # 共用的輸出陣列
+    bands.run(lambda top, bottom: color_engine.adjust_color(arr[top:bottom], brightness, contrast, saturation,
+                                                            out=out[top:bottom], tone_lut=tone_lut), arr.shape[0])
+    return out
+
+
+def sharpen(arr, factor):
+    """
+    使用 OpenCV 拉普拉斯運算子銳化圖片。逐條處理，額外記憶體只有一條帶狀區域的大小；
+    多核心時各執行緒負責不同的列範圍，寫入同一個輸出陣列。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    factor (float): 銳化比例因子。
+    """
+    out = np.empty_like(arr)  # 共用的輸出陣列，各條直接寫入(鄰域由sharpen_rows讀取原圖)
+    bands.run(lambda top, bottom: sharpen_engine.sharpen(arr, factor, out, rows=(top, bottom)), arr.shape[0])
+    return out
+
+
+def blur(arr, factor, blur_type, scale=1.0):
+    """
+    模糊圖片，成本與模糊半徑無關，blur_factor可以是小數。多核心時分帶處理，每條多讀取模糊半徑的列。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列。
+    factor (float): 模糊比例因子。
+    blur_type (str): "average" 或 "gaussian"。
+    scale (float): 圖片相對於原始解析度的比例，代理圖會依此縮小模糊核，使預覽與最終輸出一致。
+    """
+    return bands.apply(lambda band: blur_engine.blur(band, factor, blur_type, scale), arr,
+                       blur_engine.blur_radius(factor, blur_type, scale), blur_engine.blur_alignment(factor, blur_type, scale))  # 與半徑無關的模糊，多核心時分帶處理
+
+
+def blur_radius(factor, blur_type, scale=1.0):
+    """
+    回傳blur使用的鄰域半徑(像素)，分塊處理時用來決定每塊需要額外讀取的邊界。
+
+    參數:
+    factor (float): 模糊比例因子。
+    blur_type (str): "average" 或 "gaussian"。
+    scale (float): 圖片相對於原始解析度的比例。
+    """
+    return blur_engine.blur_radius(factor, blur_type, scale)
+
+
+class RenderCancelled(Exception):
+    """
+    處理鏈在階段之間發現工作已過時時引發。
+    """
+
+
+class Stage:
+    def __init__(self, name, param_names, is_active, apply):
+        """
+        初始化Stage類別，描述處理鏈中的一個階段。
+
+        參數:
+        name (str): 階段名稱。
+        param_names (tuple): 此階段使用的參數名稱。
+        is_active (callable): 接收參數字典，回傳此階段是否需要執行。
+        apply (callable): 接收圖片、參數字典與解析度比例，回傳處理後的圖片。
+        """
+        self.name = name  # 設置階段名稱
+        self.param_names = param_names  # 設置參數名稱
+        self.is_active = is_active  # 設置是否執行的判斷函式
+        self.apply = apply  # 設置處理函式
+
+    def key(self, params, previous_key):
+        """
+        計算此階段的快取鍵值，由自身參數與前一階段的鍵值組成。
+
+        參數:
+        params (dict): 濾鏡參數。
+        previous_key (tuple): 前一階段的鍵值。
+        """
+        return (self.name, tuple(params[name] for name in self.param_names), previous_key)
+
+
+# 依執行順序排列的處理階段
+STAGES = [
+    Stage("geometry", ("current_angle", "is_flipped_horizontally", "is_flipped_vertically", "resized_width", "resized_height"),
+          lambda p: p["current_angle"] % 360 != 0 or p["is_flipped_horizontally"] or p["is_flipped_vertically"]
+          or bool(p["resized_width"] and p["resized_height"]),
+          lambda img, p, scale: transform(img, p, scale)),
+    Stage("color", ("brightness_factor", "contrast_factor", "saturation_factor"),
+          lambda p: (p["brightness_factor"], p["contrast_factor"], p["saturation_factor"]) != (1.0, 1.0, 1.0),
+          lambda img, p, scale: adjust_color(img, p["brightness_factor"], p["contrast_factor"], p["saturation_factor"])),
+    Stage("sharpen", ("sharpen_factor",),
+          lambda p: p["sharpen_factor"] != 1.0,
+          lambda img, p, scale: sharpen(img, p["sharpen_factor"])),
+    Stage("blur", ("blur_factor", "blur_type"),
+          lambda p: p["blur_factor"] != 0.0,
+          lambda img, p, scale: blur(img, p["blur_factor"], p["blur_type"], scale)),
+]
+
+
+def render(source, source_key, params, cache=None, scale=1.0, cancelled=None):
+    """
+    依序執行所有處理階段。每個階段的結果以「自身參數 + 前一階段鍵值」為鍵存入快取，
+    因此只改變後段參數(例如模糊、銳化)時，會從快取中前一階段的輸出開始重新計算。
+
+    參數:
+    source (numpy.ndarray): 原始圖片陣列(唯讀)。
+    source_key (hashable): 用於識別原始圖片的鍵值。
+    params (dict): 濾鏡參數，格式同default_params()。
+    cache (StageCache): 階段結果快取，為None時不使用快取。
+    scale (float): source相對於原始解析度的比例，小於1.0時表示source是縮小的代理圖。
+    cancelled (callable): 每個階段開始前呼叫，回傳True時引發RenderCancelled中止處理。
+
+    回傳:
+    numpy.ndarray: 處理後的唯讀圖片陣列，沒有任何階段執行時即為source本身。
+    """
+    active = [stage for stage in STAGES if stage.is_active(params)]  # 只保留需要執行的階段
+    keys = []  # 各階段的快取鍵值
+    key = ("source", source_key, scale)  # 起始鍵值
+    for stage in active:
+        key = stage.key(params, key)  # 串接前一階段的鍵值
+        keys.append(key)
+
+    with instrumentation.measure("render", source) as span:
+        img = source  # 從原始圖片開始
+        start = 0  # 從第一個階段開始
+        if cache is not None:
+            for index in range(len(active) - 1, -1, -1):  # 由後往前尋找最深的快取命中
+                cached = cache.get(keys[index])
+                if cached is not None:
+                    img = cached  # 從快取結果開始
+                    start = index + 1  # 從下一個階段繼續
+                    break
+
+        for index in range(start, len(active)):
+            if cancelled is not None and cancelled():  # 工作已過時
+                raise RenderCancelled(active[index].name)
+            with instrumentation.measure(active[index].name, img) as stage_span:
+                img = stage_span.result(active[index].apply(img, params, scale))  # 執行此階段
+            img.flags.writeable = False  # 階段結果可能被快取共用，設為唯讀
+            if cache is not None:
+                cache.put(keys[index], img)  # 存入快取
+        return span.result(img)
+
+
+def proxy_scale(source_size, box_size):
+    """
+    計算代理圖相對於原始圖片的比例，使代理圖剛好足以填滿顯示區域。
+
+    參數:
+    source_size (tuple): 原始圖片的(寬, 高)。
+    box_size (tuple): 顯示區域的(寬, 高)。
+
+    回傳:
+    float: 介於0與1.0之間的比例，1.0表示直接使用原始圖片。
+    """
+    width, height = source_size  # 原始尺寸
+    box_width, box_height = box_size  # 顯示區域尺寸
+    return min(1.0, max(box_width / width, box_height / height))  # 以較長邊填滿顯示區域為準
+
+
+def make_proxy(source, scale):
+    """
+    產生縮小的代理圖。
+
+    參數:
+    source (numpy.ndarray): 原始圖片陣列。
+    scale (float): 代理圖比例。
+    """
+    if scale >= 1.0:  # 不需要縮小
+        return source
+    width, height = array_size(source)  # 原始尺寸
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))  # 代理圖尺寸
+    proxy = resize_to(source, size)  # 以INTER_AREA縮小
+    proxy.flags.writeable = False  # 設為唯讀
+    return proxy
@@ -0,0 +1,127 @@
+"""
+顯示用的影像金字塔(mipmap)。
+
+每次渲染完成後建立一次，第0層為渲染結果本身，之後每層長寬各減半(INTER_AREA)，
+各層在第一次被使用時才計算。縮放顯示時選擇解析度不低於顯示倍率的最小一層，
+並只裁切畫布可見的區域再縮放，因此每次縮放或平移的成本只與畫布大小有關，
+與圖片大小無關。第0層為磁碟映射陣列(分塊處理的結果)時，較大的層同樣逐條寫入磁碟映射陣列，
+常駐記憶體不隨圖片大小增加。
+"""
+import math  # 導入數學模組
+
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+import pipeline  # 導入處理鏈模組
+import tiled  # 導入分塊處理模組(磁碟映射陣列)
+
+MIN_LEVEL_SIZE = 64  # 金字塔最小一層的最短邊長
+IN_MEMORY_LEVEL_PIXELS = 2048 * 2048  # 第0層為磁碟映射陣列時，不超過此像素數的層才放在記憶體
+
+
+class Pyramid:
+    def __init__(self, base, base_scale=1.0, min_size=MIN_LEVEL_SIZE):
+        """
+        初始化Pyramid類別。
+
+        參數:
+        base (numpy.ndarray): 第0層的圖片陣列(渲染結果，可能是代理圖)。
+        base_scale (float): base相對於完整解析度的比例。
+        min_size (int): 最小一層的最短邊長，低於此大小不再建立新層。
+        """
+        self.levels = [base]  # 已計算的各層
+        self.base_scale = base_scale  # 第0層相對於完整解析度的比例
+        self.min_size = min_size  # 最小一層的最短邊長
+        width, height = pipeline.array_size(base)  # 第0層尺寸
+        self.full_size = (width / base_scale, height / base_scale)  # 完整解析度尺寸(可能不是整數)
+        self.depth = 1 + max(0, int(math.log2(max(1, min(width, height) / min_size))))  # 總層數
+
+    def level(self, index):
+        """
+        取得第index層，尚未計算時由上一層縮小一半。
+
+        參數:
+        index (int): 層數，0為最大。
+        """
+        while len(self.levels) <= index:
+            smaller = self._halve(self.levels[-1])  # 由上一層長寬各減半
+            smaller.flags.writeable = False  # 與其他階段結果相同，標記為唯讀
+            self.levels.append(smaller)
+        return self.levels[index]
+
+    @staticmethod
+    def _halve(previous):
+        """
+        將一層長寬各縮小一半。上一層為磁碟映射陣列且結果仍然很大時，逐條縮小並寫入磁碟映射陣列。
+
+        參數:
+        previous (numpy.ndarray): 上一層。
+        """
+        width, height = pipeline.array_size(previous)
+        size = (max(1, width // 2), max(1, height // 2))  # 新一層的(寬, 高)
+        if not isinstance(previous, np.memmap) or size[0] * size[1] <= IN_MEMORY_LEVEL_PIXELS:
+            return cv2.resize(previous, size, interpolation=cv2.INTER_AREA)  # 整層縮小
+        smaller = tiled.new_raster((size[1], size[0]) + previous.shape[2:])  # 磁碟映射的新一層
+        source = previous[:2 * size[1], :2 * size[0]]  # 捨去奇數邊長的最後一列與一行，每條剛好縮小一半
+        for top in range(0, size[1], tiled.STRIP_ROWS):
+            bottom = min(top + tiled.STRIP_ROWS, size[1])
+            smaller[top:bottom] = cv2.resize(source[2 * top:2 * bottom], (size[0], bottom - top), interpolation=cv2.INTER_AREA)  # 逐條縮小
+        return smaller
+
+    def level_scale(self, index):
+        """
+        回傳第index層相對於完整解析度的比例(以實際尺寸計算，避免奇數邊長的誤差)。
+
+        參數:
+        index (int): 層數。
+        """
+        width = pipeline.array_size(self.level(index))[0]
+        return width / self.full_size[0]
+
+    def choose_level(self, zoom):
+        """
+        選擇解析度不低於顯示倍率的最小一層。
+
+        參數:
+        zoom (float): 顯示倍率(每個完整解析度像素對應的畫面像素數)。
+        """
+        if zoom >= self.base_scale:  # 放大超過第0層解析度
+            return 0
+        index = min(self.depth - 1, int(math.log2(self.base_scale / zoom)))  # 每層比例減半
+        return index
+
+    def view(self, zoom, center, view_size):
+        """
+        產生畫布可見區域的顯示圖片。
+
+        參數:
+        zoom (float): 顯示倍率(每個完整解析度像素對應的畫面像素數)。
+        center (tuple): 畫布中央對應的完整解析度座標(x, y)。
+        view_size (tuple): 畫布尺寸(寬, 高)。
+
+        回傳:
+        tuple: (顯示用的陣列, (左, 上))，(左, 上)為陣列在畫布上的位置；可見區域為空時陣列為None。
+        """
+        index = self.choose_level(zoom)  # 選擇層
+        source = self.level(index)
+        scale = self.level_scale(index)  # 該層相對於完整解析度的比例
+        width, height = pipeline.array_size(source)
+        ratio = zoom / scale  # 該層像素到畫面像素的倍率
+        view_width, view_height = view_size
+        origin_x = center[0] * scale - view_width / 2.0 / ratio  # 畫布左上角對應的該層座標
+        origin_y = center[1] * scale - view_height / 2.0 / ratio
+        left = max(0, int(math.floor(origin_x)))  # 裁切範圍(該層座標，只取可見部分)
+        top = max(0, int(math.floor(origin_y)))
+        right = min(width, int(math.ceil(origin_x + view_width / ratio)))
+        bottom = min(height, int(math.ceil(origin_y + view_height / ratio)))
+        if right <= left or bottom <= top:  # 圖片完全在畫布外
+            return None, (0, 0)
+        crop = source[top:bottom, left:right]  # 可見區域(檢視，不複製)
+        size = (max(1, int(round((right - left) * ratio))), max(1, int(round((bottom - top) * ratio))))  # 顯示尺寸
+        if ratio > 1.0:  # 放大時以最近鄰保留像素邊界，方便檢視細節
+            display = cv2.resize(crop, size, interpolation=cv2.INTER_NEAREST)
+        else:
+            display = pipeline.resize_to(crop, size)
+        position = (int(round((left - origin_x) * ratio)), int(round((top - origin_y) * ratio)))  # 在畫布上的位置
+        return display, position
@@ -0,0 +1,123 @@
+import logging  # 導入日誌模組
+import queue  # 導入佇列，用於把結果交回Tk主執行緒
+import threading  # 導入執行緒模組
+import time  # 導入時間模組
+
+import pipeline  # 導入處理鏈模組
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+
+class RenderWorker:
+    def __init__(self, widget, on_result, debounce_ms=30, poll_ms=15):
+        """
+        初始化RenderWorker類別，在背景執行緒執行處理鏈，避免Tk主迴圈被阻塞。
+        連續送出的工作只保留最新一筆；過時的工作會在階段之間被取消，結果也會被丟棄。
+        結果透過widget.after輪詢交回主執行緒，因為Tk元件只能在主執行緒操作。
+
+        參數:
+        widget (tk.Widget): 用於呼叫after的Tk元件。
+        on_result (callable): 在主執行緒呼叫，參數為(結果陣列, 解析度比例, 原始圖片的識別碼, 處理鏈的執行秒數)。
+        debounce_ms (int): 收到工作後等待更多事件的時間(毫秒)，用於合併快速的滑桿事件。
+        poll_ms (int): 主執行緒檢查結果的間隔(毫秒)。
+        """
+        self.widget = widget  # 設置Tk元件
+        self.on_result = on_result  # 設置結果回呼
+        self.debounce_ms = debounce_ms  # 設置合併等待時間
+        self.poll_ms = poll_ms  # 設置輪詢間隔
+        self._condition = threading.Condition()  # 保護待處理工作的條件變數
+        self._pending = None  # 最新的待處理工作
+        self._generation = 0  # 工作世代，每次送出或取消都會增加
+        self._results = queue.Queue()  # 完成的結果
+        self._thread = None  # 背景執行緒
+        self._polling = False  # 是否正在輪詢結果
+        self._busy = False  # 背景執行緒是否正在處理工作
+
+    def submit(self, source, source_key, params, cache=None, scale=1.0):
+        """
+        送出一個渲染工作，取代尚未開始的工作並讓進行中的工作過時。必須在主執行緒呼叫。
+
+        參數:
+        source (numpy.ndarray): 原始圖片或代理圖。
+        source_key (hashable): 原始圖片的識別碼。
+        params (dict): 濾鏡參數(呼叫端的快照)。
+        cache (StageCache): 階段結果快取。
+        scale (float): source相對於原始解析度的比例。
+        """
+        with self._condition:
+            self._generation += 1  # 新的世代，讓進行中的工作過時
+            self._pending = (self._generation, source, source_key, dict(params), cache, scale)  # 只保留最新的工作
+            self._condition.notify()  # 喚醒背景執行緒
+        if self._thread is None:  # 第一次送出時啟動背景執行緒
+            self._thread = threading.Thread(target=self._run, name="render-worker", daemon=True)
+            self._thread.start()
+        if not self._polling:  # 開始輪詢結果
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """
+        取消尚未開始與進行中的工作，其結果不會被交回。
+        """
+        with self._condition:
+            self._generation += 1  # 讓所有已送出的工作過時
+            self._pending = None  # 清除待處理工作
+
+    def is_stale(self, generation):
+        """
+        判斷某個世代的工作是否已經過時。
+
+        參數:
+        generation (int): 工作世代。
+        """
+        return generation != self._generation
+
+    def _run(self):
+        """
+        背景執行緒主迴圈。
+        """
+        while True:
+            with self._condition:
+                while self._pending is None:  # 等待工作
+                    self._condition.wait()
+            time.sleep(self.debounce_ms / 1000.0)  # 等待更多滑桿事件，合併成一次渲染
+            with self._condition:
+                job, self._pending = self._pending, None  # 取出最新的工作
+                self._busy = job is not None  # 標記為處理中
+            if job is None:  # 等待期間被取消
+                continue
+            generation, source, source_key, params, cache, scale = job
+            try:
+                start = time.perf_counter()  # 只計算處理鏈本身，不含合併等待與輪詢
+                result = pipeline.render(source, source_key, params, cache, scale,
+                                         cancelled=lambda: self.is_stale(generation))  # 執行處理鏈，過時則中止
+                self._results.put((generation, result, scale, source_key, time.perf_counter() - start))  # 交回主執行緒
+            except pipeline.RenderCancelled:
+                pass  # 已有更新的工作
+            except Exception as exc:  # 交回主執行緒回報錯誤
+                self._results.put((generation, exc, scale, source_key, 0.0))
+            finally:
+                with self._condition:
+                    self._busy = False  # 處理完成
+
+    def _poll(self):
+        """
+        在主執行緒檢查完成的結果，只交回最新世代的結果。
+        """
+        while True:
+            try:
+                generation, result, scale, source_key, seconds = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_stale(generation):  # 丟棄過時的結果
+                continue
+            if isinstance(result, Exception):
+                logger.error("Render failed: %s", result)  # 記錄錯誤
+                continue
+            self.on_result(result, scale, source_key, seconds)  # 交回結果
+        with self._condition:
+            busy = self._pending is not None or self._busy  # 是否還有工作
+        if busy or not self._results.empty():  # 仍有工作時繼續輪詢
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False  # 沒有工作時停止輪詢
@@ -0,0 +1,77 @@
+"""
+低記憶體的拉普拉斯銳化引擎。
+
+原本的運算 convertScaleAbs(img + factor * Laplacian(img, CV_64F)) 會產生兩張
+float64的完整中間圖片(每像素每通道8位元組)。這裡改為逐條(row strip)處理：
+拉普拉斯值以int16計算(3x3核的範圍為 -1020..1020，可精確表示)，只有合成
+img + factor * laplacian 的那一條以float64計算，使取整結果與原本逐位元相同，
+最後取絕對值並飽和到uint8直接寫入輸出陣列。
+額外記憶體只有一條帶狀區域的int16與float64緩衝區，與圖片高度無關。
+"""
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+
+STRIP_ROWS = 64  # 每條帶狀區域的列數
+HALO_ROWS = 1  # 3x3拉普拉斯核上下各需要的額外列數
+
+
+def strip_bytes(width, channels=3, strip_rows=STRIP_ROWS):
+    """
+    估算逐條銳化時額外使用的記憶體上限。
+
+    參數:
+    width (int): 圖片寬度。
+    channels (int): 通道數。
+    strip_rows (int): 每條帶狀區域的列數。
+
+    回傳:
+    int: 位元組數(int16的拉普拉斯值與float64的合成結果)。
+    """
+    int16_bytes = (strip_rows + 2 * HALO_ROWS) * width * channels * np.dtype(np.int16).itemsize  # 拉普拉斯值
+    float64_bytes = strip_rows * width * channels * np.dtype(np.float64).itemsize  # 合成結果
+    return int16_bytes + float64_bytes
+
+
+def sharpen(arr, factor, out=None, strip_rows=STRIP_ROWS, rows=None):
+    """
+    使用拉普拉斯運算子銳化圖片，結果與原本的float64運算相同。
+
+    參數:
+    arr (numpy.ndarray): 輸入圖片陣列(高, 寬, 通道)，uint8。
+    factor (float): 銳化比例因子。
+    out (numpy.ndarray): 輸出陣列，不可與arr相同，為None時配置新陣列。
+    strip_rows (int): 每條帶狀區域的列數。
+    rows (tuple): 只處理(起始列, 結束列)的範圍，多執行緒分帶處理時使用，為None時處理整張圖片。
+
+    回傳:
+    numpy.ndarray: 銳化後的圖片陣列。
+    """
+    if out is None:
+        out = np.empty_like(arr)  # 配置輸出陣列
+    first, last = rows if rows is not None else (0, arr.shape[0])  # 處理的列範圍
+    for top in range(first, last, strip_rows):
+        bottom = min(top + strip_rows, last)  # 帶狀區域的下緣
+        sharpen_rows(arr, factor, top, bottom, out[top:bottom])
+    return out
+
+
+def sharpen_rows(arr, factor, top, bottom, out_rows):
+    """
+    銳化第top到bottom列(不含)並寫入out_rows。上下各多讀HALO_ROWS列作為鄰域，
+    位於圖片邊緣時則由OpenCV以BORDER_REFLECT_101補邊，與整張圖片處理相同。
+
+    參數:
+    arr (numpy.ndarray): 完整的輸入圖片陣列。
+    factor (float): 銳化比例因子。
+    top (int): 起始列。
+    bottom (int): 結束列(不含)。
+    out_rows (numpy.ndarray): 輸出的列，形狀為(bottom - top, 寬, 通道)。
+    """
+    halo_top = max(0, top - HALO_ROWS)  # 含鄰域的起始列
+    halo_bottom = min(arr.shape[0], bottom + HALO_ROWS)  # 含鄰域的結束列
+    strip = arr[halo_top:halo_bottom]  # 含鄰域的帶狀區域(檢視，不複製)
+    laplacian = cv2.Laplacian(strip, cv2.CV_16S)  # 以int16計算拉普拉斯值
+    inner = slice(top - halo_top, top - halo_top + (bottom - top))  # 去除鄰域後的列
+    combined = cv2.addWeighted(laplacian[inner], factor, strip[inner], 1.0, 0.0, dtype=cv2.CV_64F)  # img + factor * laplacian，只在這一條使用float64
+    cv2.convertScaleAbs(combined, dst=out_rows)  # 取絕對值並飽和到uint8
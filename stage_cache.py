@@ -0,0 +1,93 @@
+from collections import OrderedDict  # 導入有序字典，用於實作LRU
+import threading  # 導入執行緒模組，用於保護快取
+
+
+def estimate_nbytes(img):
+    """
+    估算一張圖片佔用的記憶體位元組數。
+
+    參數:
+    img (PIL.Image.Image 或 numpy.ndarray): 要估算的圖片。
+
+    回傳:
+    int: 估算的位元組數。
+    """
+    if hasattr(img, "nbytes"):  # 如果是NumPy陣列
+        return int(img.nbytes)  # 直接使用陣列大小
+    width, height = img.size  # 獲取PIL圖片尺寸
+    return width * height * len(img.getbands())  # 每個通道以1位元組估算
+
+
+class StageCache:
+    def __init__(self, budget_bytes=512 * 1024 * 1024):
+        """
+        初始化StageCache類別，一個有記憶體預算上限的LRU快取，用來保存各處理階段的中間結果。
+
+        參數:
+        budget_bytes (int): 快取可使用的最大位元組數。
+        """
+        self.budget_bytes = budget_bytes  # 設置記憶體預算
+        self.used_bytes = 0  # 目前已使用的位元組數
+        self._entries = OrderedDict()  # 快取內容，依使用順序排列
+        self._lock = threading.Lock()  # 保護快取的鎖
+
+    def get(self, key):
+        """
+        根據鍵值取出快取結果，並將其標記為最近使用。
+
+        參數:
+        key (tuple): 階段的快取鍵值。
+
+        回傳:
+        快取的圖片，若不存在則回傳None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)  # 查詢快取
+            if entry is None:  # 如果沒有命中
+                return None
+            self._entries.move_to_end(key)  # 標記為最近使用
+            return entry[0]
+
+    def put(self, key, img):
+        """
+        將階段結果存入快取，超出預算時淘汰最久未使用的項目。
+
+        參數:
+        key (tuple): 階段的快取鍵值。
+        img (PIL.Image.Image 或 numpy.ndarray): 階段輸出的圖片。
+        """
+        nbytes = estimate_nbytes(img)  # 估算圖片大小
+        if nbytes > self.budget_bytes:  # 單張圖片超過預算則不快取
+            return
+        with self._lock:
+            if key in self._entries:  # 如果已經存在則先移除舊的
+                self.used_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (img, nbytes)  # 存入快取
+            self.used_bytes += nbytes  # 更新使用量
+            while self.used_bytes > self.budget_bytes:  # 超出預算時淘汰
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)  # 移除最久未使用的項目
+                self.used_bytes -= evicted_bytes  # 更新使用量
+
+    def set_budget(self, budget_bytes):
+        """
+        調整記憶體預算，必要時立即淘汰項目。
+
+        參數:
+        budget_bytes (int): 新的最大位元組數。
+        """
+        with self._lock:
+            self.budget_bytes = budget_bytes  # 設定新預算
+            while self.used_bytes > self.budget_bytes and self._entries:  # 超出預算時淘汰
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)  # 移除最久未使用的項目
+                self.used_bytes -= evicted_bytes  # 更新使用量
+
+    def clear(self):
+        """
+        清空所有快取項目。
+        """
+        with self._lock:
+            self._entries.clear()  # 清空快取
+            self.used_bytes = 0  # 重置使用量
+
+    def __len__(self):
+        return len(self._entries)
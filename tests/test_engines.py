@@ -0,0 +1,192 @@
+"""
+處理引擎的回歸測試：不需要顯示器，只使用小的合成陣列。
+
+使用方式:
+python -m pytest -q tests
+"""
+import os  # 導入os，用於設定模組路徑
+import sys  # 導入sys，用於設定模組路徑
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 讓測試可以匯入專案模組
+
+import cv2  # 導入OpenCV
+import numpy as np  # 導入NumPy
+import pytest  # 導入pytest
+from PIL import Image, ImageEnhance  # 導入PIL庫中的Image, ImageEnhance
+
+import bands  # 導入多核心分帶處理
+import color_engine  # 導入融合色彩調整引擎
+import pipeline  # 導入處理鏈模組
+import sharpen_engine  # 導入低記憶體銳化引擎
+import tiled  # 導入分塊處理模組
+from history import History  # 導入復原/重做歷史紀錄
+from stage_cache import StageCache  # 導入階段結果快取
+
+TILED_TOLERANCE = 1  # 分塊與記憶體內插值結果的最大誤差(warpAffine定點座標在塊邊界的捨入)
+NEAREST_MISMATCH = 0.005  # 最近鄰取樣時，同一個捨入差異會取到相鄰的像素，只允許極少數的像素不同
+
+
+def synthetic(width, height, seed=0):
+    """
+    產生有漸層、邊緣與雜訊的唯讀RGB陣列。
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    arr = np.stack([x * 255 // max(1, width - 1), y * 255 // max(1, height - 1), (x // 8 + y // 8) % 2 * 200], axis=-1)
+    arr = np.clip(arr + rng.integers(-20, 21, arr.shape), 0, 255).astype(np.uint8)  # 加入雜訊
+    arr.flags.writeable = False  # 與處理鏈相同，輸入是唯讀陣列
+    return arr
+
+
+def params_with(**changes):
+    """
+    回傳預設參數加上指定的變動。
+    """
+    params = pipeline.default_params()
+    params.update(changes)
+    return params
+
+
+@pytest.fixture
+def workers():
+    """
+    測試結束後恢復分帶處理的執行緒數。
+    """
+    previous = bands.workers()
+    yield bands.set_workers
+    bands.set_workers(previous)
+
+
+@pytest.mark.parametrize("factor", [0.5, 2.0, 3.7])
+def test_sharpen_matches_float64_reference(factor):
+    arr = synthetic(131, 97)
+    reference = cv2.convertScaleAbs(arr + factor * cv2.Laplacian(arr, cv2.CV_64F))  # 原本的float64運算
+    assert np.array_equal(sharpen_engine.sharpen(arr, factor, strip_rows=7), reference)  # 逐條處理
+    assert np.array_equal(pipeline.sharpen(arr, factor), reference)
+
+
+@pytest.mark.parametrize("brightness, contrast, saturation", [(1.2, 1.0, 1.0), (1.0, 1.4, 1.0), (1.0, 1.0, 0.6),
+                                                              (0.8, 1.3, 1.5), (1.5, 0.7, 0.0)])
+def test_color_within_tolerance_of_image_enhance(brightness, contrast, saturation):
+    arr = synthetic(120, 80)
+    img = Image.fromarray(arr)
+    img = ImageEnhance.Brightness(img).enhance(brightness)  # 依序調整，與原本的做法相同
+    img = ImageEnhance.Contrast(img).enhance(contrast)
+    img = ImageEnhance.Color(img).enhance(saturation)
+    result = color_engine.adjust_color(arr, brightness, contrast, saturation)
+    error = np.abs(result.astype(np.int16) - np.asarray(img).astype(np.int16)).max()
+    assert error <= color_engine.COLOR_TOLERANCE
+
+
+@pytest.mark.parametrize("changes", [
+    dict(resized_width=70, resized_height=45),  # 縮小
+    dict(resized_width=9, resized_height=7),  # 大幅縮小(區塊平均)
+    dict(resized_width=230, resized_height=170),  # 放大
+    dict(current_angle=90, resized_width=50, resized_height=80),  # 90度旋轉與縮小
+    dict(current_angle=30, resized_width=90, resized_height=80),  # 任意角度旋轉與縮小
+    dict(current_angle=30, resized_width=300, resized_height=250),  # 任意角度旋轉與放大
+])
+def test_tiled_resize_matches_in_memory(changes):
+    arr = synthetic(153, 103)
+    params = params_with(**changes)
+    expected = pipeline.render(arr, "test", params)
+    result = tiled.render_tiled(arr, params, tile_size=32)
+    assert result.shape == expected.shape
+    assert np.abs(result.astype(np.int16) - expected.astype(np.int16)).max() <= TILED_TOLERANCE
+
+
+@pytest.mark.parametrize("changes", [
+    dict(current_angle=30, is_flipped_horizontally=True),  # 旋轉與翻轉(最近鄰)
+    dict(current_angle=270, is_flipped_vertically=True),  # 無損轉置
+])
+def test_tiled_rotation_matches_in_memory(changes):
+    arr = synthetic(153, 103)
+    params = params_with(**changes)
+    expected = pipeline.render(arr, "test", params)
+    result = tiled.render_tiled(arr, params, tile_size=32)
+    assert result.shape == expected.shape
+    assert np.mean(np.any(result != expected, axis=-1)) <= NEAREST_MISMATCH
+
+
+def test_tiled_filters_match_in_memory():
+    arr = synthetic(153, 103)
+    params = params_with(brightness_factor=1.2, contrast_factor=1.3, saturation_factor=0.8, sharpen_factor=2.0,
+                         blur_factor=3.0, blur_type="gaussian")
+    assert np.array_equal(tiled.render_tiled(arr, params, tile_size=32), pipeline.render(arr, "test", params))
+
+
+@pytest.mark.parametrize("operation", [
+    lambda arr: pipeline.adjust_color(arr, 1.2, 1.3, 0.8),
+    lambda arr: pipeline.sharpen(arr, 2.0),
+    lambda arr: pipeline.blur(arr, 10.0, "gaussian"),
+    lambda arr: pipeline.blur(arr, 15.0, "average"),
+    lambda arr: pipeline.blur(arr, 60.0, "gaussian"),  # 先縮小的大sigma模糊
+], ids=["color", "sharpen", "gaussian", "average", "gaussian_downsampled"])
+def test_band_workers_give_identical_results(operation, workers):
+    arr = synthetic(90, 4 * bands.MIN_BAND_ROWS + 13)  # 夠高才會分成4條
+    workers(1)
+    reference = operation(arr)
+    workers(4)
+    assert len(bands.band_ranges(arr.shape[0])) == 4
+    assert np.array_equal(operation(arr), reference)
+
+
+def test_stage_cache_reuses_earlier_stages():
+    arr = synthetic(64, 48)
+    cache = StageCache()
+    params = params_with(brightness_factor=1.2, sharpen_factor=2.0, blur_factor=2.0)
+    first = pipeline.render(arr, "a", params, cache)
+    assert len(cache) == 3  # 色彩、銳化、模糊
+    assert pipeline.render(arr, "a", params, cache) is first  # 全部命中
+    pipeline.render(arr, "a", dict(params, blur_factor=3.0), cache)
+    assert len(cache) == 4  # 只重新計算模糊
+    pipeline.render(arr, "b", params, cache)
+    assert len(cache) == 7  # 不同的圖片識別碼不共用結果
+    pipeline.render(arr, "a", params, cache, scale=0.5)
+    assert len(cache) == 10  # 不同解析度不共用結果
+
+
+def test_stage_cache_evicts_least_recently_used():
+    items = {name: np.zeros(100, np.uint8) for name in "abcd"}
+    cache = StageCache(budget_bytes=300)
+    for name in "abc":
+        cache.put(name, items[name])
+    assert cache.get("a") is items["a"]  # a變成最近使用
+    cache.put("d", items["d"])
+    assert cache.get("b") is None  # 淘汰最久未使用的b
+    assert all(cache.get(name) is not None for name in "acd")
+    cache.put("big", np.zeros(301, np.uint8))
+    assert cache.get("big") is None  # 單張超過預算不快取
+    cache.set_budget(100)
+    assert len(cache) == 1 and cache.used_bytes == 100
+
+
+def test_history_merges_and_undoes_steps():
+    history = History(merge_seconds=60.0)
+    history.record({"blur_factor": (0.0, 1.0)})
+    history.record({"blur_factor": (1.0, 2.0)})  # 拖動滑桿合併為同一步
+    history.record({"sharpen_factor": (1.0, 2.0)})
+    assert len(history.entries) == 3
+    assert history.undo() == ({"sharpen_factor": 1.0}, None)
+    assert history.undo() == ({"blur_factor": 0.0}, None)  # 保留最初的變動前值
+    assert history.undo() is None
+    assert history.redo() == ({"blur_factor": 2.0}, None)
+    history.record({"brightness_factor": (1.0, 1.2)})  # 捨棄可以重做的步驟
+    assert not history.can_redo() and len(history.entries) == 3
+    history.record({"brightness_factor": (1.2, 1.0)})  # 變回原值時這一步不再需要
+    assert len(history.entries) == 2 and history.index == 1
+
+
+def test_history_drops_oldest_steps_and_farthest_snapshots():
+    history = History(max_steps=3, merge_seconds=0.0)
+    for value in range(5):
+        history.record({"blur_factor": (float(value), float(value + 1))})
+    assert len(history.entries) == 3 and history.entries[0].changes == {}  # 最舊的狀態成為新的初始狀態
+    snapshot = synthetic(32, 32)
+    for entry in history.entries:
+        history.attach_snapshot(entry, snapshot, 1.0)
+    one = history.entries[0].snapshot.nbytes
+    history.set_budget(2 * one)
+    assert history.entries[0].snapshot is None  # 捨棄離目前位置最遠的快照
+    assert all(entry.snapshot is not None for entry in history.entries[1:])
+    assert history.nbytes == 2 * one
@@ -0,0 +1,418 @@
+"""
+超過記憶體大小的圖片的分塊處理。
+
+原始圖片解碼到磁碟上的記憶體映射(memmap)陣列，每個階段都逐塊(tile)處理：
+幾何轉換對每個輸出塊只讀取對應的輸入範圍；色彩、銳化與模糊合併成一次逐塊處理，
+每塊多讀取鄰域(halo)，結果與整張圖片處理相同。輸出同樣寫入memmap，再逐條寫成PNG或TIFF。
+常駐記憶體只與塊的大小有關，與圖片大小無關。
+"""
+import collections  # 導入collections，用於平行壓縮時依序寫入
+import math  # 導入數學模組
+import os  # 導入os，用於判斷副檔名
+import struct  # 導入struct，用於寫入檔案標頭
+import tempfile  # 導入暫存檔模組
+import zlib  # 導入zlib，用於PNG壓縮
+
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+np = lazy_imports.lazy_module("numpy")  # 導入NumPy(第一次使用時才載入)
+from PIL import Image  # 導入PIL庫中的Image
+
+import blur_engine  # 導入與半徑無關的模糊引擎
+import color_engine  # 導入融合色彩調整引擎
+import geometry  # 導入幾何轉換矩陣
+import instrumentation  # 導入效能量測層
+import pipeline  # 導入處理鏈模組
+import sharpen_engine  # 導入低記憶體銳化引擎
+
+TILE_SIZE = 1024  # 每塊的邊長
+STRIP_ROWS = 256  # 解碼與存檔時每條的列數
+TIFF_MAX_CLASSIC_BYTES = 2 ** 32 - 2 ** 20  # 超過此大小改寫BigTIFF
+MAPPED_PIXEL_BYTES = {"L": 1, "P": 1, "I;16": 2, "I;16L": 2, "I;16B": 2}  # PIL映射緩衝區每像素的位元組數，其他模式為4
+
+
+def new_raster(shape, directory=None):
+    """
+    在暫存檔上建立記憶體映射陣列。暫存檔在陣列釋放後自動刪除。
+
+    參數:
+    shape (tuple): 陣列形狀(高, 寬, 3)。
+    directory (str): 暫存檔所在資料夾，為None時使用系統預設。
+    """
+    with tempfile.TemporaryFile(dir=directory) as file:
+        return np.memmap(file, dtype=np.uint8, mode="w+", shape=shape)  # 映射會保留檔案直到陣列釋放
+
+
+def iter_tiles(width, height, tile_size=TILE_SIZE):
+    """
+    依序產生每塊的範圍(x0, y0, x1, y1)。
+
+    參數:
+    width (int): 圖片寬度。
+    height (int): 圖片高度。
+    tile_size (int): 塊的邊長。
+    """
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height)
+
+
+def decode_to_memmap(path, directory=None, strip_rows=STRIP_ROWS):
+    """
+    將圖片檔解碼到記憶體映射陣列。未壓縮的點陣(未壓縮TIFF、PPM等)直接映射檔案內容逐條複製，
+    不需要解碼；JPEG、PNG與壓縮TIFF等由PIL解碼到磁碟映射的緩衝區，再逐條轉換為RGB。
+    只有無法映射的模式(例如1位元黑白)才完整解碼到記憶體。
+
+    參數:
+    path (str): 圖片檔路徑。
+    directory (str): 暫存檔所在資料夾。
+    strip_rows (int): 每次複製的列數。
+
+    回傳:
+    numpy.memmap: (高, 寬, 3)的唯讀RGB陣列。
+    """
+    with Image.open(path) as img:
+        width, height = img.size  # 圖片尺寸
+        raster = new_raster((height, width, 3), directory)  # 建立輸出陣列
+        if not (_copy_raw_tiles(img, path, raster, strip_rows) or _decode_mapped(img, raster, directory, strip_rows)):  # 都無法使用時完整解碼
+            decoded = pipeline.to_array(img)  # 完整解碼並轉換為RGB
+            for top in range(0, height, strip_rows):
+                raster[top:top + strip_rows] = decoded[top:top + strip_rows]  # 逐條複製
+            del decoded  # 立即釋放解碼結果
+    raster.flags.writeable = False  # 設為唯讀
+    return raster
+
+
+def _copy_raw_tiles(img, path, raster, strip_rows):
+    """
+    若圖片的每個區塊都是未壓縮的RGB或L資料，直接映射檔案並逐條複製到raster。
+
+    回傳:
+    bool: 是否成功處理。
+    """
+    if img.mode not in ("RGB", "L") or not img.tile:
+        return False
+    for tile in img.tile:
+        args = tile.args if isinstance(tile.args, tuple) else (tile.args,)  # 解碼參數
+        if tile.codec_name != "raw" or args[0] != img.mode:  # 只處理與模式相同的未壓縮資料
+            return False
+    channels = 3 if img.mode == "RGB" else 1  # 每像素的通道數
+    for tile in img.tile:
+        args = tile.args if isinstance(tile.args, tuple) else (tile.args,)
+        x0, y0, x1, y1 = tile.extents  # 區塊範圍
+        stride = args[1] if len(args) > 1 and args[1] else (x1 - x0) * channels  # 每列位元組數
+        orientation = args[2] if len(args) > 2 else 1  # 1為由上而下，-1為由下而上
+        source = np.memmap(path, dtype=np.uint8, mode="r", offset=tile.offset, shape=(y1 - y0, stride))  # 映射檔案內容
+        for top in range(0, y1 - y0, strip_rows):
+            bottom = min(top + strip_rows, y1 - y0)
+            rows = source[top:bottom, :(x1 - x0) * channels].reshape(bottom - top, x1 - x0, channels)  # 讀取一條
+            if orientation < 0:  # 由下而上儲存
+                target = raster[y1 - bottom:y1 - top, x0:x1]
+                rows = rows[::-1]
+            else:
+                target = raster[y0 + top:y0 + bottom, x0:x1]
+            target[...] = rows  # 單通道會自動擴展為RGB
+        del source
+    return True
+
+
+def _decode_mapped(img, raster, directory, strip_rows):
+    """
+    讓PIL直接解碼到暫存檔映射的緩衝區，再逐條轉換為RGB複製到raster，解碼結果不佔用一般記憶體。
+
+    回傳:
+    bool: 是否成功處理，模式無法映射時回傳False。
+    """
+    width, height = img.size  # 圖片尺寸
+    buffer = new_raster((height, width * MAPPED_PIXEL_BYTES.get(img.mode, 4)), directory)  # PIL內部格式的緩衝區(RGB每像素4位元組)
+    try:
+        img.im = Image.core.map_buffer(buffer, img.size, "raw", 0, (img.mode, 0, 1))  # 以緩衝區作為PIL的影像記憶體
+    except ValueError:  # 例如1位元黑白
+        return False
+    img.load()  # 解碼直接寫入緩衝區
+    for top in range(0, height, strip_rows):
+        bottom = min(top + strip_rows, height)
+        strip = img.crop((0, top, width, bottom))  # 只複製一條
+        raster[top:bottom] = np.asarray(strip if strip.mode == "RGB" else strip.convert("RGB"))  # 與pipeline.to_array相同的轉換
+    return True
+
+
+def warp_tiled(source, matrix, size, interpolation, out, tile_size=TILE_SIZE, cancelled=None, histograms=None,
+               border=None):
+    """
+    逐塊套用仿射轉換。每個輸出塊只讀取其對應的輸入範圍；縮小時的預濾波由呼叫端以pipeline.prefilter先完成。
+
+    參數:
+    source (numpy.ndarray): 輸入陣列(可為memmap)。
+    matrix (numpy.ndarray): 3x3矩陣，輸出連續座標對應回輸入連續座標。
+    size (tuple): 輸出(寬, 高)。
+    interpolation (int): OpenCV插值方式。
+    out (numpy.ndarray): 輸出陣列。
+    tile_size (int): 塊的邊長。
+    cancelled (callable): 回傳True時中止處理。
+    histograms (numpy.ndarray): 若提供，累加輸出的通道直方圖。
+    border (int): OpenCV的邊界模式，為None時以黑色填充(旋轉擴展的區域)。
+    """
+    border = cv2.BORDER_CONSTANT if border is None else border  # 預設以黑色填充
+    height, width = source.shape[:2]  # 輸入尺寸
+    cv_matrix = geometry.to_opencv(matrix)  # OpenCV座標的矩陣
+    margin = 4  # 插值需要的額外範圍(Lanczos為4像素)
+    for x0, y0, x1, y1 in iter_tiles(size[0], size[1], tile_size):
+        if cancelled is not None and cancelled():
+            raise pipeline.RenderCancelled("geometry")
+        corners = np.array([[x0, y0, 1], [x1 - 1, y0, 1], [x0, y1 - 1, 1], [x1 - 1, y1 - 1, 1]], dtype=np.float64).T
+        mapped = cv_matrix @ corners  # 輸出塊四角對應的輸入座標
+        sx0 = max(0, int(math.floor(mapped[0].min())) - margin)  # 輸入範圍
+        sy0 = max(0, int(math.floor(mapped[1].min())) - margin)
+        sx1 = min(width, int(math.ceil(mapped[0].max())) + 1 + margin)
+        sy1 = min(height, int(math.ceil(mapped[1].max())) + 1 + margin)
+        if sx0 >= sx1 or sy0 >= sy1:  # 完全在輸入範圍外
+            out[y0:y1, x0:x1] = 0
+            if histograms is not None:
+                histograms[:, 0] += (x1 - x0) * (y1 - y0)  # 黑色填充也計入直方圖，與整張計算相同
+            continue
+        region = np.ascontiguousarray(source[sy0:sy1, sx0:sx1])  # 讀取輸入範圍
+        tile_matrix = cv_matrix.copy()
+        tile_matrix[:, 2] += cv_matrix[:, :2] @ np.array([x0, y0]) - np.array([sx0, sy0])  # 平移到塊的區域座標
+        tile = cv2.warpAffine(region, tile_matrix, (x1 - x0, y1 - y0), flags=interpolation | cv2.WARP_INVERSE_MAP,
+                              borderMode=border, borderValue=0)
+        out[y0:y1, x0:x1] = tile  # 寫入輸出
+        if histograms is not None:
+            histograms += color_engine.channel_histograms(tile)  # 累加直方圖
+
+
+def render_tiled(source, params, tile_size=TILE_SIZE, directory=None, cancelled=None):
+    """
+    以分塊方式執行完整的處理鏈。
+
+    參數:
+    source (numpy.ndarray): 原始圖片陣列(通常為decode_to_memmap的結果)。
+    params (dict): 濾鏡參數。
+    tile_size (int): 塊的邊長。
+    directory (str): 暫存檔所在資料夾。
+    cancelled (callable): 回傳True時中止處理。
+
+    回傳:
+    numpy.ndarray: 處理後的唯讀陣列(memmap)，沒有任何調整時即為source。
+    """
+    height, width = source.shape[:2]  # 原始尺寸
+    brightness, contrast, saturation = params["brightness_factor"], params["contrast_factor"], params["saturation_factor"]
+    color_active = (brightness, contrast, saturation) != (1.0, 1.0, 1.0)  # 是否調整色彩
+    sharpen_active = params["sharpen_factor"] != 1.0  # 是否銳化
+    blur_active = params["blur_factor"] != 0.0  # 是否模糊
+    histograms = np.zeros((3, 256)) if contrast != 1.0 else None  # 對比度需要整張圖片的灰階平均值
+
+    matrix, size = geometry.compose(width, height, params)  # 組合幾何轉換
+    current = source
+    if not np.allclose(matrix, np.eye(3)) or size != (width, height):  # 需要幾何轉換
+        resized = bool(params["resized_width"] and params["resized_height"])
+        current = new_raster((size[1], size[0], 3), directory)
+        with instrumentation.measure("tiled_geometry", source) as span:
+            prefiltered = source
+            if resized:  # 與記憶體內的warp相同的區塊平均與高斯預濾波，逐條寫到磁碟
+                prefiltered, matrix = pipeline.prefilter(source, matrix, lambda shape: new_raster(shape, directory), STRIP_ROWS)
+            interpolation = pipeline.warp_interpolation(matrix, resized)  # 與記憶體內的處理鏈相同的插值方式
+            warp_tiled(prefiltered, matrix, size, interpolation, current, tile_size, cancelled, histograms,
+                       pipeline.warp_border(params))
+            span.result(current)
+    elif histograms is not None:  # 沒有幾何轉換時另外累加直方圖
+        for x0, y0, x1, y1 in iter_tiles(width, height, tile_size):
+            histograms += color_engine.channel_histograms(np.ascontiguousarray(source[y0:y1, x0:x1]))
+
+    if color_active or sharpen_active or blur_active:
+        tone_lut = color_engine.build_tone_lut(None, brightness, contrast, histograms) if color_active else None  # 整張圖片的查找表
+        halo = (sharpen_engine.HALO_ROWS if sharpen_active else 0) + \
+            (pipeline.blur_radius(params["blur_factor"], params["blur_type"]) if blur_active else 0)  # 鄰域寬度
+        if blur_active:  # 大sigma的模糊會先縮小，每塊的起點需對齊縮小的格點
+            alignment = blur_engine.blur_alignment(params["blur_factor"], params["blur_type"])
+            halo = -(-halo // alignment) * alignment
+        out = new_raster(current.shape, directory)
+        out_height, out_width = current.shape[:2]
+        with instrumentation.measure("tiled_filters", current) as span:
+            for x0, y0, x1, y1 in iter_tiles(out_width, out_height, tile_size):
+                if cancelled is not None and cancelled():
+                    raise pipeline.RenderCancelled("filters")
+                rx0, ry0 = max(0, x0 - halo), max(0, y0 - halo)  # 含鄰域的範圍
+                rx1, ry1 = min(out_width, x1 + halo), min(out_height, y1 + halo)
+                work = np.ascontiguousarray(current[ry0:ry1, rx0:rx1])  # 讀取含鄰域的塊
+                if color_active:
+                    work = color_engine.adjust_color(work, brightness, contrast, saturation, out=work, tone_lut=tone_lut)
+                if sharpen_active:
+                    work = sharpen_engine.sharpen(work, params["sharpen_factor"])
+                if blur_active:
+                    work = pipeline.blur(work, params["blur_factor"], params["blur_type"])
+                out[y0:y1, x0:x1] = work[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]  # 去除鄰域後寫入
+            current = span.result(out)
+    if current is not source:
+        current.flags.writeable = False  # 設為唯讀
+    return current
+
+
+def save_tiled(arr, path, strip_rows=STRIP_ROWS):
+    """
+    逐條將陣列寫入檔案。PNG與TIFF以串流方式寫入，記憶體只需要一條；其他格式交由PIL完整轉換後存檔。
+
+    參數:
+    arr (numpy.ndarray): RGB陣列(可為memmap)。
+    path (str): 輸出路徑。
+    strip_rows (int): 每次寫入的列數。
+    """
+    extension = os.path.splitext(path)[1].lower()  # 副檔名
+    if extension == ".png":
+        write_png(arr, path, strip_rows)
+    elif extension in (".tif", ".tiff"):
+        write_tiff(arr, path, strip_rows)
+    else:
+        pipeline.to_image(arr).save(path)  # 其他格式需要完整的PIL圖片
+
+
+def _png_chunk(file, chunk_type, data):
+    """
+    寫入一個PNG區塊。
+    """
+    file.write(struct.pack(">I", len(data)))
+    file.write(chunk_type)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+
+def _png_strips(arr, strip_rows):
+    """
+    逐條產生已套用Sub濾波器的PNG列資料。
+
+    回傳:
+    generator: (結束列, 位元組資料)。
+    """
+    height, width = arr.shape[:2]
+    for top in range(0, height, strip_rows):
+        rows = np.ascontiguousarray(arr[top:top + strip_rows]).reshape(-1, width * 3)  # 讀取一條
+        filtered = np.empty((rows.shape[0], width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 1  # Sub濾波器
+        filtered[:, 1:4] = rows[:, :3]
+        np.subtract(rows[:, 3:], rows[:, :-3], out=filtered[:, 4:])  # 與左側像素的差(uint8自動取模)
+        yield min(top + strip_rows, height), filtered.tobytes()
+
+
+def _deflate_strip(data, compress_level, last):
+    """
+    獨立壓縮一條資料(raw deflate)。非最後一條以Z_SYNC_FLUSH結束在位元組邊界，
+    因此各條的結果可以直接串接成一個deflate串流(與pigz相同的做法)。
+    """
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)  # 不含zlib標頭的raw deflate
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def write_png(arr, path, strip_rows=STRIP_ROWS, compress_level=6, progress=None, executor=None):
+    """
+    逐條寫入RGB PNG，每列使用Sub濾波器。
+
+    參數:
+    arr (numpy.ndarray): RGB陣列。
+    path (str): 輸出路徑。
+    strip_rows (int): 每次壓縮的列數。
+    compress_level (int): zlib壓縮等級(0-9)。
+    progress (callable): 每寫完一條時以完成比例(0到1)呼叫。
+    executor (concurrent.futures.Executor): 若提供，各條在執行緒池中平行壓縮(zlib會釋放GIL)，
+        同時進行的條數限制為執行緒數的兩倍，記憶體仍與圖片大小無關。
+    """
+    height, width = arr.shape[:2]
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")  # PNG簽章
+        _png_chunk(file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))  # 8位元RGB
+        if executor is None:  # 單一串流壓縮
+            compressor = zlib.compressobj(compress_level)  # 串流壓縮器
+            for bottom, data in _png_strips(arr, strip_rows):
+                data = compressor.compress(data)
+                if data:
+                    _png_chunk(file, b"IDAT", data)
+                if progress is not None:
+                    progress(bottom / height)  # 回報進度
+            _png_chunk(file, b"IDAT", compressor.flush())
+        else:  # 平行壓縮
+            _png_chunk(file, b"IDAT", b"\x78\x9c")  # zlib標頭
+            checksum = zlib.adler32(b"")  # 整個未壓縮資料的Adler-32
+            window = 2 * getattr(executor, "_max_workers", 4)  # 同時進行的條數
+            pending = collections.deque()  # 依順序等待寫入的(結束列, Future)
+            for bottom, data in _png_strips(arr, strip_rows):
+                checksum = zlib.adler32(data, checksum)
+                pending.append((bottom, executor.submit(_deflate_strip, data, compress_level, bottom == height)))
+                while len(pending) > window or (pending and pending[0][1].done()):  # 依順序寫入已完成的條
+                    done_bottom, future = pending.popleft()
+                    _png_chunk(file, b"IDAT", future.result())
+                    if progress is not None:
+                        progress(done_bottom / height)  # 回報進度
+            while pending:
+                done_bottom, future = pending.popleft()
+                _png_chunk(file, b"IDAT", future.result())
+                if progress is not None:
+                    progress(done_bottom / height)
+            _png_chunk(file, b"IDAT", struct.pack(">I", checksum & 0xFFFFFFFF))  # zlib結尾
+        _png_chunk(file, b"IEND", b"")
+
+
+def write_tiff(arr, path, strip_rows=STRIP_ROWS, progress=None):
+    """
+    逐條寫入未壓縮的RGB TIFF，超過4GB時改寫BigTIFF。
+
+    參數:
+    arr (numpy.ndarray): RGB陣列。
+    path (str): 輸出路徑。
+    strip_rows (int): 每個strip的列數。
+    progress (callable): 每寫完一條時以完成比例(0到1)呼叫。
+    """
+    height, width = arr.shape[:2]
+    row_bytes = width * 3  # 每列位元組數
+    big = height * row_bytes > TIFF_MAX_CLASSIC_BYTES  # 是否需要BigTIFF
+    offset_format, count_format = ("Q", "Q") if big else ("I", "I")  # 位移與數量的格式
+    header_size = 16 if big else 8  # 標頭大小
+    strips = []  # 每個strip的(位移, 位元組數)
+    with open(path, "wb") as file:
+        file.write(b"\0" * header_size)  # 先保留標頭
+        file.write(struct.pack("<3H", 8, 8, 8))  # BitsPerSample的值
+        bits_offset = header_size
+        for top in range(0, height, strip_rows):
+            rows = np.ascontiguousarray(arr[top:top + strip_rows])  # 讀取一條
+            strips.append((file.tell(), rows.nbytes))
+            file.write(rows.tobytes())  # 寫入影像資料
+            if progress is not None:
+                progress(min(top + strip_rows, height) / height)  # 回報進度
+        array_offsets = file.tell()  # strip位移陣列
+        file.write(struct.pack(f"<{len(strips)}{offset_format}", *(offset for offset, _ in strips)))
+        array_counts = file.tell()  # strip位元組數陣列
+        file.write(struct.pack(f"<{len(strips)}{count_format}", *(count for _, count in strips)))
+        if file.tell() % 2:
+            file.write(b"\0")  # IFD必須位於偶數位移
+        ifd_offset = file.tell()
+        long_type, offset_type = (16, 16) if big else (4, 4)  # LONG8或LONG
+        entries = [
+            (256, long_type, 1, width),  # ImageWidth
+            (257, long_type, 1, height),  # ImageLength
+            (258, 3, 3, bits_offset),  # BitsPerSample
+            (259, 3, 1, 1),  # Compression: 無
+            (262, 3, 1, 2),  # PhotometricInterpretation: RGB
+            (273, offset_type, len(strips), array_offsets if len(strips) > 1 else strips[0][0]),  # StripOffsets
+            (277, 3, 1, 3),  # SamplesPerPixel
+            (278, long_type, 1, strip_rows),  # RowsPerStrip
+            (279, offset_type, len(strips), array_counts if len(strips) > 1 else strips[0][1]),  # StripByteCounts
+            (284, 3, 1, 1),  # PlanarConfiguration: chunky
+        ]
+        if big:
+            file.write(struct.pack("<Q", len(entries)))
+            for tag, field_type, count, value in entries:
+                if tag == 258:  # BigTIFF中不超過8位元組的值必須直接寫在項目內
+                    file.write(struct.pack("<HHQ3H2x", tag, field_type, count, 8, 8, 8))
+                elif field_type == 3 and count == 1:
+                    file.write(struct.pack("<HHQH6x", tag, field_type, count, value))
+                else:
+                    file.write(struct.pack("<HHQQ", tag, field_type, count, value))
+            file.write(struct.pack("<Q", 0))  # 沒有下一個IFD
+            file.seek(0)
+            file.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, ifd_offset))  # BigTIFF標頭
+        else:
+            file.write(struct.pack("<H", len(entries)))
+            for tag, field_type, count, value in entries:
+                file.write(struct.pack("<HHII", tag, field_type, count, value) if field_type != 3 or count > 1 else
+                           struct.pack("<HHIH2x", tag, field_type, count, value))
+            file.write(struct.pack("<I", 0))  # 沒有下一個IFD
+            file.seek(0)
+            file.write(b"II" + struct.pack("<HI", 42, ifd_offset))  # TIFF標頭
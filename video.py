@@ -0,0 +1,412 @@
+"""
+以同一份編輯設定串流處理影片與編號的圖片序列。
+
+解碼、處理與編碼三段同時進行：
+- 讀取執行緒以cv2.VideoCapture(或逐一開啟資料夾中的圖片)解碼畫格，放入有上限的佇列。
+- 執行緒池同時處理多個畫格(pipeline.render，每個畫格內不再分帶)。
+- 呼叫端依原本的順序取回結果並以cv2.VideoWriter編碼；輸出為圖片序列時每張圖片互相獨立，
+  直接在執行緒池中與處理一起編碼。
+佇列與處理中的畫格數都有上限，因此記憶體與影片長度無關；處理速度以每秒畫格數(fps)回報。
+
+使用方式:
+python video.py 輸入影片或資料夾 輸出影片或資料夾 --recipe recipe.json --workers 4
+"""
+import argparse  # 導入命令列參數解析
+import collections  # 導入collections，用於依序等待處理結果
+import logging  # 導入日誌模組
+import os  # 導入os，用於處理路徑
+import queue  # 導入佇列模組
+import re  # 導入正規表示式，用於依數字排序檔名
+import sys  # 導入sys，用於設定結束代碼
+import threading  # 導入執行緒模組
+import time  # 導入時間模組
+from concurrent.futures import ThreadPoolExecutor  # 導入執行緒池
+
+from PIL import Image  # 導入PIL庫中的Image
+
+import lazy_imports  # 導入延遲載入工具
+cv2 = lazy_imports.lazy_module("cv2")  # 導入OpenCV(第一次使用時才載入)
+
+import bands  # 導入多核心分帶處理
+import batch  # 導入批次處理模組(列出資料夾中的圖片)
+import exporter  # 導入匯出模組(編碼設定)
+import instrumentation  # 導入效能量測層
+import pipeline  # 導入處理鏈模組
+
+logger = logging.getLogger(__name__)  # 模組的日誌記錄器
+
+VIDEO_CODECS = {".mp4": "mp4v", ".m4v": "mp4v", ".mov": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}  # 副檔名對應的FourCC
+DEFAULT_FPS = 24.0  # 圖片序列或無法取得時的畫格速率
+SEQUENCE_PATTERN = "%06d.png"  # 輸出為資料夾時的檔名格式
+SEQUENCE_SUFFIX = "_%06d"  # 輸出為單一圖片檔名時加在副檔名前的編號
+PROGRESS_SECONDS = 0.5  # 回報進度的最短間隔
+_END = object()  # 讀取結束的標記
+
+
+def _natural_key(name):
+    """
+    依檔名中的數字排序(frame2在frame10之前)。
+    """
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+class VideoSource:
+    def __init__(self, path):
+        """
+        初始化VideoSource類別，以cv2.VideoCapture讀取影片(或printf格式的圖片序列，例如frames/%04d.png)。
+
+        參數:
+        path (str): 影片路徑。
+        """
+        self.capture = cv2.VideoCapture(path)  # 開啟影片
+        if not self.capture.isOpened():
+            raise OSError(f"Cannot open video: {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS  # 畫格速率
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None  # 畫格數(部分格式無法取得)
+
+    def __iter__(self):
+        while True:
+            ok, frame = self.capture.read()  # 解碼下一個畫格(BGR)
+            if not ok:
+                return
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)  # 處理鏈使用RGB，原地轉換
+            frame.flags.writeable = False  # 與處理鏈的輸入相同，設為唯讀
+            yield frame
+
+    def close(self):
+        """
+        釋放影片。
+        """
+        self.capture.release()
+
+
+class SequenceSource:
+    def __init__(self, directory, fps=DEFAULT_FPS):
+        """
+        初始化SequenceSource類別，依檔名中的數字順序讀取資料夾中的圖片。
+
+        參數:
+        directory (str): 圖片資料夾。
+        fps (float): 畫格速率(輸出為影片時使用)。
+        """
+        self.paths = [os.path.join(directory, name) for name in sorted(batch.find_images(directory), key=_natural_key)]  # 依數字排序
+        self.fps = fps  # 畫格速率
+        self.frame_count = len(self.paths)  # 畫格數
+
+    def __iter__(self):
+        for path in self.paths:
+            with Image.open(path) as img:
+                yield pipeline.to_array(img)  # 讀取並轉換為唯讀RGB陣列
+
+    def close(self):
+        """
+        沒有需要釋放的資源。
+        """
+
+
+class VideoSink:
+    concurrent = False  # 必須依順序寫入
+
+    def __init__(self, path, fps):
+        """
+        初始化VideoSink類別，以cv2.VideoWriter寫入影片。尺寸在寫入第一個畫格時決定。
+
+        參數:
+        path (str): 輸出路徑，編碼器由副檔名決定(見VIDEO_CODECS)。
+        fps (float): 畫格速率。
+        """
+        self.path = path  # 輸出路徑
+        self.fps = fps  # 畫格速率
+        self.writer = None  # 第一個畫格時建立
+
+    def write(self, frame):
+        """
+        寫入一個RGB畫格。
+        """
+        if self.writer is None:
+            codec = VIDEO_CODECS.get(os.path.splitext(self.path)[1].lower(), "mp4v")
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*codec), self.fps, pipeline.array_size(frame))
+            if not self.writer.isOpened():
+                raise OSError(f"Cannot open video writer: {self.path} ({codec})")
+        self.writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))  # VideoWriter使用BGR
+
+    def close(self):
+        """
+        結束影片檔案。
+        """
+        if self.writer is not None:
+            self.writer.release()
+
+
+class SequenceSink:
+    concurrent = True  # 每張圖片獨立，可以在多個執行緒同時寫入
+
+    def __init__(self, path, preset=exporter.DEFAULT_PRESET):
+        """
+        初始化SequenceSink類別，將每個畫格存成一張圖片。
+
+        參數:
+        path (str): 輸出資料夾(檔名為SEQUENCE_PATTERN)、包含printf格式的路徑(例如out/frame_%04d.jpg)，
+                    或圖片檔名(例如out/frame.jpg，依序寫成frame_000000.jpg...)。
+        preset (str): 編碼設定(見exporter.ENCODER_PRESETS)。
+        """
+        stem, extension = os.path.splitext(path)
+        if "%" in path:
+            self.pattern = path  # 檔名格式
+        elif extension.lower() in exporter.FORMATS:
+            self.pattern = stem + SEQUENCE_SUFFIX + extension  # 在檔名加上編號
+        else:
+            self.pattern = os.path.join(path, SEQUENCE_PATTERN)  # 寫入資料夾
+        os.makedirs(os.path.dirname(self.pattern) or ".", exist_ok=True)
+        self.target = exporter.ExportTarget(self.pattern, preset=preset)  # 格式與編碼參數
+        self.index = 0  # 下一個畫格的編號
+
+    def save(self, index, frame):
+        """
+        將第index個RGB畫格存成圖片，可在任何執行緒呼叫。
+        """
+        pipeline.to_image(frame).save(self.pattern % index, format=self.target.format, **self.target.options)
+
+    def write(self, frame):
+        """
+        依序寫入一個RGB畫格。
+        """
+        self.save(self.index, frame)
+        self.index += 1
+
+    def close(self):
+        """
+        沒有需要釋放的資源。
+        """
+
+
+def open_source(path):
+    """
+    依路徑開啟輸入：資料夾為圖片序列，其他為影片(含printf格式的序列)。
+    """
+    return SequenceSource(path) if os.path.isdir(path) else VideoSource(path)
+
+
+def open_sink(path, fps, preset=exporter.DEFAULT_PRESET):
+    """
+    依路徑開啟輸出：影片副檔名寫成影片，其他(資料夾、printf格式或圖片檔名)依preset寫成圖片序列。
+    """
+    if os.path.splitext(path)[1].lower() in VIDEO_CODECS and "%" not in path:
+        return VideoSink(path, fps)
+    return SequenceSink(path, preset)
+
+
+def _put(frames, item, stop):
+    """
+    放入佇列，佇列已滿時等待，但收到停止訊號時放棄。
+
+    回傳:
+    bool: 是否放入。
+    """
+    while not stop.is_set():
+        try:
+            frames.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(source, frames, stop):
+    """
+    讀取執行緒：依序解碼畫格放入佇列，結束或發生錯誤時放入結束標記或錯誤。
+    """
+    try:
+        for frame in source:
+            if not _put(frames, frame, stop):
+                return
+        _put(frames, _END, stop)
+    except Exception as exc:  # 交給呼叫端引發
+        _put(frames, exc, stop)
+
+
+def _process_frame(frame, params, index, sink):
+    """
+    處理一個畫格。多個畫格已經同時處理，因此畫格內不再分帶。
+    輸出可以同時寫入時直接在此編碼並回傳None，否則回傳結果由呼叫端依序寫入。
+    """
+    with bands.serial():
+        result = pipeline.render(frame, None, params)  # 每個畫格都不同，不使用快取
+    if sink.concurrent:
+        sink.save(index, result)  # 編碼也平行進行
+        return None
+    return result
+
+
+def process(source_path, destination_path, params, workers=None, queue_size=None, fps=None, preset=exporter.DEFAULT_PRESET,
+            on_progress=None, cancelled=None):
+    """
+    串流處理整段影片或圖片序列。
+
+    參數:
+    source_path (str): 輸入影片、printf格式的序列或圖片資料夾。
+    destination_path (str): 輸出影片、printf格式的路徑或資料夾。
+    params (dict): 濾鏡參數(同pipeline.default_params())。
+    workers (int): 同時處理的畫格數，為None時使用CPU數量。
+    queue_size (int): 已解碼等待處理的畫格數上限，為None時為workers的兩倍。
+    fps (float): 輸出的畫格速率，為None時沿用輸入。
+    preset (str): 輸出為圖片序列時的編碼設定(見exporter.ENCODER_PRESETS)。
+    on_progress (callable): 在呼叫端的執行緒呼叫，參數為(已完成畫格數, 總畫格數或None, 目前的fps)。
+    cancelled (callable): 回傳True時停止處理(已寫入的畫格保留)。
+
+    回傳:
+    dict: 畫格數、秒數與fps。
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or 2 * workers
+    source = open_source(source_path)
+    sink = open_sink(destination_path, fps or source.fps, preset)
+    frames = queue.Queue(maxsize=queue_size)  # 已解碼的畫格
+    stop = threading.Event()  # 通知讀取執行緒停止
+    reader = threading.Thread(target=_produce, args=(source, frames, stop), name="video-reader", daemon=True)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video")  # 處理畫格的執行緒池
+    pending = collections.deque()  # 依順序等待的處理結果，數量不超過workers
+    submitted = 0  # 已送出的畫格數
+    done = 0  # 已寫入的畫格數
+    start = last_report = time.perf_counter()
+
+    def write_next():
+        nonlocal done, last_report
+        result = pending.popleft().result()
+        if result is not None:
+            sink.write(result)  # 依原本的順序編碼
+        done += 1
+        now = time.perf_counter()
+        if on_progress is not None and now - last_report >= PROGRESS_SECONDS:
+            on_progress(done, source.frame_count, done / (now - start))
+            last_report = now
+
+    reader.start()
+    try:
+        while True:
+            if cancelled is not None and cancelled():
+                logger.info("Video processing cancelled after %d frames", done)  # 記錄取消
+                break
+            item = frames.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):  # 讀取失敗
+                raise item
+            pending.append(executor.submit(_process_frame, item, params, submitted, sink))
+            submitted += 1
+            while len(pending) >= workers or (pending and pending[0].done()):  # 處理中的畫格數有上限
+                write_next()
+        while pending and not (cancelled is not None and cancelled()):
+            write_next()
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        reader.join()
+        source.close()
+        sink.close()
+    seconds = time.perf_counter() - start
+    stats = {"frames": done, "seconds": seconds, "fps": done / seconds if seconds > 0 else 0.0}
+    instrumentation.record("video", seconds, frames=done, fps=stats["fps"])
+    logger.info("Processed %d frames in %.2f s (%.1f fps)", done, seconds, stats["fps"])  # 記錄處理速度
+    if on_progress is not None:
+        on_progress(done, source.frame_count, stats["fps"])
+    return stats
+
+
+class VideoJob:
+    def __init__(self, widget, source_path, destination_path, params, on_progress=None, on_done=None, workers=None, poll_ms=100):
+        """
+        初始化VideoJob類別，在背景執行緒執行process，進度透過widget.after輪詢交回主執行緒。
+
+        參數:
+        widget (tk.Widget): 用於呼叫after的Tk元件。
+        source_path (str): 輸入影片或資料夾。
+        destination_path (str): 輸出影片或資料夾。
+        params (dict): 濾鏡參數，開始時複製一份，之後的編輯不影響處理中的影片。
+        on_progress (callable): 在主執行緒呼叫，參數為(已完成畫格數, 總畫格數或None, fps)。
+        on_done (callable): 在主執行緒呼叫，參數為結果字典，失敗時包含error欄位。
+        workers (int): 同時處理的畫格數。
+        poll_ms (int): 主執行緒檢查進度的間隔(毫秒)。
+        """
+        self.widget = widget  # 設置Tk元件
+        self.on_progress = on_progress  # 設置進度回呼
+        self.on_done = on_done  # 設置完成回呼
+        self.poll_ms = poll_ms  # 設置輪詢間隔
+        self._progress = None  # 最近一次的進度(由背景執行緒更新)
+        self._result = None  # 結果
+        self._cancelled = False  # 是否已取消
+        self._thread = threading.Thread(target=self._run, args=(source_path, destination_path, dict(params), workers),
+                                        name="video-job", daemon=True)
+        self._thread.start()
+        widget.after(poll_ms, self._poll)
+
+    def _run(self, source_path, destination_path, params, workers):
+        """
+        背景執行緒中的處理工作。
+        """
+        try:
+            self._result = process(source_path, destination_path, params, workers,
+                                   on_progress=lambda *progress: setattr(self, "_progress", progress),
+                                   cancelled=lambda: self._cancelled)
+        except Exception as exc:  # 回報錯誤
+            logger.error("Video processing failed: %s", exc)  # 記錄錯誤
+            self._result = {"error": str(exc)}
+
+    def cancel(self):
+        """
+        停止處理，已寫入的畫格保留。
+        """
+        self._cancelled = True
+
+    def is_running(self):
+        """
+        是否仍在處理。
+        """
+        return self._thread.is_alive()
+
+    def wait(self):
+        """
+        等待處理結束，用於關閉程式前。
+        """
+        self._thread.join()
+
+    def _poll(self):
+        """
+        在主執行緒回報進度與結果。
+        """
+        if self._progress is not None and self.on_progress is not None:
+            self.on_progress(*self._progress)
+        if self._thread.is_alive():
+            self.widget.after(self.poll_ms, self._poll)
+        elif self.on_done is not None:
+            self.on_done(self._result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="將編輯設定套用到影片或圖片序列")
+    parser.add_argument("source", help="輸入影片、printf格式的序列(例如 frames/%%04d.png)或圖片資料夾")
+    parser.add_argument("destination", help="輸出影片(.mp4、.avi...)、printf格式的路徑或資料夾")
+    parser.add_argument("--recipe", help="JSON格式的編輯設定檔(參數名稱同ImageProcessor)")
+    parser.add_argument("--workers", type=int, default=None, help="同時處理的畫格數，預設為CPU核心數")
+    parser.add_argument("--queue", type=int, default=None, help="已解碼等待處理的畫格數上限")
+    parser.add_argument("--fps", type=float, default=None, help="輸出的畫格速率，預設沿用輸入")
+    parser.add_argument("--preset", choices=sorted(exporter.ENCODER_PRESETS), default=exporter.DEFAULT_PRESET,
+                        help="輸出為圖片序列時的編碼設定")
+    args = parser.parse_args(argv)
+
+    params = pipeline.load_recipe(args.recipe) if args.recipe else pipeline.default_params()  # 讀取編輯設定
+
+    def report(done, total, fps):
+        print(f"\r{done}/{total or '?'} frames, {fps:.1f} fps", end="", flush=True)
+
+    try:
+        process(args.source, args.destination, params, args.workers, args.queue, args.fps, args.preset, on_progress=report)
+    except OSError as exc:
+        print(f"\n{exc}")
+        return 1
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())